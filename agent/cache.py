@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class ResponseCache:
+    """LRU/TTL cache for LLM responses with an optional SQLite tier on disk"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: Optional[float] = 3600,
+                 sqlite_path: str = None, max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = self._open_db(sqlite_path) if sqlite_path else None
+
+    @classmethod
+    def from_config(cls, cache_config: Dict[str, Any]) -> "ResponseCache":
+        """Build a cache from the 'cache' section of config.yaml"""
+        return cls(
+            max_entries=cache_config.get('max_entries', 512),
+            ttl_seconds=cache_config.get('ttl_seconds', 3600),
+            sqlite_path=cache_config.get('sqlite_path'),
+            max_disk_entries=cache_config.get('max_disk_entries', 10000)
+        )
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, options: Optional[Dict[str, Any]]) -> str:
+        """Stable key over everything that influences the generated text"""
+        material = json.dumps([model, system_prompt or "", prompt, options or {}], sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _open_db(self, sqlite_path: str) -> sqlite3.Connection:
+        """Open (and create if needed) the on-disk tier"""
+        path = os.path.expanduser(sqlite_path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, created REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        db.commit()
+        return db
+
+    def _expiry(self) -> Optional[float]:
+        return time.time() + self.ttl_seconds if self.ttl_seconds else None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, checking memory first and then disk"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and (row[1] is None or row[1] > now):
+                    self.disk_hits += 1
+                    self._remember(key, row[0], row[1])
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        """Store a response in both tiers"""
+        expires = self._expiry()
+        with self._lock:
+            self._remember(key, value, expires)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires, created) VALUES (?, ?, ?, ?)",
+                    (key, value, expires, time.time())
+                )
+                self._prune_disk()
+                self._db.commit()
+
+    def _remember(self, key: str, value: str, expires: Optional[float]):
+        """Insert into the in-memory LRU, evicting the least recently used entries"""
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        """Drop expired rows and keep the disk tier under max_disk_entries"""
+        self._db.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        """Empty both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: about four characters per token for English and code"""
+    return (len(text) + 3) // 4
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, marking the cut"""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 20, 0)].rstrip() + "\n[... truncated]"
+
+
+def _one_line(text: str, max_chars: int) -> str:
+    """First line of text, shortened for a summary"""
+    line = text.strip().splitlines()[0] if text.strip() else ""
+    return line if len(line) <= max_chars else line[:max_chars - 1].rstrip() + "…"
+
+
+class ContextBuilder:
+    """Assembles an LLM prompt from history and workspace snippets under a token budget.
+
+    The request is always included. Remaining space goes, in order, to the
+    most recent turns, then workspace snippets, then one-line summaries of
+    older turns, so the prompt stays bounded however long the session runs.
+    """
+
+    def __init__(self, max_tokens: int = 4096, reserve_tokens: int = 1024, recent_turns: int = 6,
+                 turn_tokens: int = 400, summary_chars: int = 120,
+                 estimator: Callable[[str], int] = estimate_tokens):
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.recent_turns = recent_turns
+        self.turn_tokens = turn_tokens
+        self.summary_chars = summary_chars
+        self.estimate = estimator
+        self.last_stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, context_config: Dict[str, Any]) -> "ContextBuilder":
+        """Build from the 'context' section of config.yaml"""
+        return cls(
+            max_tokens=context_config.get('max_tokens', 4096),
+            reserve_tokens=context_config.get('reserve_tokens', 1024),
+            recent_turns=context_config.get('recent_turns', 6),
+            turn_tokens=context_config.get('turn_tokens', 400),
+            summary_chars=context_config.get('summary_chars', 120)
+        )
+
+    def _format_turn(self, turn: Dict[str, Any]) -> str:
+        return f"User: {turn['input']}\nCintessa: {_clip(turn['result'], self.turn_tokens)}"
+
+    def _summarize_turn(self, turn: Dict[str, Any]) -> str:
+        result = _one_line(turn['result'], self.summary_chars)
+        return f"- {_one_line(turn['input'], self.summary_chars)} ({turn['action']}) → {result}"
+
+    def build(self, request: str, system_prompt: Optional[str] = None, turns: Sequence[Dict[str, Any]] = (),
+              snippets: Sequence[Tuple[str, str]] = ()) -> str:
+        """Prompt text for `request`; turns are oldest first, snippets (path, text) most relevant first"""
+        # 20 tokens cover the section headings and separators added at the end
+        budget = self.max_tokens - self.reserve_tokens - self.estimate(request) - 20
+        if system_prompt:
+            budget -= self.estimate(system_prompt)
+
+        turns = list(turns)
+        recent: List[str] = []
+        for turn in reversed(turns[max(len(turns) - self.recent_turns, 0):]):
+            text = self._format_turn(turn)
+            cost = self.estimate(text)
+            if cost > budget:
+                break
+            budget -= cost
+            recent.insert(0, text)
+        # Whatever did not fit verbatim is only summarized
+        recent_from = len(turns) - len(recent)
+
+        included: List[str] = []
+        for path, text in snippets:
+            header = f"EXISTING FILE: {path}\n```\n"
+            room = budget - self.estimate(header) - 2
+            if room < 50:
+                break
+            body = _clip(text, room)
+            budget -= self.estimate(header + body) + 2
+            included.append(f"{header}{body}\n```")
+
+        summaries: List[str] = []
+        for turn in reversed(turns[:recent_from]):
+            line = self._summarize_turn(turn)
+            cost = self.estimate(line)
+            if cost > budget:
+                break
+            budget -= cost
+            summaries.insert(0, line)
+
+        sections = []
+        if summaries:
+            sections.append("Earlier in this conversation:\n" + "\n".join(summaries))
+        if recent:
+            sections.append("Recent conversation:\n" + "\n\n".join(recent))
+        if included:
+            sections.append("Relevant workspace files:\n\n" + "\n\n".join(included))
+        sections.append(request)
+        prompt = "\n\n".join(sections)
+
+        self.last_stats = {
+            "tokens": self.estimate(prompt) + (self.estimate(system_prompt) if system_prompt else 0),
+            "recent_turns": len(recent),
+            "summarized_turns": len(summaries),
+            "snippets": len(included)
+        }
+        return prompt
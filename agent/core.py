@@ -1,25 +1,86 @@
+import asyncio
+import contextvars
+import functools
+import heapq
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import re
 import os
-import subprocess
 import shutil
-from typing import Tuple, Dict, Any, List
+import threading
+import time
+from collections import deque
+from typing import Tuple, Dict, Any, List, Iterable, Iterator, Optional, Callable, AsyncIterator, NamedTuple, Set
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from .cache import ResponseCache
+from .context import ContextBuilder
+from .llm_context import ContextHandles
+from .warmup import shared_warmer
+from .gitops import GitWorkspace
+from .fileio import FilePage, PagerCache, is_binary, read_bytes
+from .index import WorkspaceIndex, names_same_file
+from .process import Job, ProcessRunner
+from .retrieval import RetrievalIndex
+from .search import CodeSearchIndex
+from .symbols import SymbolIndex
+from .intent import IntentEngine, IntentResult
+from .patch import FilePatch, PatchError, apply_hunks
+from .proposal import CodeProposal, parse_proposal
+from .session import Conversation, SessionStore
+from .transaction import WriteTransaction
+
+PARSER_SYSTEM_PROMPT = "You are a command parser. Return only valid JSON. Use ask_question for general chat."
+CHAT_SYSTEM_PROMPT = "You are Cintessa, a friendly and helpful AI coding assistant. Be conversational and helpful. If the user mentions creating files or directories, offer to help with that."
+
+# Worker pools are shared by every agent in the process, so N sessions still run on one bounded set of threads
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+def shared_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """The process-wide pool with this name, sized by its first caller"""
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"cintessa-{name}")
+        return _executors[name]
+
 class Tools:
-    def __init__(self, workspace_path: str = None):
+    def __init__(self, workspace_path: str = None, ignore: List[str] = None, max_read_bytes: int = 1048576,
+                 runner: ProcessRunner = None, write_workers: int = 4):
+        self.ignore = ignore
+        self.max_read_bytes = max_read_bytes
+        self.write_workers = write_workers
+        self.runner = runner or ProcessRunner()
+        self.pagers = PagerCache()
+        self.write_listeners: List[Callable[[List[str]], None]] = []
         self.workspace_path = Path(workspace_path) if workspace_path else None
+        self.index = None
         if self.workspace_path:
             self.workspace_path.mkdir(exist_ok=True)
+            self.index = WorkspaceIndex(str(self.workspace_path), self.ignore)
     
     def set_workspace(self, workspace_path: str):
         """Set or change workspace path"""
         self.workspace_path = Path(workspace_path)
         self.workspace_path.mkdir(parents=True, exist_ok=True)
+        self.index = WorkspaceIndex(str(self.workspace_path), self.ignore)
         return f"✅ Workspace set to: {workspace_path}"
     
+    def add_write_listener(self, listener: Callable[[List[str]], None]):
+        """Call listener with the relative paths of every successful write"""
+        self.write_listeners.append(listener)
+    
+    def _notify_write(self, paths: List[str]):
+        for listener in self.write_listeners:
+            try:
+                listener(paths)
+            except Exception:
+                pass  # a stale secondary index must never fail the write itself
+    
     def create_directory(self, dir_path: str) -> str:
         """Create directory at specified path (absolute or relative)"""
         try:
@@ -38,27 +99,74 @@ class Tools:
         if not self.workspace_path:
             return ["ℹ️ No workspace set. Use 'set workspace <path>' first."]
         
-        target_path = self.workspace_path / path if path else self.workspace_path
-        files = []
         try:
-            for item in target_path.rglob("*"):
-                if item.is_file():
-                    files.append(str(item.relative_to(self.workspace_path)))
+            files = self.index.list_files(path)
         except Exception as e:
             files = [f"Error: {e}"]
         return files
     
+    def _resolve_file(self, file_path: str) -> Tuple[Optional[Path], str]:
+        """Resolve a workspace file, falling back to the filename index; returns (path, error)"""
+        full_path = self.workspace_path / file_path
+        if full_path.is_file():
+            return full_path, ""
+        # Fall back to a case-insensitive name lookup in the index
+        candidates = self.index.find_by_name(file_path)
+        if candidates and names_same_file(file_path, candidates[0][0]):
+            return self.workspace_path / candidates[0][0], ""
+        if candidates:
+            suggestions = ", ".join(path for path, _ in candidates)
+            return None, f"❌ Error: File '{file_path}' not found in workspace. Did you mean: {suggestions}"
+        return None, f"❌ Error: File '{file_path}' not found in workspace"
+    
     def read_file(self, file_path: str) -> str:
-        """Read file content"""
+        """Read file content, truncated to max_read_bytes"""
         if not self.workspace_path:
             return "❌ Error: No workspace set. Please set a workspace first."
         
         try:
-            full_path = self.workspace_path / file_path
-            if full_path.exists():
-                return full_path.read_text(encoding='utf-8')
-            else:
-                return f"❌ Error: File '{file_path}' not found in workspace"
+            full_path, error = self._resolve_file(file_path)
+            if error:
+                return error
+            size = full_path.stat().st_size
+            if is_binary(str(full_path)):
+                return f"❌ '{file_path}' looks like a binary file ({size:,} bytes); not displaying it"
+            if size > self.max_read_bytes:
+                head = read_bytes(str(full_path), 0, self.max_read_bytes)
+                return head + f"\n\n[Truncated: showing the first {self.max_read_bytes:,} of {size:,} bytes. Read a line range to see more.]"
+            return full_path.read_text(encoding='utf-8')
+        except Exception as e:
+            return f"❌ Error reading file: {e}"
+    
+    def read_file_page(self, file_path: str, start_line: int = 1, num_lines: int = 200,
+                       mode: str = "lines") -> Tuple[Optional[FilePage], str]:
+        """Read a window of lines ('lines', 'head' or 'tail'); returns (page, error)"""
+        if not self.workspace_path:
+            return None, "❌ Error: No workspace set. Please set a workspace first."
+        
+        try:
+            full_path, error = self._resolve_file(file_path)
+            if error:
+                return None, error
+            if is_binary(str(full_path)):
+                return None, f"❌ '{file_path}' looks like a binary file; not displaying it"
+            pager = self.pagers.get(str(full_path))
+            if mode == "tail":
+                return pager.tail(num_lines), ""
+            if mode == "head":
+                start_line = 1
+            return pager.read_lines(start_line, num_lines), ""
+        except Exception as e:
+            return None, f"❌ Error reading file: {e}"
+    
+    def read_file_bytes(self, file_path: str, offset: int = 0, length: int = 65536) -> str:
+        """Read a byte range of a file"""
+        if not self.workspace_path:
+            return "❌ Error: No workspace set. Please set a workspace first."
+        
+        try:
+            full_path, error = self._resolve_file(file_path)
+            return error or read_bytes(str(full_path), offset, length)
         except Exception as e:
             return f"❌ Error reading file: {e}"
     
@@ -71,25 +179,71 @@ class Tools:
             full_path = self.workspace_path / file_path
             full_path.parent.mkdir(parents=True, exist_ok=True)
             full_path.write_text(content, encoding='utf-8')
+            self.index.touch(file_path)
+            self._notify_write([file_path])
             return f"✅ Successfully wrote to {file_path}"
         except Exception as e:
             return f"❌ Error writing file: {e}"
     
-    def run_shell(self, command: str) -> Tuple[int, str, str]:
+    def write_files(self, files: Dict[str, str]) -> str:
+        """Write several files atomically: all of them are applied or none are"""
+        if not self.workspace_path:
+            return "❌ Error: No workspace set. Please set a workspace first."
+        
+        try:
+            transaction = WriteTransaction(str(self.workspace_path), self.write_workers)
+            for file_path, content in files.items():
+                transaction.write(file_path, content)
+            written = transaction.commit()
+            for file_path in written:
+                self.index.touch(file_path)
+            self._notify_write(written)
+            return f"✅ Successfully wrote {len(written)} file(s)"
+        except Exception as e:
+            return f"❌ Error writing files: {e}"
+    
+    def patched_content(self, file_path: str, patch: FilePatch) -> Tuple[str, str, str]:
+        """Apply a patch in memory; returns (resolved path, new content, error)"""
+        if not self.workspace_path:
+            return file_path, "", "❌ Error: No workspace set. Please set a workspace first."
+        
+        try:
+            original = ""
+            if (self.workspace_path / file_path).is_file() or not patch.creates_file:
+                full_path, error = self._resolve_file(file_path)
+                if error:
+                    return file_path, "", error
+                file_path = full_path.relative_to(self.workspace_path).as_posix()
+                original = full_path.read_text(encoding='utf-8')
+            return file_path, apply_hunks(original, patch.hunks), ""
+        except PatchError as e:
+            return file_path, "", f"❌ Patch does not apply to {file_path}: {e}"
+        except Exception as e:
+            return file_path, "", f"❌ Error patching file: {e}"
+    
+    def apply_patch(self, file_path: str, patch: FilePatch) -> str:
+        """Apply unified-diff hunks to a workspace file in place"""
+        file_path, content, error = self.patched_content(file_path, patch)
+        if error:
+            return error
+        result = self.write_file(file_path, content)
+        if result.startswith("✅"):
+            return f"✅ Successfully patched {file_path} ({len(patch.hunks)} hunk(s))"
+        return result
+    
+    def run_shell(self, command: str, timeout: float = None, session_id: str = "default") -> Tuple[int, str, str]:
         """Execute shell command in workspace or current directory"""
         try:
             cwd = self.workspace_path if self.workspace_path else Path.cwd()
-            process = subprocess.run(
-                command,
-                shell=True,
-                cwd=cwd,
-                capture_output=True,
-                text=True
-            )
-            return process.returncode, process.stdout, process.stderr
+            return self.runner.run(command, str(cwd), session_id, timeout)
         except Exception as e:
             return 1, "", f"❌ Error executing command: {e}"
     
+    def start_shell(self, command: str, session_id: str = "default", timeout: float = None) -> Job:
+        """Start a shell command in the background; output streams into the returned Job"""
+        cwd = self.workspace_path if self.workspace_path else Path.cwd()
+        return self.runner.start(command, str(cwd), session_id, timeout)
+    
     def create_project_scaffold(self, project_name: str, project_type: str = "basic") -> str:
         """Create basic project structure"""
         if not self.workspace_path:
@@ -117,15 +271,111 @@ class Tools:
             return f"❌ Error creating project: {e}"
 
 class CintessaAgent:
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", session_id: str = None):
         self.config = self._load_config(config_path)
-        self.tools = Tools()  # Start without workspace
-        self.ollama_client = OllamaClient(
-            self.config['ollama']['base_url'],
-            self.config['ollama']['model']
+        workspace_config = self.config.get('workspace', {})
+        shell_config = self.config.get('shell', {})
+        self.tools = Tools(  # Start without workspace
+            ignore=workspace_config.get('ignore'),
+            max_read_bytes=workspace_config.get('max_read_bytes', 1048576),
+            write_workers=workspace_config.get('write_workers', 4),
+            runner=ProcessRunner(
+                timeout=shell_config.get('timeout', 300),
+                max_output_bytes=shell_config.get('max_output_bytes', 10485760),
+                max_jobs_per_session=shell_config.get('max_jobs_per_session', 4)
+            )
+        )
+        cache_config = self.config.get('cache', {})
+        self.response_cache = ResponseCache.from_config(cache_config) if cache_config.get('enabled', True) else None
+        self.ollama_client = OllamaClient.from_config(self.config['ollama'], cache=self.response_cache)
+        # Load route models in the background so the first request does not pay Ollama's load time.
+        # One warmer per server is shared by every agent in the process, so tabs do not each add a thread
+        warmup_config = self.config.get('warmup', {})
+        self.model_warmer = shared_warmer(
+            self.ollama_client.base_url,
+            lambda: OllamaClient.from_config(self.config['ollama']),
+            warmup_config.get('ping_interval', 240),
+            start=warmup_config.get('enabled', True)
+        )
+        self.model_warmer.attach(self.ollama_client)
+        # Turns, chat messages and proposals persist per session; memory keeps only a recent window
+        session_config = self.config.get('session', {})
+        self.session_store = SessionStore.from_config(session_config) if session_config.get('enabled', True) else None
+        self._memory_window = session_config.get('memory_window', 50)
+        self._conversations: Dict[str, Conversation] = {}
+        self._conversations_lock = threading.Lock()
+        # The async API can serve several sessions from one agent; each task sees its own conversation
+        self._current_conversation: contextvars.ContextVar = contextvars.ContextVar(
+            f"cintessa-conversation-{id(self)}", default=None
+        )
+        self._default_conversation = self.conversation(session_id or session_config.get('id', 'default'))
+        context_config = self.config.get('context', {})
+        self.context_builder = ContextBuilder.from_config(context_config)
+        # Ollama context arrays carried between chat turns; contexts larger than the prompt budget are dropped
+        self.llm_contexts = ContextHandles(
+            max_tokens=self.context_builder.max_tokens - self.context_builder.reserve_tokens
+        ) if context_config.get('reuse_ollama_context', True) else None
+        self.retrieval_config = self.config.get('retrieval', {})
+        self.retrieval: Optional[RetrievalIndex] = None
+        self.search_config = self.config.get('search', {})
+        self.code_search: Optional[CodeSearchIndex] = None
+        self.symbols_config = self.config.get('symbols', {})
+        self.symbols: Optional[SymbolIndex] = None
+        self.git_config = self.config.get('git', {})
+        self.git: Optional[GitWorkspace] = None
+        self.tools.add_write_listener(self._on_files_written)
+        self.intent_engine = IntentEngine(
+            self._intent_param_builders(),
+            min_confidence=self.config.get('intent', {}).get('min_confidence', 0.85)
+        )
+        
+        # Bounded pools for the asyncio API, shared process-wide; blocking work never runs on the event loop
+        agent_config = self.config.get('agent', {})
+        self.async_ollama_client = AsyncOllamaClient(
+            self.ollama_client,
+            executor=shared_executor("llm", agent_config.get('llm_workers', 8))
         )
-        self.memory = []
-        self.pending_changes = {}
+        self._io_executor = shared_executor("io", agent_config.get('io_workers', 4))
+        self._shell_executor = shared_executor("shell", agent_config.get('shell_workers', 2))
+    
+    def conversation(self, session_id: str) -> Conversation:
+        """State of one session, loaded from the session store on first use"""
+        with self._conversations_lock:
+            if session_id not in self._conversations:
+                self._conversations[session_id] = Conversation(session_id, self._memory_window, self.session_store)
+            return self._conversations[session_id]
+    
+    @property
+    def _conversation(self) -> Conversation:
+        return self._current_conversation.get() or self._default_conversation
+    
+    @property
+    def session_id(self) -> str:
+        return self._conversation.session_id
+    
+    @property
+    def memory(self) -> deque:
+        return self._conversation.memory
+    
+    @property
+    def pending_changes(self) -> Dict[str, CodeProposal]:
+        return self._conversation.pending_changes
+    
+    @property
+    def last_proposal_id(self) -> Optional[str]:
+        return self._conversation.last_proposal_id
+    
+    @last_proposal_id.setter
+    def last_proposal_id(self, proposal_id: Optional[str]):
+        self._conversation.last_proposal_id = proposal_id
+    
+    @property
+    def last_intent(self) -> Optional[IntentResult]:
+        return self._conversation.last_intent
+    
+    @last_intent.setter
+    def last_intent(self, result: Optional[IntentResult]):
+        self._conversation.last_intent = result
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file"""
@@ -145,58 +395,183 @@ class CintessaAgent:
     
     def set_workspace(self, workspace_path: str):
         """Set workspace path for tools"""
-        return self.tools.set_workspace(workspace_path)
+        result = self.tools.set_workspace(workspace_path)
+        self.git = GitWorkspace.open(
+            str(self.tools.workspace_path), self.git_config.get('status_ttl', 2.0)
+        ) if self.git_config.get('enabled', True) else None
+        # In a git repository, changes git reports are pushed into the indexes, so their own
+        # full rescans (which stat every file) only need to run occasionally
+        staleness = self.git_config.get('rescan_interval', 300) if self.git else 5.0
+        if self.git:
+            self.git.changes_since_sync()  # baseline for later incremental syncs
+        for index in (self.retrieval, self.code_search, self.symbols):
+            if index:
+                index.close()
+        self.retrieval = self.code_search = self.symbols = None
+        if self.retrieval_config.get('enabled', True):
+            # Loads the saved index for this workspace, then catches up on changes in the background
+            self.retrieval = RetrievalIndex.open(
+                self.tools.index,
+                cache_dir=self.retrieval_config.get('cache_dir', '~/.cache/cintessa/retrieval'),
+                chunk_lines=self.retrieval_config.get('chunk_lines', 40),
+                max_file_bytes=self.retrieval_config.get('max_file_bytes', 524288),
+                max_staleness=staleness
+            )
+            self.retrieval.refresh_async()
+        if self.search_config.get('enabled', True):
+            self.code_search = CodeSearchIndex.open(
+                self.tools.index,
+                cache_dir=self.search_config.get('cache_dir', '~/.cache/cintessa/search'),
+                max_file_bytes=self.search_config.get('max_file_bytes', 1048576),
+                max_staleness=staleness
+            )
+            self.code_search.refresh_async()
+        if self.symbols_config.get('enabled', True):
+            self.symbols = SymbolIndex.open(
+                self.tools.index,
+                cache_dir=self.symbols_config.get('cache_dir', '~/.cache/cintessa/symbols'),
+                workers=self.symbols_config.get('workers'),
+                max_staleness=staleness
+            )
+            self.symbols.refresh_async()
+        return result
     
-    def parse_command(self, user_input: str) -> Tuple[str, Dict[str, Any]]:
-        """Parse natural language command using LLM"""
-        user_lower = user_input.lower()
-        
-        # Direct command mapping - workspace operations (always available)
-        if any(phrase in user_lower for phrase in ['set workspace', 'use folder', 'open directory', 'cd to']):
-            path = self._extract_path(user_input) or "."
-            return "set_workspace", {"path": path}
-        
-        elif any(phrase in user_lower for phrase in ['create dir', 'make folder', 'mkdir', 'new directory']):
-            path = self._extract_path(user_input) or "new_folder"
-            return "create_directory", {"path": path}
-        
-        elif any(phrase in user_lower for phrase in ['create project', 'new project', 'scaffold project']):
-            project_name = self._extract_project_name(user_input) or "new_project"
-            return "create_project", {"project_name": project_name}
-        
-        # File operations (only if workspace is set)
-        elif any(phrase in user_lower for phrase in ['list files', 'show files', 'ls', 'dir']):
-            return "list_files", {}
-        
-        elif any(phrase in user_lower for phrase in ['read file', 'show file', 'cat']):
-            file_path = self._extract_file_path(user_input)
-            return "read_file", {"file_path": file_path}
-        
-        # Code proposals (always available)
-        elif any(phrase in user_lower for phrase in ['create function', 'write code', 'implement', 'add feature', 'propose code']):
-            return "propose_code", {"user_request": user_input}
-        
-        # System commands (always available)
-        elif any(phrase in user_lower for phrase in ['smoke test', 'test app', 'run tests']):
-            return "smoke_test", {}
-        
-        elif any(phrase in user_lower for phrase in ['run app', 'start app']):
-            return "run_app", {}
+    def _on_files_written(self, paths: List[str]):
+        if self.git:
+            self.git.touch(paths)
+        self._update_indexes(paths)
+    
+    def _update_indexes(self, paths: List[str]):
+        """Re-index changed (or deleted) workspace files in every index"""
+        if self.retrieval:
+            self.retrieval.update_files(paths)
+        if self.code_search:
+            self.code_search.update_files(paths)
+        if self.symbols:
+            self.symbols.update_files(paths)
+    
+    def _sync_git(self):
+        """Push files git reports as changed since the last sync into the indexes"""
+        if not self.git:
+            return
+        try:
+            paths = self.git.changes_since_sync()
+        except Exception:
+            return  # the indexes still catch up on their own rescans
+        if paths:
+            self._update_indexes(paths)
+    
+    def git_status(self) -> str:
+        """Branch and changed files of the workspace's git repository"""
+        if not self.git:
+            return "❌ Error: The workspace is not inside a git repository."
+        try:
+            statuses = self.git.status()
+        except Exception as e:
+            return f"❌ Error reading git status: {e}"
+        result = f"🌿 **Branch:** {self.git.branch()}\n\n"
+        if not statuses:
+            return result + "✅ Working tree clean"
+        shown = statuses[:100]
+        result += f"**Changed files ({len(statuses)}):**\n" + "\n".join(
+            f"  - `{(status.index + status.worktree).replace('??', '?') or ' '}` {status.path}" for status in shown
+        )
+        if len(statuses) > len(shown):
+            result += f"\n\n... and {len(statuses) - len(shown)} more"
+        return result
+    
+    def git_diff(self, path: str = None, staged: bool = False) -> str:
+        """Unified diff of workspace changes against HEAD"""
+        if not self.git:
+            return "❌ Error: The workspace is not inside a git repository."
+        try:
+            text = self.git.diff(path, staged)
+        except Exception as e:
+            return f"❌ Error reading git diff: {e}"
+        if not text:
+            return "✅ No differences" + (f" in {path}" if path else "")
+        limit = self.git_config.get('max_diff_bytes', 100000)
+        if len(text) > limit:
+            text = text[:limit] + "\n[... diff truncated]"
+        return f"📝 **Diff{' (staged)' if staged else ''}{f' of {path}' if path else ''}:**\n\n```diff\n{text}\n```"
+    
+    def find_symbol(self, name: str) -> str:
+        """Where a Python symbol is defined, imported and called"""
+        if not self.symbols:
+            return "❌ Error: No workspace set. Please set a workspace first."
+        if not name:
+            return "❌ Error: Which symbol should I look for?"
+        self._sync_git()
+        definitions = self.symbols.definitions(name)
+        callers = self.symbols.callers(name)
+        importers = self.symbols.importers(name)
+        if not (definitions or callers or importers):
+            return f"🔎 No Python symbol named `{name}` in the workspace"
         
-        elif any(phrase in user_lower for phrase in ['help', 'what can you do']):
-            return "show_help", {}
+        result = f"🔎 **Symbol `{name}`**\n"
+        if definitions:
+            result += "\n**Defined:**\n" + "\n".join(
+                f"  - {d.kind} `{d.qualname}` — {d.path}:{d.line}" for d in definitions[:20]
+            ) + "\n"
+        limit = self.symbols_config.get('max_references', 20)
+        if callers:
+            result += f"\n**Called ({len(callers)}):**\n" + "\n".join(
+                f"  - {c.path}:{c.line}" + (f" in `{c.detail}`" if c.detail else "") for c in callers[:limit]
+            ) + "\n"
+        if importers:
+            result += f"\n**Imported ({len(importers)}):**\n" + "\n".join(
+                f"  - {i.path}:{i.line} from `{i.detail}`" for i in importers[:limit]
+            ) + "\n"
+        return result
+    
+    def search_code(self, query: str, regex: bool = False, path: str = None, ignore_case: bool = False,
+                    max_results: int = None) -> str:
+        """Search workspace file contents through the trigram index"""
+        if not self.code_search:
+            return "❌ Error: No workspace set. Please set a workspace first."
+        if not query:
+            return "❌ Error: Nothing to search for."
+        max_results = max_results or self.search_config.get('max_results', 50)
+        self._sync_git()
+        try:
+            hits, truncated = self.code_search.search(query, regex, path, ignore_case, max_results)
+        except ValueError as e:
+            return f"❌ Error: {e}"
+        if not hits:
+            return f"🔎 No matches for `{query}`"
+        lines = "\n".join(f"{hit.path}:{hit.line}: {hit.text[:200]}" for hit in hits)
+        result = f"🔎 **{len(hits)} match(es) for `{query}`:**\n\n```\n{lines}\n```"
+        if truncated:
+            result += f"\n\nShowing the first {max_results}; narrow the query or add a path filter for more."
+        return result
+    
+    def parse_command(self, user_input: str) -> Tuple[str, Dict[str, Any]]:
+        """Parse natural language command, escalating to the LLM only when the local engine is unsure"""
+        result = self.intent_engine.classify(user_input)
+        if result.tier != "llm":
+            self.last_intent = result
+            return result.action, result.params
         
         # Enhanced LLM parsing for other commands
-        prompt = f"""
+        response = self.ollama_client.generate(self._parser_prompt(user_input), system_prompt=PARSER_SYSTEM_PROMPT, route="parser")
+        return self._interpret_parser_response(user_input, response, result)
+    
+    def _parser_prompt(self, user_input: str) -> str:
+        """Prompt asking the LLM to map a command onto an action"""
+        return f"""
         Analyze this user command and return ONLY a JSON response with action and params.
         
         Available actions:
         - set_workspace: {{"path": "directory/path"}} - set workspace directory
         - create_directory: {{"path": "directory/path"}} - create new directory
         - create_project: {{"project_name": "name"}} - create new project
-        - read_file: {{"file_path": "path/to/file"}} - read file (requires workspace)
+        - read_file: {{"file_path": "path/to/file"}} - read file (requires workspace); add "start_line", "num_lines" or "mode": "head"/"tail" for part of a large file
         - write_file: {{"file_path": "path/to/file", "content": "content"}} - write file (requires workspace)
         - list_files: {{}} - list files (requires workspace)
+        - git_status: {{}} - branch and changed files (workspace must be a git repository)
+        - git_diff: {{"path": "optional/file", "staged": false}} - diff of changes against HEAD
+        - find_symbol: {{"name": "ClassName.method or function_name"}} - where a Python symbol is defined, imported and called (requires workspace)
+        - search_code: {{"query": "text or regex", "regex": false, "path": "optional dir or glob"}} - search file contents (requires workspace)
         - run_command: {{"command": "shell command"}} - run terminal command
         - propose_code: {{"user_request": "user request"}} - propose code changes
         - smoke_test: {{}} - run smoke tests
@@ -212,33 +587,104 @@ class CintessaAgent:
         Respond with JSON only:
         {{"action": "action_name", "params": {{...}}}}
         """
-        
+    
+    def _interpret_parser_response(self, user_input: str, response: str, local_result: IntentResult) -> Tuple[str, Dict[str, Any]]:
+        """Turn the parser LLM's JSON reply into an action and params"""
         try:
-            response = self.ollama_client.generate(prompt, system_prompt="You are a command parser. Return only valid JSON. Use ask_question for general chat.")
-            
             json_match = re.search(r'\{.*\}', response, re.DOTALL)
             if json_match:
-                result = json.loads(json_match.group())
-                action = result.get("action", "ask_question")
-                params = result.get("params", {})
-                
-                # Force ask_question for simple greetings and chat
-                if any(word in user_lower for word in ['hi', 'hello', 'hey', 'how are you', 'jimmy']):
-                    return "ask_question", {"question": user_input}
-                    
-                return action, params
+                parsed = json.loads(json_match.group())
+                action = parsed.get("action", "ask_question")
+                params = parsed.get("params", {})
             else:
-                return "ask_question", {"question": user_input}
+                action, params = "ask_question", {"question": user_input}
                 
         except Exception as e:
-            return "ask_question", {"question": user_input}
+            action, params = "ask_question", {"question": user_input}
+        
+        self.last_intent = IntentResult(action, params, local_result.confidence, "llm")
+        return action, params
+    
+    def _intent_param_builders(self) -> Dict[str, Callable[[str], Optional[Dict[str, Any]]]]:
+        """Param extractors used by the local intent engine"""
+        return {
+            "set_workspace": lambda text: {"path": self._extract_path(text) or "."},
+            "create_directory": lambda text: {"path": self._extract_path(text) or "new_folder"},
+            "create_project": lambda text: {"project_name": self._extract_project_name(text) or "new_project"},
+            "list_files": self._extract_list_files,
+            "read_file": lambda text: {"file_path": self._extract_file_path(text)},
+            "search_code": self._extract_search,
+            "find_symbol": self._extract_symbol,
+            "git_status": lambda text: None if self._extract_command(text) else {},
+            "git_diff": self._extract_diff,
+            "propose_code": lambda text: {"user_request": text},
+            "ask_question": lambda text: {"question": text},
+            "run_command": self._extract_command,
+        }
+    
+    def _extract_list_files(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """No params; None when the text is a shell command or only mentions ls/dir in passing"""
+        if self._extract_command(user_input):
+            return None  # "run ls -la" is a shell command
+        if re.search(r'\b(?:ls|dir)\b', user_input, re.IGNORECASE) and \
+                not re.fullmatch(r'\s*(?:ls|dir)\s*', user_input, re.IGNORECASE):
+            return None  # "explain the dir command" is a question
+        return {}
+    
+    def _extract_command(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Extract a shell command from 'run ...' style input"""
+        match = re.match(r'^\s*(?:please\s+)?(?:run|execute|exec)(?:\s+the)?(?:\s+command)?\s+(.+)$', user_input, re.IGNORECASE)
+        return {"command": match.group(1).strip()} if match else None
+    
+    def _extract_diff(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Extract an optional file and --staged/--cached from 'git diff ...' style input"""
+        if self._extract_command(user_input):
+            return None  # "run git diff ..." is a shell command
+        params: Dict[str, Any] = {"staged": bool(re.search(r'\b(?:staged|cached)\b', user_input, re.IGNORECASE))}
+        match = re.search(r'\b(?:diff|changes)\s+(?:of|in|for)?\s*([\w./-]+\.\w+|[\w.-]+/[\w./-]*)', user_input)
+        if match:
+            params["path"] = match.group(1)
+        return params
+    
+    def _extract_symbol(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Extract the symbol name from 'find symbol X' / 'where is class X defined' style input"""
+        quoted = re.search(r'`([A-Za-z_][\w.]*)`', user_input)
+        if quoted:
+            return {"name": quoted.group(1)}
+        filler = {"find", "symbol", "definition", "def", "of", "go", "to", "where", "is", "the", "class", "function",
+                  "method", "defined", "declared", "for", "a", "an", "please"}
+        names = [word for word in re.findall(r'[A-Za-z_][\w.]*', user_input) if word.lower() not in filler]
+        return {"name": names[0]} if names else None
+    
+    def _extract_search(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Extract a search query, and an optional ' in <path>' filter, from 'search for ...' style input"""
+        if self._extract_command(user_input):
+            return None  # "run grep ..." is a shell command
+        match = re.match(
+            r'^\s*(?:please\s+)?(?:search(?:\s+(?:the\s+)?code)?(?:\s+for)?|grep(?:\s+for)?|'
+            r'find\s+(?:all\s+)?(?:usages|uses|occurrences|references)\s+(?:of|to))\s+'
+            r'(?:(regex|pattern)\s+)?(.+?)(?:\s+in\s+([\w./*-]*[/.*][\w./*-]*))?\s*$',
+            user_input, re.IGNORECASE
+        )
+        if not match:
+            return None
+        query = match.group(2).strip()
+        quoted = re.fullmatch(r'([\'"`])(.+)\1', query)
+        if quoted:
+            query = quoted.group(2)
+        params = {"query": query, "regex": bool(match.group(1))}
+        if match.group(3):
+            params["path"] = match.group(3)
+        return params
     
     def _extract_path(self, user_input: str) -> str:
         """Extract path from user input"""
         words = user_input.split()
-        for i, word in enumerate(words):
-            if word in ['to', 'at', 'in', 'folder', 'directory', 'called', 'named'] and i + 1 < len(words):
-                return words[i + 1]
+        # An explicit name wins over "folder"/"directory" ("create a folder called build")
+        for markers in (['called', 'named'], ['to', 'at', 'in', 'folder', 'directory']):
+            for i, word in enumerate(words):
+                if word in markers and i + 1 < len(words):
+                    return words[i + 1]
         # Return last word as fallback
         return words[-1] if words else ""
     
@@ -264,6 +710,10 @@ class CintessaAgent:
     
     def propose_code_changes(self, user_request: str) -> str:
         """Propose code changes with Copilot-style suggestions"""
+        return "".join(self.propose_code_changes_stream(user_request))
+    
+    def propose_code_changes_stream(self, user_request: str) -> Iterator[str]:
+        """Stream a code proposal, storing it once generation completes"""
         # Use LLM to generate code based on user request
         prompt = f"""
         The user requested: "{user_request}"
@@ -274,42 +724,130 @@ class CintessaAgent:
         - Follow Python best practices
         - Include helpful comments
         
-        Provide the code in this format:
+        For a NEW file, provide the whole file in this format:
         FILE: filename.py
         ```python
         # code here
         ```
         
+        To CHANGE an existing file, provide only a unified diff with a few lines of context:
+        FILE: filename.py
+        ```diff
+        @@ -12,3 +12,4 @@
+         unchanged line
+        -removed line
+        +added line
+        ```
+        
         EXPLANATION: Briefly explain what the code does and why it's needed.
         
         If multiple files are needed, provide each in the same format.
         """
-        
-        response = self.ollama_client.generate(
-            prompt, 
-            system_prompt="You are a helpful AI coding assistant. Provide clean, working code with clear explanations. Always specify the filename."
-        )
+        system_prompt = "You are a helpful AI coding assistant. Provide clean, working code with clear explanations. Always specify the filename."
+        # Definitions of symbols the request names go in first, then files it names that no
+        # definition already covers (verbatim, so the model can diff against them), then the
+        # workspace chunks that best match the request
+        self._sync_git()
+        snippets, covered = self._symbol_snippets(user_request)
+        for path, text in self._named_files(user_request):
+            if path not in covered:
+                snippets.append((path, text))
+                covered.add(path)
+        snippets += self._retrieved_chunks(user_request, exclude=covered)
+        prompt = self.context_builder.build(prompt, system_prompt, self.memory, snippets)
         
         # Generate a unique ID for this proposal
         import uuid
         proposal_id = str(uuid.uuid4())[:8]
         
-        # Store the proposal in memory
-        self.pending_changes[proposal_id] = {
-            "user_request": user_request,
-            "code_proposal": response,
-            "timestamp": subprocess.getoutput("date")
-        }
+        # Header goes out before the first token so the UI has something to show
+        yield f"💡 **Code Proposal** (ID: `{proposal_id}`)\\n\\n"
+        yield f"**Request:** {user_request}\\n\\n"
+        yield "---\\n\\n"
         
-        # Format the response with the proposal ID
-        formatted_response = f"💡 **Code Proposal** (ID: `{proposal_id}`)\\n\\n"
-        formatted_response += f"**Request:** {user_request}\\n\\n"
-        formatted_response += "---\\n\\n"
-        formatted_response += response
-        formatted_response += "\\n\\n---\\n\\n"
-        formatted_response += f"🔧 **Use this ID to accept:** `accept {proposal_id}` or `reject {proposal_id}`"
+        chunks = []
+        for chunk in self.ollama_client.generate_stream(prompt, system_prompt=system_prompt, route="codegen"):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
         
-        return formatted_response
+        # Parse once here; accepting and rendering both reuse the structured proposal
+        proposal = parse_proposal(response, proposal_id, user_request, time.strftime("%Y-%m-%d %H:%M:%S"))
+        self.pending_changes[proposal_id] = proposal
+        if self.session_store:
+            self.session_store.save_proposal(self.session_id, proposal)
+        self.last_proposal_id = proposal_id
+        
+        yield "\\n\\n---\\n\\n"
+        yield f"🔧 **Use this ID to accept:** `accept {proposal_id}` or `reject {proposal_id}`"
+    
+    def _named_files(self, text: str) -> List[Tuple[str, str]]:
+        """(path, content) of readable workspace files mentioned by name in text"""
+        if not self.tools.workspace_path:
+            return []
+        
+        files = []
+        for name in dict.fromkeys(re.findall(r'[\w./-]+\.\w+', text)):
+            full_path, error = self.tools._resolve_file(name)
+            if error or full_path.stat().st_size > self.tools.max_read_bytes or is_binary(str(full_path)):
+                continue
+            rel_path = full_path.relative_to(self.tools.workspace_path).as_posix()
+            files.append((rel_path, full_path.read_text(encoding='utf-8', errors='replace')))
+        return files
+    
+    def _symbol_snippets(self, text: str) -> Tuple[List[Tuple[str, str]], Set[str]]:
+        """(label, source) of definitions named in text, and the set of files they come from"""
+        snippets, paths = [], set()
+        if not self.symbols:
+            return snippets, paths
+        limit = self.symbols_config.get('max_snippets', 4)
+        try:
+            for name in dict.fromkeys(re.findall(r'\b[A-Za-z_]\w{2,}(?:\.[A-Za-z_]\w*)*', text)):
+                if not self.symbols.known(name):
+                    continue
+                for definition in self.symbols.definitions(name)[:2]:
+                    if definition.kind == "variable" or len(snippets) >= limit:
+                        continue
+                    label = f"{definition.path} ({definition.qualname}, lines {definition.line}-{definition.end_line})"
+                    snippets.append((label, self.symbols.snippet(definition)))
+                    paths.add(definition.path)
+        except Exception:
+            pass  # the prompt is still useful without definitions
+        return snippets, paths
+    
+    def _retrieved_chunks(self, text: str, exclude: Iterable[str] = ()) -> List[Tuple[str, str]]:
+        """(label, text) of the top BM25 chunks for text, skipping files already included whole"""
+        if not self.retrieval:
+            return []
+        try:
+            chunks = self.retrieval.search(text, self.retrieval_config.get('top_k', 4), exclude)
+        except Exception:
+            return []
+        return [(f"{chunk.path} (lines {chunk.start_line}-{chunk.end_line})", chunk.text) for chunk in chunks]
+    
+    def _chat_prompt(self, question: str) -> str:
+        """Question plus as much history and workspace context as the token budget allows"""
+        return self.context_builder.build(question, CHAT_SYSTEM_PROMPT, self.memory, self._named_files(question))
+    
+    def _chat_request(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        """Prompt and extra generate() arguments for a chat turn, continuing Ollama's context when valid"""
+        if self.llm_contexts is None:
+            return self._chat_prompt(question), {}
+        
+        fingerprint = self.ollama_client.context_fingerprint(CHAT_SYSTEM_PROMPT, route="chat")
+        session_id = self.session_id  # the callback may run on another thread
+        context = self.llm_contexts.get(session_id, fingerprint, self._conversation.turns)
+        next_turn = self._conversation.turns + 1
+        
+        def on_context(tokens: List[int]):
+            self.llm_contexts.put(session_id, tokens, fingerprint, next_turn)
+        
+        if context:
+            # System prompt and earlier turns are already encoded in the context; send only the new turn
+            prompt = self.context_builder.build(question, snippets=self._named_files(question))
+        else:
+            prompt = self._chat_prompt(question)
+        return prompt, {"context": context, "on_context": on_context}
     
     def accept_code_proposal(self, proposal_id: str) -> str:
         """Accept and apply a code proposal"""
@@ -318,26 +856,25 @@ class CintessaAgent:
         
         try:
             proposal = self.pending_changes[proposal_id]
-            code_proposal = proposal["code_proposal"]
+            if not proposal.files:
+                return f"❌ Proposal {proposal_id} does not contain any FILE: blocks to apply"
             
-            # Parse the code proposal to extract files and content
-            files_to_create = self._parse_code_proposal(code_proposal)
+            # Resolve every file's final content first so a bad hunk stops the whole proposal
+            contents, actions, error = self._proposal_contents(proposal)
+            if error:
+                return f"{error}\n\nNothing was changed; proposal {proposal_id} is still pending."
             
-            results = f"✅ **Applying Proposal {proposal_id}**\\n\\n"
+            # Every file lands together or not at all
+            result = self.tools.write_files(contents)
+            if not result.startswith("✅"):
+                return f"{result}\n\nProposal {proposal_id} is still pending."
             
-            for file_info in files_to_create:
-                file_path = file_info["file_path"]
-                content = file_info["content"]
-                
-                # Write the file
-                result = self.tools.write_file(file_path, content)
-                if "Successfully" in result:
-                    results += f"📄 **{file_path}** - Created successfully\\n"
-                else:
-                    results += f"❌ **{file_path}** - Error: {result}\\n"
+            results = f"✅ **Applying Proposal {proposal_id}**\\n\\n"
+            for path, action in actions.items():
+                results += f"📄 **{path}** - {action} successfully\\n"
             
             # Remove from pending changes
-            del self.pending_changes[proposal_id]
+            self._close_proposal(proposal_id, "accepted")
             
             results += "\\n🎉 **Code changes applied!**"
             return results
@@ -345,32 +882,65 @@ class CintessaAgent:
         except Exception as e:
             return f"❌ Error applying code proposal: {e}"
     
-    def _parse_code_proposal(self, code_proposal: str) -> List[Dict[str, str]]:
-        """Parse code proposal into file paths and content"""
-        files = []
+    def _proposal_contents(self, proposal: CodeProposal) -> Tuple[Dict[str, str], Dict[str, str], str]:
+        """Final content of every file a proposal touches, with what happened to each, or an error"""
+        contents: Dict[str, str] = {}
+        actions: Dict[str, str] = {}
+        for proposed in proposal.files:
+            if not proposed.is_patch:
+                path, content = proposed.path, proposed.code
+            elif proposed.path in contents:
+                path = proposed.path
+                try:
+                    content = apply_hunks(contents[path], proposed.patch.hunks)
+                except PatchError as e:
+                    return contents, actions, f"❌ Patch does not apply to {path}: {e}"
+            else:
+                path, content, error = self.tools.patched_content(proposed.path, proposed.patch)
+                if error:
+                    return contents, actions, error
+            contents[path] = content
+            actions.setdefault(path, "Patched" if proposed.is_patch else "Created")
+        return contents, actions, ""
+    
+    def branch_code_proposal(self, proposal_id: str) -> str:
+        """Commit a pending proposal to a scratch branch, leaving the working tree untouched"""
+        if proposal_id not in self.pending_changes:
+            return f"❌ No pending proposal found with ID: {proposal_id}"
+        if not self.git:
+            return "❌ Error: The workspace is not inside a git repository."
         
-        # Split by FILE: sections
-        sections = code_proposal.split('FILE:')
-        for section in sections[1:]:  # Skip first empty section
-            if '```' in section:
-                # Extract filename and code
-                lines = section.strip().split('\\n')
-                filename = lines[0].strip()
-                # Find code between ```
-                code_start = section.find('```')
-                code_end = section.find('```', code_start + 3)
-                if code_start != -1 and code_end != -1:
-                    code_content = section[code_start + 3:code_end].strip()
-                    # Remove language specifier if present
-                    if code_content.startswith('python'):
-                        code_content = code_content[6:].strip()
-                    
-                    files.append({
-                        "file_path": filename,
-                        "content": code_content
-                    })
+        proposal = self.pending_changes[proposal_id]
+        if not proposal.files:
+            return f"❌ Proposal {proposal_id} does not contain any FILE: blocks to apply"
+        contents, actions, error = self._proposal_contents(proposal)
+        if error:
+            return f"{error}\n\nNothing was committed; proposal {proposal_id} is still pending."
         
-        return files
+        branch = self.git.scratch_branch(proposal_id)
+        try:
+            commit = self.git.commit_to_branch(
+                contents, f"Cintessa proposal {proposal_id}: {proposal.user_request[:60]}", branch
+            )
+        except Exception as e:
+            return f"❌ Error committing proposal to {branch}: {e}"
+        files = "\n".join(f"📄 **{path}** - {action}" for path, action in actions.items())
+        return (f"🌿 **Proposal {proposal_id} committed to `{branch}`** ({commit[:8]})\n\n{files}\n\n"
+                f"Your working tree is unchanged. Review with `git diff HEAD {branch}`, "
+                f"or `accept {proposal_id}` to apply it here.")
+    
+    def _close_proposal(self, proposal_id: str, status: str):
+        """Drop a proposal from the pending set and record how it ended"""
+        del self.pending_changes[proposal_id]
+        if self.session_store:
+            self.session_store.set_proposal_status(proposal_id, status)
+    
+    def get_proposal(self, proposal_id: str) -> Optional[CodeProposal]:
+        """Pending proposal by ID, falling back to the session store for closed ones"""
+        proposal = self.pending_changes.get(proposal_id)
+        if proposal is None and self.session_store:
+            proposal = self.session_store.get_proposal(proposal_id)
+        return proposal
     
     def show_help(self) -> str:
         """Show help information"""
@@ -394,6 +964,10 @@ class CintessaAgent:
 📄 **File Operations (requires workspace):**
 - "list files" - Show files in workspace
 - "read file [filename]" - Read a file
+- "git status" / "git diff [file]" - Changed files and diffs (git workspaces)
+- "branch [id]" - Commit a proposal to a scratch branch instead of applying it
+- "find symbol [name]" - Where a Python class or function is defined and used
+- "search for [text] in [dir or *.py]" - Search file contents ("search regex [pattern]" for regex)
 - "create file [filename]" - Create a new file
 
 🔧 **System Commands:**
@@ -421,6 +995,17 @@ class CintessaAgent:
             
             elif action == "read_file":
                 file_path = params.get("file_path", "")
+                if any(key in params for key in ("start_line", "num_lines", "mode")):
+                    page, error = self.tools.read_file_page(
+                        file_path,
+                        int(params.get("start_line", 1)),
+                        int(params.get("num_lines", 200)),
+                        params.get("mode", "lines")
+                    )
+                    if error:
+                        return error
+                    total = page.total_lines if page.total_lines is not None else "?"
+                    return f"📄 **{file_path}** (lines {page.start_line}-{page.end_line} of {total}):\\n\\n```\\n{page.text}\\n```"
                 content = self.tools.read_file(file_path)
                 return f"📄 **Content of {file_path}:**\\n\\n```\\n{content}\\n```"
             
@@ -431,7 +1016,7 @@ class CintessaAgent:
                 )
             
             elif action == "run_command":
-                code, out, err = self.tools.run_shell(params.get("command", ""))
+                code, out, err = self.tools.run_shell(params.get("command", ""), session_id=self.session_id)
                 result = f"💲 **Command:** `{params.get('command', '')}`\\n"
                 result += f"📟 **Exit code:** {code}\\n\\n"
                 if out:
@@ -443,9 +1028,32 @@ class CintessaAgent:
             elif action == "list_files":
                 files = self.tools.list_workspace(params.get("path"))
                 if files and "ℹ️" not in files[0]:
-                    return f"📁 **Files in workspace:**\\n\\n" + "\\n".join([f"  - {f}" for f in sorted(files)[:50]]) + f"\\n\\n... and {len(files) - 50} more files"
+                    # Only the first 50 are shown, so avoid sorting the whole listing
+                    shown = heapq.nsmallest(50, files)
+                    result = f"📁 **Files in workspace:**\\n\\n" + "\\n".join([f"  - {f}" for f in shown])
+                    if len(files) > len(shown):
+                        result += f"\\n\\n... and {len(files) - len(shown)} more files"
+                    return result
                 return "\\n".join(files) if files else "📁 No files found in workspace"
             
+            elif action == "git_status":
+                return self.git_status()
+            
+            elif action == "git_diff":
+                return self.git_diff(params.get("path"), bool(params.get("staged", False)))
+            
+            elif action == "find_symbol":
+                return self.find_symbol(params.get("name", ""))
+            
+            elif action == "search_code":
+                return self.search_code(
+                    params.get("query", ""),
+                    bool(params.get("regex", False)),
+                    params.get("path"),
+                    bool(params.get("ignore_case", False)),
+                    params.get("max_results")
+                )
+            
             elif action == "propose_code":
                 return self.propose_code_changes(params.get("user_request", ""))
             
@@ -464,10 +1072,8 @@ class CintessaAgent:
             
             elif action == "ask_question":
                 # Use LLM to answer general questions
-                return self.ollama_client.generate(
-                    params.get("question", ""),
-                    system_prompt="You are Cintessa, a friendly and helpful AI coding assistant. Be conversational and helpful. If the user mentions creating files or directories, offer to help with that."
-                )
+                prompt, extra = self._chat_request(params.get("question", ""))
+                return self.ollama_client.generate(prompt, system_prompt=CHAT_SYSTEM_PROMPT, route="chat", **extra)
             
             else:
                 return f"❌ Unknown action: {action}"
@@ -475,52 +1081,438 @@ class CintessaAgent:
         except Exception as e:
             return f"❌ Error executing action: {e}"
     
-    def chat(self, message: str) -> str:
-        """High-level chat interface"""
-        # Check for accept/reject commands
+    def execute_action_stream(self, action: str, params: Dict[str, Any]) -> Iterator[str]:
+        """Execute the parsed action, streaming LLM-backed output as it arrives"""
+        try:
+            if action == "propose_code":
+                yield from self.propose_code_changes_stream(params.get("user_request", ""))
+            
+            elif action == "run_command":
+                command = params.get("command", "")
+                job = self.tools.start_shell(command, session_id=self.session_id)
+                yield f"💲 **Command:** `{command}`\\n\\n```\\n"
+                for stream, line in self.tools.runner.stream(job):
+                    if line is None:
+                        yield ""  # still running quietly; lets the UI redraw
+                    elif stream == "stdout":
+                        yield line
+                    else:
+                        yield f"🔴 {line}"
+                yield f"\\n```\\n📟 **Exit code:** {job.returncode}"
+            
+            elif action == "ask_question":
+                prompt, extra = self._chat_request(params.get("question", ""))
+                yield from self.ollama_client.generate_stream(prompt, system_prompt=CHAT_SYSTEM_PROMPT, route="chat", **extra)
+            
+            else:
+                # Non-LLM actions complete in one piece
+                yield self.execute_action(action, params)
+                
+        except Exception as e:
+            yield f"❌ Error executing action: {e}"
+    
+    def _handle_proposal_command(self, message: str) -> Optional[str]:
+        """Handle accept/reject commands, returning None for anything else"""
         if message.lower().startswith('accept '):
             proposal_id = message.split(' ')[1]
             return self.accept_code_proposal(proposal_id)
         elif message.lower().startswith('reject '):
             proposal_id = message.split(' ')[1]
-            if proposal_id in self.pending_changes:
-                del self.pending_changes[proposal_id]
-                return f"❌ **Proposal {proposal_id} rejected and discarded.**"
-            else:
-                return f"❌ No pending proposal found with ID: {proposal_id}"
+            return self.reject_code_proposal(proposal_id)
+        elif message.lower().startswith('branch ') and message.split(' ')[1] in self.pending_changes:
+            return self.branch_code_proposal(message.split(' ')[1])
+        return None
+    
+    def reject_code_proposal(self, proposal_id: str) -> str:
+        """Discard a pending code proposal"""
+        if proposal_id in self.pending_changes:
+            self._close_proposal(proposal_id, "rejected")
+            return f"❌ **Proposal {proposal_id} rejected and discarded.**"
+        else:
+            return f"❌ No pending proposal found with ID: {proposal_id}"
+    
+    def _remember(self, message: str, action: str, params: Dict[str, Any], result: str):
+        """Record a turn in the in-memory window and the session store"""
+        turn = {"input": message, "action": action, "params": params, "result": result}
+        self._conversation.turns += 1
+        self.memory.append(turn)
+        if self.session_store:
+            self.session_store.append_turn(self.session_id, turn)
+    
+    def chat(self, message: str) -> str:
+        """High-level chat interface"""
+        self.last_proposal_id = None
+        # Check for accept/reject commands
+        handled = self._handle_proposal_command(message)
+        if handled is not None:
+            return handled
         
         # Normal command processing
         action, params = self.parse_command(message)
         result = self.execute_action(action, params)
         
         # Store in memory
-        self.memory.append({
-            "input": message,
-            "action": action,
-            "params": params,
-            "result": result
-        })
+        self._remember(message, action, params, result)
         
         return result
+    
+    def chat_stream(self, message: str) -> Iterator[str]:
+        """High-level chat interface yielding the response incrementally"""
+        self.last_proposal_id = None
+        handled = self._handle_proposal_command(message)
+        if handled is not None:
+            yield handled
+            return
+        
+        action, params = self.parse_command(message)
+        chunks = []
+        for chunk in self.execute_action_stream(action, params):
+            chunks.append(chunk)
+            yield chunk
+        
+        # Store in memory once the full response is known
+        self._remember(message, action, params, "".join(chunks))
+
+    async def _run_blocking(self, executor: ThreadPoolExecutor, func: Callable, *args) -> Any:
+        """Run a blocking callable on one of the bounded executors"""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context so the work sees the session achat() selected
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, func, *args))
+    
+    async def aparse_command(self, user_input: str) -> Tuple[str, Dict[str, Any]]:
+        """Async parse_command; the local tiers run inline, the LLM fallback is awaited"""
+        result = self.intent_engine.classify(user_input)
+        if result.tier != "llm":
+            self.last_intent = result
+            return result.action, result.params
+        
+        response = await self.async_ollama_client.generate(
+            self._parser_prompt(user_input), system_prompt=PARSER_SYSTEM_PROMPT, route="parser"
+        )
+        return self._interpret_parser_response(user_input, response, result)
+    
+    async def aexecute_action(self, action: str, params: Dict[str, Any]) -> str:
+        """Async execute_action that offloads shell, file and LLM work to bounded pools"""
+        try:
+            if action == "ask_question":
+                prompt, extra = await self._run_blocking(self._io_executor, self._chat_request, params.get("question", ""))
+                return await self.async_ollama_client.generate(prompt, system_prompt=CHAT_SYSTEM_PROMPT, route="chat", **extra)
+            
+            elif action == "propose_code":
+                return await self.async_ollama_client.run(self.propose_code_changes, params.get("user_request", ""))
+            
+            elif action == "run_command":
+                return await self._run_blocking(self._shell_executor, self.execute_action, action, params)
+            
+            else:
+                return await self._run_blocking(self._io_executor, self.execute_action, action, params)
+                
+        except Exception as e:
+            return f"❌ Error executing action: {e}"
+    
+    async def achat(self, message: str, session_id: str = None) -> str:
+        """Async chat interface; concurrent calls for different session_ids keep separate conversations"""
+        token = self._current_conversation.set(self.conversation(session_id)) if session_id else None
+        try:
+            handled = await self._run_blocking(self._io_executor, self._handle_proposal_command, message)
+            if handled is not None:
+                return handled
+            
+            action, params = await self.aparse_command(message)
+            result = await self.aexecute_action(action, params)
+            
+            self._remember(message, action, params, result)
+            
+            return result
+        finally:
+            if token is not None:
+                self._current_conversation.reset(token)
+    
+    def shutdown(self):
+        """Release HTTP connections and close the indexes; the shared worker pools keep running"""
+        self.async_ollama_client.shutdown()
+        self.ollama_client.close()
+        if self.session_store:
+            self.session_store.close()
+        for index in (self.retrieval, self.code_search, self.symbols):
+            if index:
+                index.close()
+        self.retrieval = self.code_search = self.symbols = None
+
+class ModelRoute(NamedTuple):
+    """Models to try for one kind of task, in order, with the options to send them"""
+    models: List[str]
+    options: Dict[str, Any]
+    keep_alive: Optional[str] = None
+
+class ModelNotFound(Exception):
+    """Ollama answered 404 for a model that has not been pulled"""
 
 class OllamaClient:
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen2:7b"):
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen2:7b",
+                 connect_timeout: float = 5.0, read_timeout: float = 120.0,
+                 pool_connections: int = 4, pool_maxsize: int = 10,
+                 max_retries: int = 3, backoff_factor: float = 0.5,
+                 options: Dict[str, Any] = None, cache: ResponseCache = None,
+                 routes: Dict[str, ModelRoute] = None):
         self.base_url = base_url
         self.model = model
+        self.options = options or {}
+        self.cache = cache
+        self.routes = routes or {}
+        # Models Ollama reported as not installed; routes skip them until the warm-up thread sees
+        # them in /api/tags again, or reset_models()
+        self.missing_models: set = set()
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self._create_session(pool_connections, pool_maxsize, max_retries, backoff_factor)
     
-    def generate(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate response using Ollama"""
-        try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False
-            }
-            if system_prompt:
-                payload["system"] = system_prompt
+    @classmethod
+    def from_config(cls, ollama_config: Dict[str, Any], cache: ResponseCache = None) -> "OllamaClient":
+        """Build a client from the 'ollama' section of config.yaml"""
+        options = {}
+        for option in ('temperature', 'num_ctx'):
+            if option in ollama_config:
+                options[option] = ollama_config[option]
+        model = ollama_config.get('model', 'qwen2:7b')
+        routes = {}
+        for name, route_config in (ollama_config.get('routes') or {}).items():
+            models = route_config.get('models') or [route_config.get('model', model)]
+            routes[name] = ModelRoute(
+                list(models),
+                {**options, **(route_config.get('options') or {})},
+                route_config.get('keep_alive')
+            )
+        return cls(
+            ollama_config.get('base_url', 'http://localhost:11434'),
+            model,
+            connect_timeout=ollama_config.get('connect_timeout', 5.0),
+            read_timeout=ollama_config.get('read_timeout', 120.0),
+            pool_connections=ollama_config.get('pool_connections', 4),
+            pool_maxsize=ollama_config.get('pool_maxsize', 10),
+            max_retries=ollama_config.get('max_retries', 3),
+            backoff_factor=ollama_config.get('backoff_factor', 0.5),
+            options=options,
+            cache=cache,
+            routes=routes
+        )
+    
+    def _create_session(self, pool_connections: int, pool_maxsize: int,
+                        max_retries: int, backoff_factor: float) -> requests.Session:
+        """Create a keep-alive session that retries only on connection failures"""
+        # Retrying after the request was sent would re-run generation, so only
+        # connect errors are retried (they happen before Ollama sees anything)
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=backoff_factor,
+            allowed_methods=None,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+    
+    def route(self, name: str = None) -> ModelRoute:
+        """The route for a task; unknown or unset names use the default model and options"""
+        return self.routes.get(name) or ModelRoute([self.model], self.options)
+    
+    def candidates(self, route: ModelRoute) -> List[str]:
+        """Route models in order, skipping ones known to be missing (all of them if every one is)"""
+        available = [model for model in route.models if model not in self.missing_models]
+        return available or list(route.models)
+    
+    def reset_models(self):
+        """Forget which models were missing, e.g. after an `ollama pull`"""
+        self.missing_models.clear()
+    
+    def _payload(self, prompt: str, system_prompt: str, stream: bool, context: List[int] = None,
+                 model: str = None, route: ModelRoute = None) -> Dict[str, Any]:
+        """Build an /api/generate request body"""
+        route = route or self.route()
+        payload = {
+            "model": model or route.models[0],
+            "prompt": prompt,
+            "stream": stream
+        }
+        if system_prompt:
+            payload["system"] = system_prompt
+        if route.options:
+            payload["options"] = route.options
+        if route.keep_alive is not None:
+            payload["keep_alive"] = route.keep_alive
+        if context:
+            payload["context"] = context
+        return payload
+    
+    def context_fingerprint(self, system_prompt: str = None, route: str = None) -> str:
+        """Identity a returned context is valid for: the model the route resolves to, and its options"""
+        spec = self.route(route)
+        return ContextHandles.fingerprint(self.candidates(spec)[0], system_prompt, spec.options)
+    
+    def _cache_key(self, prompt: str, system_prompt: str, model: str, options: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a request, or None when caching is disabled"""
+        if self.cache is None:
+            return None
+        return ResponseCache.make_key(model, system_prompt, prompt, options)
+    
+    def _check_model(self, response: requests.Response, model: str):
+        """Record and raise for a model Ollama does not have"""
+        if response.status_code == 404:
+            self.missing_models.add(model)
+            raise ModelNotFound(model)
+    
+    def load_model(self, model: str, keep_alive: str = None) -> Optional[float]:
+        """Load a model into memory with an empty prompt; seconds taken, or None if it is not installed"""
+        payload = {"model": model, "prompt": "", "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        started = time.time()
+        response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+        if response.status_code == 404:
+            self.missing_models.add(model)
+            return None
+        response.raise_for_status()
+        return time.time() - started
+    
+    def _not_installed(self, route: ModelRoute) -> str:
+        return (f"❌ None of these Ollama models are installed: {', '.join(route.models)}. "
+                f"Pull one with `ollama pull {route.models[0]}`.")
+    
+    def generate(self, prompt: str, system_prompt: str = None, use_cache: bool = True,
+                 context: List[int] = None, on_context: Callable[[List[int]], None] = None,
+                 route: str = None) -> str:
+        """Generate response using Ollama; on_context receives the context array Ollama returns"""
+        spec = self.route(route)
+        for model in self.candidates(spec):
+            # A reply continuing a context depends on more than the prompt, so it is never cached
+            cache_key = self._cache_key(prompt, system_prompt, model, spec.options) if use_cache and not context else None
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            response = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json().get("response", "No response from Ollama")
-        except Exception as e:
-            return f"❌ Error connecting to Ollama: {e}. Make sure Ollama is running and the model is installed."
+            try:
+                payload = self._payload(prompt, system_prompt, False, context, model, spec)
+                response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+                self._check_model(response, model)
+                response.raise_for_status()
+                body = response.json()
+                text = body.get("response", "No response from Ollama")
+                if on_context and body.get("context"):
+                    on_context(body["context"])
+            except ModelNotFound:
+                continue  # fall back to the route's next model
+            except Exception as e:
+                return f"❌ Error connecting to Ollama: {e}. Make sure Ollama is running and the model is installed."
+            
+            if cache_key:
+                self.cache.put(cache_key, text)
+            return text
+        return self._not_installed(spec)
+    
+    def generate_stream(self, prompt: str, system_prompt: str = None, use_cache: bool = True,
+                        context: List[int] = None, on_context: Callable[[List[int]], None] = None,
+                        route: str = None) -> Iterator[str]:
+        """Stream response tokens from Ollama as they are generated"""
+        spec = self.route(route)
+        for model in self.candidates(spec):
+            cache_key = self._cache_key(prompt, system_prompt, model, spec.options) if use_cache and not context else None
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    yield cached
+                    return
+            
+            payload = self._payload(prompt, system_prompt, True, context, model, spec)
+            chunks = []
+            try:
+                with self.session.post(f"{self.base_url}/api/generate", json=payload, stream=True, timeout=self.timeout) as response:
+                    # A missing model is reported before any token, so falling back is invisible to the caller
+                    self._check_model(response, model)
+                    response.raise_for_status()
+                    # Ollama streams one JSON object per line (NDJSON)
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            yield f"❌ Ollama error: {chunk['error']}"
+                            return
+                        if chunk.get("response"):
+                            chunks.append(chunk["response"])
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            # The final message carries the context for continuing this conversation
+                            if on_context and chunk.get("context"):
+                                on_context(chunk["context"])
+                            break
+            except ModelNotFound:
+                continue
+            except Exception as e:
+                yield f"❌ Error connecting to Ollama: {e}. Make sure Ollama is running and the model is installed."
+                return
+            
+            # Only complete generations are cached
+            if cache_key:
+                self.cache.put(cache_key, "".join(chunks))
+            return
+        yield self._not_installed(spec)
+
+class AsyncOllamaClient:
+    """asyncio front-end for OllamaClient sharing its pooled session and cache"""
+    
+    def __init__(self, client: OllamaClient, max_concurrency: int = 8, executor: ThreadPoolExecutor = None):
+        self.client = client
+        # The pool size caps concurrent in-flight generations; pass a shared pool to cap them across agents
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="cintessa-llm")
+    
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run an LLM-bound blocking callable on the client's pool, in the caller's context"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+    
+    async def generate(self, prompt: str, system_prompt: str = None, use_cache: bool = True,
+                       context: List[int] = None, on_context: Callable[[List[int]], None] = None,
+                       route: str = None) -> str:
+        """Async generate"""
+        return await self.run(self.client.generate, prompt, system_prompt, use_cache, context, on_context, route)
+    
+    async def generate_stream(self, prompt: str, system_prompt: str = None, use_cache: bool = True,
+                              context: List[int] = None, on_context: Callable[[List[int]], None] = None,
+                              route: str = None) -> AsyncIterator[str]:
+        """Async iterator over streamed tokens"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        def pump():
+            try:
+                for chunk in self.client.generate_stream(prompt, system_prompt, use_cache, context, on_context, route):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+        
+        future = loop.run_in_executor(self._executor, pump)
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+        await future
+    
+    def shutdown(self):
+        """Stop the worker pool unless it is a shared one"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,141 @@
+import mmap
+import os
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+BINARY_SNIFF_BYTES = 8192
+LINE_CHECKPOINT = 1000
+COUNT_BLOCK_BYTES = 1 << 20
+
+
+class FilePage(NamedTuple):
+    text: str
+    start_line: int          # 1-based, inclusive
+    end_line: int            # 1-based, inclusive; start_line - 1 for an empty page
+    total_lines: Optional[int]  # None until the pager has seen the end of the file
+    eof: bool
+
+
+def is_binary(path: str) -> bool:
+    """Guess whether a file is binary from its first few KB"""
+    with open(path, 'rb') as f:
+        chunk = f.read(BINARY_SNIFF_BYTES)
+    if b'\0' in chunk:
+        return True
+    try:
+        chunk.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the sniff boundary is still text
+        return e.start < len(chunk) - 3
+    return False
+
+
+def read_bytes(path: str, offset: int = 0, length: int = 65536) -> str:
+    """Decode a byte range of a file"""
+    with open(path, 'rb') as f:
+        f.seek(max(offset, 0))
+        return f.read(length).decode('utf-8', errors='replace')
+
+
+class LinePager:
+    """Random access to a file by line number via mmap and a sparse line-offset index"""
+
+    def __init__(self, path: str):
+        self.path = path
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        # Byte offset of line k * LINE_CHECKPOINT (0-based), filled in as far as pages are requested
+        self._checkpoints: List[int] = [0]
+        self.total_lines: Optional[int] = 0 if self.size == 0 else None
+
+    def is_stale(self) -> bool:
+        """True if the file changed since the offsets were computed"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return stat.st_size != self.size or stat.st_mtime != self.mtime
+
+    def _advance(self, mm: mmap.mmap, offset: int, lines: int) -> int:
+        """Byte offset `lines` lines after `offset` (or the file size)"""
+        for _ in range(lines):
+            newline = mm.find(b'\n', offset)
+            if newline == -1:
+                return self.size
+            offset = newline + 1
+        return offset
+
+    def _offset_of_line(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset where 0-based line `line` starts, extending checkpoints as needed"""
+        target = line // LINE_CHECKPOINT
+        while len(self._checkpoints) <= target:
+            offset = self._advance(mm, self._checkpoints[-1], LINE_CHECKPOINT)
+            if offset >= self.size:
+                break
+            self._checkpoints.append(offset)
+        base = min(target, len(self._checkpoints) - 1)
+        return self._advance(mm, self._checkpoints[base], line - base * LINE_CHECKPOINT)
+
+    def _count_lines(self, mm: mmap.mmap) -> int:
+        """Total line count, counting newlines in large blocks"""
+        if self.total_lines is None:
+            newlines = 0
+            for offset in range(0, self.size, COUNT_BLOCK_BYTES):
+                newlines += mm[offset:offset + COUNT_BLOCK_BYTES].count(b'\n')
+            # A final line without a trailing newline still counts
+            self.total_lines = newlines + (0 if mm[self.size - 1:self.size] == b'\n' else 1)
+        return self.total_lines
+
+    def read_lines(self, start_line: int = 1, num_lines: int = 200) -> FilePage:
+        """Lines start_line .. start_line + num_lines - 1 (1-based)"""
+        start_line = max(start_line, 1)
+        if self.size == 0:
+            return FilePage("", 1, 0, 0, True)
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            begin = self._offset_of_line(mm, start_line - 1)
+            end = self._advance(mm, begin, num_lines)
+            text = mm[begin:end].decode('utf-8', errors='replace')
+            eof = end >= self.size
+            if eof:
+                self._count_lines(mm)
+        returned = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+        return FilePage(text, start_line, start_line + returned - 1, self.total_lines, eof)
+
+    def tail(self, num_lines: int = 200) -> FilePage:
+        """The last num_lines lines, found by scanning backwards from the end"""
+        if self.size == 0:
+            return FilePage("", 1, 0, 0, True)
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # A trailing newline terminates the last line rather than starting a new one
+            position = self.size - 1 if mm[self.size - 1:self.size] == b'\n' else self.size
+            begin = 0
+            for _ in range(num_lines):
+                newline = mm.rfind(b'\n', 0, position)
+                if newline == -1:
+                    begin = 0
+                    break
+                begin = newline + 1
+                position = newline
+            text = mm[begin:self.size].decode('utf-8', errors='replace')
+            total = self._count_lines(mm)
+        returned = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+        return FilePage(text, total - returned + 1, total, total, True)
+
+
+class PagerCache:
+    """Small LRU of LinePagers so repeated paging reuses computed line offsets"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._pagers: "OrderedDict[str, LinePager]" = OrderedDict()
+
+    def get(self, path: str) -> LinePager:
+        pager = self._pagers.get(path)
+        if pager is None or pager.is_stale():
+            pager = LinePager(path)
+            self._pagers[path] = pager
+        self._pagers.move_to_end(path)
+        while len(self._pagers) > self.max_entries:
+            self._pagers.popitem(last=False)
+        return pager
@@ -0,0 +1,98 @@
+import os
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .index import IgnoreRules
+
+
+class TreeRow(NamedTuple):
+    depth: int
+    path: str
+    name: str
+    is_dir: bool
+
+
+class FileTree:
+    """Lazily expanded directory tree; each directory is listed on demand and cached by mtime"""
+
+    def __init__(self, root: str, ignore: List[str] = None):
+        self.root = os.path.abspath(root)
+        self.rules = IgnoreRules(self.root, ignore)
+        self._cache: Dict[str, Tuple[float, List[str], List[str]]] = {}
+        self.expanded: Set[str] = {""}
+
+    def _load(self, rel: str) -> Optional[Tuple[float, List[str], List[str]]]:
+        """List one directory with os.scandir"""
+        path = os.path.join(self.root, rel) if rel else self.root
+        dirs, files = [], []
+        try:
+            mtime = os.stat(path).st_mtime
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    child = os.path.join(rel, entry.name) if rel else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if self.rules.ignored(child, is_dir):
+                        continue
+                    (dirs if is_dir else files).append(entry.name)
+        except OSError:
+            return None
+        dirs.sort()
+        files.sort()
+        return mtime, dirs, files
+
+    def children(self, rel: str = "") -> Tuple[List[str], List[str]]:
+        """Sorted (directories, files) directly inside a directory"""
+        entry = self._cache.get(rel)
+        if entry is None:
+            entry = self._load(rel)
+            if entry is None:
+                return [], []
+            self._cache[rel] = entry
+        return entry[1], entry[2]
+
+    def toggle(self, rel: str):
+        """Expand a collapsed directory or collapse an expanded one"""
+        if rel in self.expanded:
+            self.expanded.discard(rel)
+        else:
+            self.expanded.add(rel)
+
+    def refresh(self) -> int:
+        """Re-list only cached directories whose mtime changed; returns how many were reloaded"""
+        reloaded = 0
+        for rel, (mtime, _, _) in list(self._cache.items()):
+            try:
+                current = os.stat(os.path.join(self.root, rel) if rel else self.root).st_mtime
+            except OSError:
+                current = None
+            if current == mtime:
+                continue
+            entry = self._load(rel) if current is not None else None
+            if entry is None:
+                self._cache.pop(rel, None)
+                self.expanded.discard(rel)
+            else:
+                self._cache[rel] = entry
+            reloaded += 1
+        return reloaded
+
+    def rows(self, max_depth: int = None, max_files: int = None) -> List[TreeRow]:
+        """Visible rows: only expanded directories are descended into"""
+        result = []
+        self._collect("", 0, result, max_depth, max_files)
+        return result
+
+    def _collect(self, rel: str, depth: int, result: List[TreeRow], max_depth: Optional[int],
+                 max_files: Optional[int]):
+        dirs, files = self.children(rel)
+        for name in dirs:
+            child = os.path.join(rel, name) if rel else name
+            result.append(TreeRow(depth, child, name, True))
+            # Prune before descending so deep directories are never listed
+            if child in self.expanded and (max_depth is None or depth + 1 < max_depth):
+                self._collect(child, depth + 1, result, max_depth, max_files)
+        for name in files[:max_files]:
+            result.append(TreeRow(depth, os.path.join(rel, name) if rel else name, name, False))
+
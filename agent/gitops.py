@@ -0,0 +1,198 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    import git
+    from gitdb.base import IStream
+except ImportError:  # gitpython is optional; without it the git features are simply unavailable
+    git = None
+
+SCRATCH_PREFIX = "cintessa/"
+
+
+class FileStatus(NamedTuple):
+    path: str  # relative to the workspace
+    index: str  # porcelain status letters, e.g. "M", "A", "D", "R", "?"
+    worktree: str
+
+    @property
+    def deleted(self) -> bool:
+        return "D" in (self.index, self.worktree)
+
+
+class GitWorkspace:
+    """Git state of a workspace, with status and diffs cached until the repository changes.
+
+    A status is reused while HEAD, the mtime of .git/index and the count of
+    writes made through the tools are all unchanged, and it is younger than
+    `ttl` seconds (the ttl catches edits made outside the agent). Proposals can
+    be committed to a scratch branch through plumbing commands and a temporary
+    index, so neither the working tree nor the user's staging area is touched.
+    """
+
+    def __init__(self, repo: "git.Repo", workspace_root: str, ttl: float = 2.0):
+        self.repo = repo
+        self.ttl = ttl
+        self.git_dir = repo.git_dir
+        self.top = os.path.realpath(repo.working_tree_dir)
+        prefix = os.path.relpath(os.path.realpath(workspace_root), self.top)
+        self.prefix = "" if prefix == "." else prefix.replace(os.sep, "/") + "/"
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._status_key: Optional[Tuple] = None
+        self._status_time = 0.0
+        self._status: List[FileStatus] = []
+        self._diffs: Dict[Tuple, str] = {}
+        self._synced_key: Optional[Tuple] = None
+        self._synced_paths: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, workspace_root: str, ttl: float = 2.0) -> Optional["GitWorkspace"]:
+        """The repository containing workspace_root, or None without git or gitpython"""
+        if git is None:
+            return None
+        try:
+            repo = git.Repo(workspace_root, search_parent_directories=True)
+        except (git.InvalidGitRepositoryError, git.NoSuchPathError, git.GitCommandNotFound):
+            return None
+        if repo.bare:
+            return None
+        return cls(repo, workspace_root, ttl)
+
+    def head(self) -> Optional[str]:
+        """Commit id of HEAD, or None in a repository without commits"""
+        try:
+            return self.repo.head.commit.hexsha
+        except ValueError:
+            return None
+
+    def branch(self) -> str:
+        try:
+            return self.repo.active_branch.name
+        except TypeError:
+            return "(detached HEAD)"
+
+    def _key(self) -> Tuple:
+        """What a cached status or diff depends on"""
+        try:
+            index_mtime = os.stat(os.path.join(self.git_dir, "index")).st_mtime_ns
+        except OSError:
+            index_mtime = 0
+        return self.head(), index_mtime, self._generation
+
+    def touch(self, paths: List[str] = ()):
+        """Note a write made through the tools so the next status is recomputed"""
+        with self._lock:
+            self._generation += 1
+
+    def _workspace_path(self, repo_path: str) -> Optional[str]:
+        if not repo_path.startswith(self.prefix):
+            return None
+        return repo_path[len(self.prefix):]
+
+    def status(self) -> List[FileStatus]:
+        """Changed, staged and untracked files inside the workspace"""
+        key = self._key()
+        with self._lock:
+            if key == self._status_key and time.monotonic() - self._status_time < self.ttl:
+                self.hits += 1
+                return self._status
+        self.misses += 1
+        output = self.repo.git.status("--porcelain=v1", "-z", "--untracked-files=all", "--", self.prefix or ".")
+        entries = output.split("\0")
+        statuses = []
+        i = 0
+        while i < len(entries):
+            entry = entries[i]
+            i += 1
+            if len(entry) < 4:
+                continue
+            index, worktree, path = entry[0], entry[1], entry[3:]
+            if index in "RC":
+                i += 1  # the entry after a rename holds the old path
+            path = self._workspace_path(path)
+            if path is not None:
+                statuses.append(FileStatus(path, index.strip(), worktree.strip()))
+        with self._lock:
+            self._status, self._status_key, self._status_time = statuses, key, time.monotonic()
+            self._diffs.clear()
+        return statuses
+
+    def changed_files(self) -> List[str]:
+        """Workspace paths with staged, unstaged or untracked changes that still exist"""
+        return [status.path for status in self.status() if not status.deleted]
+
+    def diff(self, path: str = None, staged: bool = False) -> str:
+        """Unified diff of the working tree (or the index when staged) against HEAD"""
+        self.status()  # refreshes the key and clears stale diffs
+        cache_key = (path, staged)
+        with self._lock:
+            if cache_key in self._diffs:
+                self.hits += 1
+                return self._diffs[cache_key]
+        args = ["--cached"] if staged else []
+        if self.head() is None and not staged:
+            return ""
+        text = self.repo.git.diff(*args, "--", self.prefix + path if path else (self.prefix or "."))
+        with self._lock:
+            self._diffs[cache_key] = text
+        return text
+
+    def changes_since_sync(self) -> List[str]:
+        """Workspace paths that may have changed since the previous call, for incremental re-indexing.
+
+        Covers files whose status changed and, when HEAD moved (a checkout,
+        pull or commit), every file that differs between the two commits.
+        """
+        key = self._key()
+        if key == self._synced_key and time.monotonic() - self._status_time < self.ttl:
+            return []
+        previous_key, previous = self._synced_key, self._synced_paths
+        current = {status.path for status in self.status()}
+        paths = current | previous
+        if previous_key is not None and previous_key[0] != key[0] and previous_key[0] and key[0]:
+            names = self.repo.git.diff("--name-only", previous_key[0], key[0], "--", self.prefix or ".")
+            paths.update(p for p in map(self._workspace_path, names.splitlines()) if p is not None)
+        self._synced_key, self._synced_paths = key, current
+        return sorted(paths) if previous_key is not None else []
+
+    def commit_to_branch(self, files: Dict[str, str], message: str, branch: str) -> str:
+        """Commit files on top of HEAD as `branch` without touching the working tree or index; returns the commit id"""
+        head = self.head()
+        handle, index_file = tempfile.mkstemp(prefix="cintessa-index-", dir=self.git_dir)
+        os.close(handle)
+        os.unlink(index_file)  # git wants to create the index itself
+        env = {"GIT_INDEX_FILE": index_file}
+        try:
+            if head:
+                self.repo.git.read_tree(head, env=env)
+            for rel_path, content in files.items():
+                repo_path = self.prefix + rel_path.replace(os.sep, "/")
+                data = content.encode('utf-8')
+                blob = self.repo.odb.store(IStream("blob", len(data), BytesIO(data))).hexsha.decode("ascii")
+                full_path = os.path.join(self.top, repo_path)
+                mode = "100755" if os.access(full_path, os.X_OK) and os.path.isfile(full_path) else "100644"
+                self.repo.git.update_index("--add", "--cacheinfo", f"{mode},{blob},{repo_path}", env=env)
+            tree = self.repo.git.write_tree(env=env)
+            parents = ["-p", head] if head else []
+            commit = self.repo.git.commit_tree(tree, *parents, "-m", message)
+            self.repo.git.update_ref(f"refs/heads/{branch}", commit)
+            return commit
+        finally:
+            if os.path.exists(index_file):
+                os.unlink(index_file)
+
+    @staticmethod
+    def scratch_branch(name: str) -> str:
+        """Branch name for a proposal, restricted to characters git accepts"""
+        return SCRATCH_PREFIX + re.sub(r'[^\w.-]+', '-', name).strip('.-')
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
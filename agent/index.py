@@ -0,0 +1,345 @@
+import fnmatch
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_IGNORES = [".git", ".hg", ".svn", "venv", ".venv", "node_modules", "__pycache__",
+                   ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", ".cintessa-txn"]
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Character trigrams of a name, padded so short names still produce some"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IgnoreRules:
+    """Directory names to skip plus patterns from the workspace's top-level .gitignore"""
+
+    def __init__(self, root: str, extra: List[str] = None):
+        self.names = set(DEFAULT_IGNORES) | set(extra or [])
+        self.patterns: List[Tuple[str, bool, bool]] = []
+        self._load_gitignore(os.path.join(root, ".gitignore"))
+
+    def _load_gitignore(self, path: str):
+        """Parse the subset of gitignore syntax we honour (no negation)"""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#') or line.startswith('!'):
+                continue
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            anchored = '/' in line
+            self.patterns.append((line.lstrip('/'), dir_only, anchored))
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """True if the entry should be left out of the index"""
+        name = os.path.basename(rel_path)
+        if is_dir and name in self.names:
+            return True
+        posix_path = rel_path.replace(os.sep, '/')
+        for pattern, dir_only, anchored in self.patterns:
+            if dir_only and not is_dir:
+                continue
+            if fnmatch.fnmatch(posix_path if anchored else name, pattern):
+                return True
+        return False
+
+
+class _Dir:
+    __slots__ = ("mtime", "dirs", "files")
+
+    def __init__(self, mtime: float, dirs: List[str], files: Set[str]):
+        self.mtime = mtime
+        self.dirs = dirs
+        self.files = files
+
+
+def names_same_file(query: str, rel_path: str) -> bool:
+    """True if rel_path is the file query names, ignoring case.
+
+    A query without a directory matches on the file name alone; one with a
+    directory must name the same directory, so src/config.py never resolves
+    to lib/config.py.
+    """
+    query = os.path.normpath(query).lower()
+    rel_path = os.path.normpath(rel_path).lower()
+    if os.path.basename(query) != os.path.basename(rel_path):
+        return False
+    return os.path.dirname(query) in ("", os.path.dirname(rel_path))
+
+
+class WorkspaceIndex:
+    """Incremental index of workspace files built with os.scandir"""
+    
+    # Each directory is stored with its mtime. Adding, removing or renaming an
+    # entry bumps the parent's mtime, so a refresh only re-lists those directories.
+
+    def __init__(self, root: str, ignore: List[str] = None, max_staleness: float = 1.0):
+        self.root = os.path.abspath(root)
+        self.rules = IgnoreRules(self.root, ignore)
+        self.max_staleness = max_staleness
+        self._dirs: Dict[str, _Dir] = {}
+        self._files: Set[str] = set()
+        self._by_ext: Dict[str, Set[str]] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._name_trigrams: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self._built = False
+        self._last_refresh = 0.0
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def _scan_dir(self, rel: str) -> Optional[_Dir]:
+        """List one directory, returning None if it has gone away"""
+        path = self._abs(rel)
+        dirs, files = [], set()
+        try:
+            mtime = os.stat(path).st_mtime
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    child = os.path.join(rel, entry.name) if rel else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.rules.ignored(child, True):
+                                dirs.append(entry.name)
+                        elif entry.is_file():
+                            if not self.rules.ignored(child, False):
+                                files.add(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return _Dir(mtime, dirs, files)
+
+    def _add_file(self, path: str):
+        self._files.add(path)
+        self._by_ext.setdefault(os.path.splitext(path)[1].lower(), set()).add(path)
+        name = os.path.basename(path).lower()
+        paths = self._by_name.setdefault(name, set())
+        if not paths:
+            for gram in _trigrams(name):
+                self._name_trigrams.setdefault(gram, set()).add(name)
+        paths.add(path)
+
+    def _remove_file(self, path: str):
+        self._files.discard(path)
+        bucket = self._by_ext.get(os.path.splitext(path)[1].lower())
+        if bucket:
+            bucket.discard(path)
+        name = os.path.basename(path).lower()
+        paths = self._by_name.get(name)
+        if paths is not None:
+            paths.discard(path)
+            if not paths:
+                del self._by_name[name]
+                for gram in _trigrams(name):
+                    names = self._name_trigrams.get(gram)
+                    if names is not None:
+                        names.discard(name)
+                        if not names:
+                            del self._name_trigrams[gram]
+
+    def _walk(self, rel: str, added: Set[str]):
+        """Index a directory and everything below it"""
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            entry = self._scan_dir(current)
+            if entry is None:
+                continue
+            self._dirs[current] = entry
+            for name in entry.files:
+                path = os.path.join(current, name) if current else name
+                self._add_file(path)
+                added.add(path)
+            stack.extend(os.path.join(current, d) if current else d for d in entry.dirs)
+
+    def _drop(self, rel: str, removed: Set[str]):
+        """Forget a directory subtree"""
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            entry = self._dirs.pop(current, None)
+            if entry is None:
+                continue
+            for name in entry.files:
+                path = os.path.join(current, name) if current else name
+                self._remove_file(path)
+                removed.add(path)
+            stack.extend(os.path.join(current, d) if current else d for d in entry.dirs)
+
+    def _rescan(self, rel: str, added: Set[str], removed: Set[str]):
+        """Re-list one directory and reconcile its direct children"""
+        old = self._dirs.get(rel)
+        new = self._scan_dir(rel)
+        if new is None:
+            self._drop(rel, removed)
+            return
+        if old is None:
+            self._walk(rel, added)
+            return
+
+        prefix = rel + os.sep if rel else ""
+        for name in old.files - new.files:
+            self._remove_file(prefix + name)
+            removed.add(prefix + name)
+        for name in new.files - old.files:
+            self._add_file(prefix + name)
+            added.add(prefix + name)
+        old_dirs, new_dirs = set(old.dirs), set(new.dirs)
+        for name in old_dirs - new_dirs:
+            self._drop(prefix + name, removed)
+        self._dirs[rel] = new
+        for name in new_dirs - old_dirs:
+            self._walk(prefix + name, added)
+
+    def build(self) -> int:
+        """Index the whole workspace from scratch; returns the file count"""
+        with self._lock:
+            self._dirs.clear()
+            self._files.clear()
+            self._by_ext.clear()
+            self._by_name.clear()
+            self._name_trigrams.clear()
+            self._walk("", set())
+            self._built = True
+            self._last_refresh = time.monotonic()
+            return len(self._files)
+
+    def refresh(self) -> Tuple[Set[str], Set[str]]:
+        """Bring the index up to date; returns (added, removed) file paths"""
+        added, removed = set(), set()
+        with self._lock:
+            if not self._built:
+                self._walk("", added)
+                self._built = True
+            else:
+                for rel in list(self._dirs):
+                    entry = self._dirs.get(rel)
+                    if entry is None:
+                        continue  # dropped with an ancestor earlier in this pass
+                    try:
+                        mtime = os.stat(self._abs(rel)).st_mtime
+                    except OSError:
+                        mtime = None
+                    if mtime != entry.mtime:
+                        self._rescan(rel, added, removed)
+            self._last_refresh = time.monotonic()
+        return added, removed
+
+    def _ensure_fresh(self):
+        if not self._built or time.monotonic() - self._last_refresh >= self.max_staleness:
+            self.refresh()
+
+    def touch(self, rel_path: str):
+        """Record a file written through the tools without waiting for a refresh"""
+        with self._lock:
+            if not self._built:
+                return
+            rel_path = os.path.normpath(rel_path)
+            if rel_path in self._files:
+                return
+            # Rescan the nearest indexed ancestor so newly created directories are picked up
+            parent = os.path.dirname(rel_path)
+            while parent and parent not in self._dirs:
+                parent = os.path.dirname(parent)
+            self._rescan(parent, set(), set())
+
+    def _subtree_dirs(self, prefix: str) -> List[str]:
+        prefix = os.path.normpath(prefix) if prefix else ""
+        if prefix == ".":
+            prefix = ""
+        if prefix not in self._dirs:
+            return []
+        result, stack = [], [prefix]
+        while stack:
+            current = stack.pop()
+            entry = self._dirs.get(current)
+            if entry is None:
+                continue
+            result.append(current)
+            stack.extend(os.path.join(current, d) if current else d for d in entry.dirs)
+        return result
+
+    def list_files(self, prefix: str = None) -> List[str]:
+        """All files under a directory, relative to the workspace root"""
+        with self._lock:
+            self._ensure_fresh()
+            files = []
+            for rel in self._subtree_dirs(prefix or ""):
+                base = rel + os.sep if rel else ""
+                files.extend(base + name for name in self._dirs[rel].files)
+            return files
+
+    def count(self, prefix: str = None) -> int:
+        """Number of files under a directory"""
+        with self._lock:
+            self._ensure_fresh()
+            return sum(len(self._dirs[rel].files) for rel in self._subtree_dirs(prefix or ""))
+
+    def glob(self, pattern: str) -> List[str]:
+        """Files matching a glob; '*.ext' style patterns are answered from the extension map"""
+        with self._lock:
+            self._ensure_fresh()
+            posix_pattern = pattern.replace(os.sep, '/')
+            head, _, tail = posix_pattern.rpartition('/')
+            ext = os.path.splitext(tail)[1].lower()
+            if tail.startswith('*.') and not any(c in tail[1:] for c in '*?[') and head in ("", "**"):
+                return sorted(self._by_ext.get(ext, ()))
+            candidates = self._by_ext.get(ext, ()) if ext and '*' not in ext else self._files
+            return sorted(p for p in candidates if fnmatch.fnmatch(p.replace(os.sep, '/'), posix_pattern))
+
+    def find_by_name(self, file_path: str, limit: int = 5, min_score: float = 0.3) -> List[Tuple[str, float]]:
+        """Ranked (path, score) candidates for a possibly misspelled file name.
+
+        Case-insensitive basename hits score 1.0 and come first; otherwise
+        names sharing trigrams with the query are ranked by Jaccard similarity.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            query_path = os.path.normpath(file_path).lower()
+            query = os.path.basename(query_path)
+
+            exact = self._by_name.get(query)
+            if exact:
+                def exact_rank(path: str):
+                    # Prefer the requested case, then a matching directory suffix, then shallow paths
+                    return (os.path.basename(path) != os.path.basename(file_path),
+                            not path.lower().endswith(query_path),
+                            path.count(os.sep), path)
+                return [(path, 1.0) for path in sorted(exact, key=exact_rank)[:limit]]
+
+            grams = _trigrams(query)
+            overlap: Dict[str, int] = {}
+            for gram in grams:
+                for name in self._name_trigrams.get(gram, ()):
+                    overlap[name] = overlap.get(name, 0) + 1
+            scored = []
+            for name, shared in overlap.items():
+                # Jaccard similarity over trigram sets
+                score = shared / (len(grams) + len(_trigrams(name)) - shared)
+                if score < min_score:
+                    continue
+                for path in self._by_name[name]:
+                    scored.append((path, round(score, 3)))
+            scored.sort(key=lambda item: (-item[1], item[0].count(os.sep), item[0]))
+            return scored[:limit]
+
+    def contains(self, rel_path: str) -> bool:
+        """True if the file is indexed"""
+        with self._lock:
+            self._ensure_fresh()
+            return os.path.normpath(rel_path) in self._files
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._files)
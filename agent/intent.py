@@ -0,0 +1,195 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Keyword rules in priority order: when several phrases match, the earliest rule wins.
+KEYWORD_RULES: List[Tuple[str, List[str]]] = [
+    ("set_workspace", ["set workspace", "use folder", "open directory", "cd to"]),
+    ("create_directory", ["create dir", "create directory", "create folder", "make folder",
+                          "make directory", "mkdir", "new directory", "new folder"]),
+    ("create_project", ["create project", "new project", "scaffold project"]),
+    ("list_files", ["list files", "show files", "ls", "dir"]),
+    ("git_status", ["git status", "changed files", "uncommitted changes"]),
+    ("git_diff", ["git diff", "show diff", "show the diff"]),
+    ("find_symbol", ["find symbol", "find definition", "go to definition", "definition of", "where is class",
+                     "where is function", "where is method"]),
+    ("search_code", ["search code", "search the code", "search for", "search regex", "grep", "find usages",
+                     "find occurrences", "find references"]),
+    ("read_file", ["read file", "show file", "cat"]),
+    ("propose_code", ["create function", "write code", "implement", "add feature", "propose code"]),
+    ("smoke_test", ["smoke test", "test app", "run tests"]),
+    ("run_app", ["run app", "start app"]),
+    ("show_help", ["help", "what can you do"]),
+    ("ask_question", ["hi", "hello", "hey", "how are you", "jimmy"]),
+]
+
+# Extra utterances used only to train the classifier tier
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "set_workspace": ["switch workspace to my project", "work in the folder src", "change directory to app"],
+    "create_directory": ["create a folder called build", "make a new directory named docs", "add a folder for assets"],
+    "create_project": ["start a new python project", "scaffold a project called api", "bootstrap a project named demo"],
+    "list_files": ["what files are in the workspace", "show me the files", "list everything in the project"],
+    "git_status": ["which files did i change", "what files are modified", "show modified files"],
+    "git_diff": ["what did i change in main.py", "show my changes as a diff", "diff of the staged changes"],
+    "find_symbol": ["where is the class user defined", "show me the definition of parse", "locate function main"],
+    "search_code": ["where is parse_config used", "look for TODO in the code", "find all references to connect"],
+    "read_file": ["open file main.py", "print the contents of config.yaml", "display file readme.md"],
+    "propose_code": ["create a function that parses csv", "write a class for a stack", "add a feature to export json",
+                     "generate code for a web server", "refactor this module to use async"],
+    "run_command": ["run pip install requests", "execute git status", "run the command ls -la",
+                    "run python script.py", "execute npm install"],
+    "smoke_test": ["run the test suite", "check that the app works", "test everything"],
+    "run_app": ["launch the application", "start the server", "run the program"],
+    "show_help": ["what commands are available", "how do i use you", "show me the commands"],
+    "ask_question": ["what is a decorator in python", "explain how recursion works", "why does my code fail",
+                     "how do i reverse a list", "tell me about generators", "thanks", "good morning",
+                     "what is the difference between a list and a tuple"],
+}
+
+_TOKEN_RE = re.compile(r"[\w']+")
+_END = "$"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used by both tiers"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class IntentResult:
+    action: Optional[str]
+    params: Dict[str, Any] = field(default_factory=dict)
+    confidence: float = 0.0
+    tier: str = "llm"
+
+
+class KeywordTrie:
+    """Token trie over keyword phrases; finds the highest-priority phrase in one pass"""
+
+    def __init__(self, rules: List[Tuple[str, List[str]]]):
+        self.root: Dict[str, Any] = {}
+        self.actions = [action for action, _ in rules]
+        for priority, (_, phrases) in enumerate(rules):
+            for phrase in phrases:
+                node = self.root
+                for token in tokenize(phrase):
+                    node = node.setdefault(token, {})
+                # Keep the highest priority if a phrase appears under two rules
+                node[_END] = min(node.get(_END, priority), priority)
+
+    def match(self, tokens: List[str]) -> Optional[str]:
+        """Return the action of the best matching phrase, if any"""
+        best = None
+        for start in range(len(tokens)):
+            node = self.root
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if _END in node and (best is None or node[_END] < best):
+                    best = node[_END]
+        return self.actions[best] if best is not None else None
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word unigrams and bigrams"""
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.class_counts: Counter = Counter()
+        self.feature_counts: Dict[str, Counter] = {}
+        self.feature_totals: Counter = Counter()
+        self.vocabulary = set()
+
+    @staticmethod
+    def features(tokens: List[str]) -> List[str]:
+        """Unigram and bigram features for a token list"""
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def train(self, examples: List[Tuple[str, str]]):
+        """Fit on (text, label) pairs"""
+        for text, label in examples:
+            feats = self.features(tokenize(text))
+            self.class_counts[label] += 1
+            self.feature_counts.setdefault(label, Counter()).update(feats)
+            self.feature_totals[label] += len(feats)
+            self.vocabulary.update(feats)
+
+    def predict(self, tokens: List[str]) -> Tuple[Optional[str], float]:
+        """Return the most likely label and its posterior probability"""
+        feats = [f for f in self.features(tokens) if f in self.vocabulary]
+        if not feats or not self.class_counts:
+            return None, 0.0
+
+        total_examples = sum(self.class_counts.values())
+        vocab_size = len(self.vocabulary)
+        scores = {}
+        for label, count in self.class_counts.items():
+            counts = self.feature_counts[label]
+            denominator = self.feature_totals[label] + self.alpha * vocab_size
+            score = math.log(count / total_examples)
+            for feat in feats:
+                score += math.log((counts[feat] + self.alpha) / denominator)
+            scores[label] = score
+
+        # Softmax over log scores gives a normalised confidence
+        best_label = max(scores, key=scores.get)
+        top = scores[best_label]
+        normaliser = sum(math.exp(s - top) for s in scores.values())
+        return best_label, 1.0 / normaliser
+
+
+class IntentEngine:
+    """Local intent classification: keyword trie, then naive Bayes, then escalate to the LLM"""
+
+    def __init__(self, param_builders: Dict[str, Callable[[str], Optional[Dict[str, Any]]]] = None,
+                 min_confidence: float = 0.85):
+        self.param_builders = param_builders or {}
+        self.min_confidence = min_confidence
+        self.trie = KeywordTrie(KEYWORD_RULES)
+        self.classifier = NaiveBayesClassifier()
+
+        examples = [(phrase, action) for action, phrases in KEYWORD_RULES for phrase in phrases]
+        examples += [(text, action) for action, texts in SEED_EXAMPLES.items() for text in texts]
+        self.classifier.train(examples)
+
+        self.counters: Counter = Counter()
+
+    def _params(self, action: str, user_input: str) -> Optional[Dict[str, Any]]:
+        """Build params for an action; None means they could not be extracted"""
+        builder = self.param_builders.get(action)
+        return builder(user_input) if builder else {}
+
+    def classify(self, user_input: str) -> IntentResult:
+        """Classify locally; a result with tier 'llm' means the caller should escalate"""
+        tokens = tokenize(user_input)
+
+        action = self.trie.match(tokens)
+        if action:
+            params = self._params(action, user_input)
+            if params is not None:
+                self.counters["keyword"] += 1
+                return IntentResult(action, params, 1.0, "keyword")
+
+        action, confidence = self.classifier.predict(tokens)
+        if action and confidence >= self.min_confidence:
+            params = self._params(action, user_input)
+            if params is not None:
+                self.counters["classifier"] += 1
+                return IntentResult(action, params, confidence, "classifier")
+
+        self.counters["llm"] += 1
+        return IntentResult(None, {}, confidence, "llm")
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier counts and the share of messages answered without the LLM"""
+        total = sum(self.counters.values())
+        local = self.counters["keyword"] + self.counters["classifier"]
+        return {
+            "keyword": self.counters["keyword"],
+            "classifier": self.counters["classifier"],
+            "llm": self.counters["llm"],
+            "local_hit_rate": local / total if total else 0.0
+        }
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class ContextHandle:
+    """Token context Ollama returned for a conversation, and what it is valid for"""
+
+    __slots__ = ("tokens", "fingerprint", "turn")
+
+    def __init__(self, tokens: List[int], fingerprint: str, turn: int):
+        self.tokens = tokens
+        self.fingerprint = fingerprint
+        self.turn = turn
+
+
+class ContextHandles:
+    """Per-session Ollama context arrays, reused while model, system prompt and history line up.
+
+    Passing the previous `context` back to /api/generate lets Ollama continue
+    from tokens it already encoded instead of re-reading the whole prompt.
+    A handle is only valid for the exact model, system prompt and options it
+    was produced with, and only for the turn immediately after it; any turn
+    that did not go through the handle (a command, a proposal) breaks the chain.
+    """
+
+    def __init__(self, max_tokens: int = 3072):
+        self.max_tokens = max_tokens
+        self._handles: Dict[str, ContextHandle] = {}
+        self._lock = threading.Lock()
+        self.reuses = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def fingerprint(model: str, system_prompt: Optional[str], options: Optional[Dict[str, Any]]) -> str:
+        """Everything that changes how Ollama would encode the same tokens"""
+        material = json.dumps([model, system_prompt or "", options or {}], sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, session_id: str, fingerprint: str, turn: int) -> Optional[List[int]]:
+        """The session's context if it is still valid for this request, else None"""
+        with self._lock:
+            handle = self._handles.get(session_id)
+            if handle is None:
+                self.misses += 1
+                return None
+            if handle.fingerprint != fingerprint or handle.turn != turn:
+                del self._handles[session_id]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self.reuses += 1
+            return handle.tokens
+
+    def put(self, session_id: str, tokens: List[int], fingerprint: str, turn: int):
+        """Remember the context returned for a turn; contexts past the budget are dropped"""
+        with self._lock:
+            if not tokens or len(tokens) > self.max_tokens:
+                if self._handles.pop(session_id, None) is not None:
+                    self.invalidations += 1
+                return
+            self._handles[session_id] = ContextHandle(tokens, fingerprint, turn)
+
+    def invalidate(self, session_id: str = None):
+        """Forget one session's context, or every session's"""
+        with self._lock:
+            if session_id is None:
+                self.invalidations += len(self._handles)
+                self._handles.clear()
+            elif self._handles.pop(session_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.reuses + self.misses
+        return {
+            "sessions": len(self._handles),
+            "reuses": self.reuses,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "reuse_rate": self.reuses / lookups if lookups else 0.0
+        }
@@ -0,0 +1,180 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+_HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+_HEADER_RE = re.compile(r'^(---|\+\+\+) (\S+)')
+
+
+class PatchError(Exception):
+    """A hunk could not be located in the file being patched"""
+
+
+@dataclass
+class Hunk:
+    old_start: int  # 1-based line number the model claims the hunk starts at
+    lines: List[Tuple[str, str]] = field(default_factory=list)  # (' ', '-' or '+', text)
+
+    @property
+    def before(self) -> List[str]:
+        """Lines the hunk expects to find: context and removals"""
+        return [text for tag, text in self.lines if tag != '+']
+
+
+@dataclass
+class FilePatch:
+    path: str
+    hunks: List[Hunk] = field(default_factory=list)
+    new_file: bool = False
+
+    @property
+    def creates_file(self) -> bool:
+        """True for /dev/null diffs and diffs made only of additions"""
+        return self.new_file or all(not hunk.before for hunk in self.hunks)
+
+
+def _strip_prefix(path: str) -> str:
+    """Drop the a/ and b/ prefixes git puts on diff paths"""
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse_unified_diff(text: str) -> List[FilePatch]:
+    """Parse unified diff text into per-file hunks.
+
+    Hunk line counts are not trusted to end a hunk: models often get them
+    wrong, so a hunk runs until the next @@ or file header. They are only
+    used to tell a removed "-- x" line followed by an added "++ y" line apart
+    from a file header: no header is recognised until the counts are used up.
+    """
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    hunk: Optional[Hunk] = None
+    old_path = ""
+    old_left = new_left = 0  # lines the current hunk's header says are still to come
+
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        header = _HEADER_RE.match(line) if old_left <= 0 and new_left <= 0 else None
+        # A '--- ' line only opens a file header when '+++ ' follows; otherwise it is a removal
+        if header and header.group(1) == '---' and i + 1 < len(lines) and lines[i + 1].startswith('+++ '):
+            old_path = header.group(2)
+            hunk = None
+            continue
+        if header and header.group(1) == '+++' and hunk is None:
+            new_path = header.group(2)
+            current = FilePatch(_strip_prefix(new_path if new_path != "/dev/null" else old_path),
+                                new_file=old_path == "/dev/null")
+            patches.append(current)
+            old_path = ""
+            hunk = None
+            continue
+
+        match = _HUNK_RE.match(line)
+        if match:
+            if current is None:
+                current = FilePatch("")
+                patches.append(current)
+            hunk = Hunk(int(match.group(1)))
+            current.hunks.append(hunk)
+            old_left = int(match.group(2)) if match.group(2) is not None else 1
+            new_left = int(match.group(4)) if match.group(4) is not None else 1
+            continue
+
+        if hunk is None:
+            continue
+        if line.startswith(('+', '-', ' ')):
+            tag, body = line[0], line[1:]
+        elif line == "":
+            # Editors and models often drop the space on blank context lines
+            tag, body = ' ', ""
+        else:
+            continue
+        hunk.lines.append((tag, body))
+        old_left -= tag != '+'
+        new_left -= tag != '-'
+
+    # Blank lines trailing the diff are padding, not context
+    for patch in patches:
+        for trailing in patch.hunks:
+            while trailing.lines and trailing.lines[-1] == (' ', ""):
+                trailing.lines.pop()
+    return patches
+
+
+def _outward(hint: int, last: int) -> Iterator[int]:
+    """hint, hint-1, hint+1, hint-2, ... clipped to 0..last"""
+    yield hint
+    for distance in range(1, max(hint, last - hint) + 1):
+        if hint - distance >= 0:
+            yield hint - distance
+        if hint + distance <= last:
+            yield hint + distance
+
+
+def _find_block(lines: List[str], block: List[str], hint: int, loose: bool) -> int:
+    """Index where block occurs in lines, searching outward from hint; -1 if absent"""
+    if not block:
+        return min(max(hint, 0), len(lines))
+    last = len(lines) - len(block)
+    if last < 0:
+        return -1
+    normalize = str.strip if loose else str
+    wanted = [normalize(line) for line in block]
+    for start in _outward(min(max(hint, 0), last), last):
+        if all(normalize(lines[start + k]) == wanted[k] for k in range(len(block))):
+            return start
+    return -1
+
+
+def _split_endings(text: str) -> Tuple[List[str], List[str]]:
+    """Lines without their endings, and each line's own ending ("" for an unterminated last line)"""
+    lines, endings = [], []
+    for raw in text.splitlines(keepends=True):
+        line = raw.splitlines()[0]
+        lines.append(line)
+        endings.append(raw[len(line):])
+    return lines, endings
+
+
+def apply_hunks(original: str, hunks: List[Hunk]) -> str:
+    """Apply hunks to text, locating each near its stated line with whitespace-tolerant fallback.
+
+    Untouched and context lines keep their own line endings; added lines get
+    the file's usual one, so patching a CRLF file leaves it CRLF.
+    """
+    lines, endings = _split_endings(original)
+    newline = "\r\n" if original.count("\r\n") * 2 > original.count("\n") else "\n"
+    trailing_newline = original.endswith(("\n", "\r")) or not original
+    offset = 0  # lines added minus lines removed by earlier hunks
+
+    for number, hunk in enumerate(hunks, 1):
+        before = hunk.before
+        hint = hunk.old_start - 1 + offset
+        start = _find_block(lines, before, hint, loose=False)
+        if start == -1:
+            start = _find_block(lines, before, hint, loose=True)
+        if start == -1:
+            preview = before[0] if before else ""
+            raise PatchError(f"hunk {number} (near line {hunk.old_start}) does not match: {preview!r}")
+        # Context lines keep the file's own text and ending, even when matched loosely
+        original_block = iter(zip(lines[start:start + len(before)], endings[start:start + len(before)]))
+        replacement, replacement_endings = [], []
+        for tag, text in hunk.lines:
+            if tag == '+':
+                replacement.append(text)
+                replacement_endings.append(newline)
+            elif tag == ' ':
+                line, ending = next(original_block)
+                replacement.append(line)
+                replacement_endings.append(ending)
+            else:
+                next(original_block)
+        lines[start:start + len(before)] = replacement
+        endings[start:start + len(before)] = replacement_endings
+        offset += len(replacement) - len(before)
+
+    # Every line but the last needs an ending, and the last keeps the file's choice of having one
+    endings = [ending or newline for ending in endings]
+    if endings and not trailing_newline:
+        endings[-1] = ""
+    return "".join(line + ending for line, ending in zip(lines, endings))
@@ -0,0 +1,72 @@
+import gzip
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+def write_gzip_atomic(path: str, payload: str):
+    """Write text to a gzip file through a temporary file and a rename, so readers never see half of it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class DebouncedSave:
+    """Calls save once, `delay` seconds after the first of a burst of changes.
+
+    A burst of writes through the tools then costs one rewrite of an index
+    instead of one each.
+    """
+
+    def __init__(self, save: Callable[[], None], delay: float = 5.0):
+        self.save = save
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is None or not self._timer.is_alive():
+                self._timer = threading.Timer(self.delay, self.save)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+
+
+class SharedInstances:
+    """Reference-counted instances keyed by a cache path.
+
+    Every agent (one per browser tab) that opens the same workspace gets the
+    same index, so it is built, held in memory and written to disk once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: Dict[str, List[Any]] = {}  # key -> [instance, users]
+
+    def acquire(self, key: str, create: Callable[[], Any]) -> Any:
+        """The instance for key, created on first use; every call needs a matching release()"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                item = self._items[key] = [create(), 0]
+            item[1] += 1
+            return item[0]
+
+    def release(self, key: str, instance: Any) -> bool:
+        """Drop one user; True when that was the last one (or the instance was never shared)"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] is not instance:
+                return True
+            item[1] -= 1
+            if item[1] > 0:
+                return False
+            del self._items[key]
+            return True
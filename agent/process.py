@@ -0,0 +1,210 @@
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+
+TIMEOUT_EXIT_CODE = 124
+CANCELLED_EXIT_CODE = 130
+
+
+class Job:
+    """A shell command started by the ProcessRunner and its captured output"""
+
+    def __init__(self, job_id: str, command: str, session_id: str):
+        self.id = job_id
+        self.command = command
+        self.session_id = session_id
+        self.process: Optional[subprocess.Popen] = None
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.returncode: Optional[int] = None
+        self.status = "running"
+        self.kill_reason: Optional[str] = None
+        self.lines: List[Tuple[str, str]] = []  # (stream, line) in arrival order
+        self.output_bytes = 0
+        self.truncated = False
+        self.changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.ended is not None
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or time.time()) - self.started
+
+    def output(self, stream: str) -> str:
+        """Joined output of one stream ('stdout' or 'stderr')"""
+        return "".join(line for source, line in self.lines if source == stream)
+
+
+class ProcessRunner:
+    """Runs shell commands in the background with streaming output, time and size limits"""
+
+    def __init__(self, timeout: float = 300, max_output_bytes: int = 10 * 1024 * 1024,
+                 max_jobs_per_session: int = 4, keep_finished: int = 50):
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.max_jobs_per_session = max_jobs_per_session
+        self.keep_finished = keep_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, command: str, cwd: str = None, session_id: str = "default", timeout: float = None) -> Job:
+        """Start a command and return its Job immediately"""
+        with self._lock:
+            running = [j for j in self._jobs.values() if j.session_id == session_id and not j.done]
+            if len(running) >= self.max_jobs_per_session:
+                raise RuntimeError(f"Too many running commands ({len(running)}); cancel one first")
+            job = Job(f"job-{next(self._ids)}", command, session_id)
+            self._jobs[job.id] = job
+            self._prune()
+
+        try:
+            job.process = self._spawn(command, cwd)
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise
+
+        readers = [
+            threading.Thread(target=self._read, args=(job, job.process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._read, args=(job, job.process.stderr, "stderr"), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self._supervise, args=(job, readers, timeout or self.timeout), daemon=True).start()
+        return job
+
+    def _spawn(self, command: str, cwd: str) -> subprocess.Popen:
+        """Start the shell with both pipes captured"""
+        return subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            errors="replace",
+            bufsize=1,
+            # Own process group so cancellation also reaches the shell's children
+            start_new_session=hasattr(os, "killpg")
+        )
+
+    def _read(self, job: Job, pipe, stream: str):
+        """Collect lines from one pipe, dropping output past the size limit"""
+        for line in iter(pipe.readline, ""):
+            with job.changed:
+                if job.output_bytes + len(line) > self.max_output_bytes:
+                    if not job.truncated:
+                        job.truncated = True
+                        job.lines.append(("stderr", f"[output truncated after {self.max_output_bytes:,} bytes]\n"))
+                        job.changed.notify_all()
+                    continue  # keep draining so the child never blocks on a full pipe
+                job.output_bytes += len(line)
+                job.lines.append((stream, line))
+                job.changed.notify_all()
+        pipe.close()
+
+    def _supervise(self, job: Job, readers: List[threading.Thread], timeout: float):
+        """Enforce the wall-clock limit and record the final status"""
+        try:
+            job.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill(job, "timeout")
+            job.process.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+        with job.changed:
+            if job.kill_reason == "timeout":
+                job.returncode = TIMEOUT_EXIT_CODE
+                job.lines.append(("stderr", f"⏱️ Command timed out after {timeout:g}s\n"))
+            elif job.kill_reason == "cancelled":
+                job.returncode = CANCELLED_EXIT_CODE
+            else:
+                job.returncode = job.process.returncode
+            job.status = job.kill_reason or "finished"
+            job.ended = time.time()
+            job.changed.notify_all()
+
+    def _kill(self, job: Job, status: str):
+        """Terminate the job's process group, escalating to SIGKILL"""
+        with job.changed:
+            if job.done or job.kill_reason:
+                return
+            job.kill_reason = status
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(job.process.pid, signal.SIGTERM)
+            else:
+                job.process.terminate()
+            job.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            if hasattr(os, "killpg"):
+                os.killpg(job.process.pid, signal.SIGKILL)
+            else:
+                job.process.kill()
+        except ProcessLookupError:
+            pass
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop a running job; False if it is unknown or already finished"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        self._kill(job, "cancelled")
+        return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, session_id: str = None) -> List[Job]:
+        """Known jobs, optionally for one session, oldest first"""
+        with self._lock:
+            return [j for j in self._jobs.values() if session_id is None or j.session_id == session_id]
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond keep_finished"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def stream(self, job: Job, start: int = 0, poll: float = 0.5) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield (stream, line) pairs as they arrive until the job ends.
+
+        A poll that brings no output yields ("", None), so a caller such as a
+        Streamlit script still gets regular chances to redraw or be stopped.
+        """
+        index = start
+        while True:
+            with job.changed:
+                if index >= len(job.lines) and not job.done:
+                    job.changed.wait(poll)
+                pending = job.lines[index:]
+                finished = job.done
+            if not pending and not finished:
+                yield "", None
+                continue
+            for item in pending:
+                yield item
+            index += len(pending)
+            if finished and index >= len(job.lines):
+                return
+
+    def wait(self, job: Job, timeout: float = None) -> Job:
+        """Block until the job ends"""
+        with job.changed:
+            job.changed.wait_for(lambda: job.done, timeout)
+        return job
+
+    def run(self, command: str, cwd: str = None, session_id: str = "default", timeout: float = None) -> Tuple[int, str, str]:
+        """Run to completion and return (returncode, stdout, stderr), like subprocess.run"""
+        job = self.wait(self.start(command, cwd, session_id, timeout))
+        return job.returncode, job.output("stdout"), job.output("stderr")
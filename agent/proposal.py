@@ -0,0 +1,117 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .patch import FilePatch, parse_unified_diff
+
+EXTENSION_LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".ts": "typescript", ".tsx": "tsx", ".jsx": "jsx",
+    ".sh": "bash", ".yaml": "yaml", ".yml": "yaml", ".json": "json", ".md": "markdown",
+    ".html": "html", ".css": "css", ".sql": "sql", ".go": "go", ".rs": "rust", ".java": "java",
+    ".c": "c", ".h": "c", ".cpp": "cpp", ".toml": "toml",
+}
+
+# The word and its colon are both required, so prose such as "Files to create:" is not a header
+_FILE_RE = re.compile(r'^\s*(?:[#>*\-\s]*)\**\bFILE\b\**\s*:\**\s*(.+?)\s*$', re.IGNORECASE)
+_FENCE_RE = re.compile(r'^\s*```\s*([\w+#.-]*)\s*$')
+_EXPLANATION_RE = re.compile(r'^\s*\**\bEXPLANATION\b\**\s*:\**\s*(.*)$', re.IGNORECASE)
+DIFF_LANGUAGES = ("diff", "patch", "udiff")
+
+
+@dataclass
+class ProposedFile:
+    path: str
+    language: str
+    code: str
+    patch: Optional[FilePatch] = None  # set when the block is a unified diff against an existing file
+
+    @property
+    def is_patch(self) -> bool:
+        return self.patch is not None
+
+
+@dataclass
+class CodeProposal:
+    id: str
+    user_request: str
+    raw: str
+    files: List[ProposedFile] = field(default_factory=list)
+    explanation: str = ""
+    timestamp: str = ""
+
+
+def _clean_path(text: str) -> str:
+    """Strip markdown decoration the model sometimes puts around file names"""
+    return text.strip().strip('`*"\'').strip()
+
+
+def language_for(path: str, fence_language: str = "") -> str:
+    """Language from the code fence, falling back to the file extension"""
+    if fence_language:
+        return fence_language.lower()
+    return EXTENSION_LANGUAGES.get(os.path.splitext(path)[1].lower(), "text")
+
+
+def _diff_files(code: str, pending_path: Optional[str]) -> List[ProposedFile]:
+    """One ProposedFile per file in a diff block; a preceding FILE: line names a headerless diff"""
+    patches = parse_unified_diff(code)
+    if pending_path and len(patches) == 1:
+        patches[0].path = pending_path
+    return [ProposedFile(patch.path, "diff", code, patch) for patch in patches if patch.path and patch.hunks]
+
+
+def parse_proposal(text: str, proposal_id: str, user_request: str = "", timestamp: str = "") -> CodeProposal:
+    """Parse an LLM proposal in one pass over its lines.
+
+    Each fenced block is paired with the FILE: line that precedes it, so a
+    block without a file name can no longer shift the pairing of later files.
+    """
+    proposal = CodeProposal(proposal_id, user_request, text, timestamp=timestamp)
+    pending_path: Optional[str] = None
+    fence_language = ""
+    code_lines: Optional[List[str]] = None
+    explanation: Optional[List[str]] = None
+    explanations: List[List[str]] = []
+
+    for line in text.splitlines():
+        if code_lines is not None:
+            if line.strip() == "```":
+                code = "\n".join(code_lines)
+                if fence_language.lower() in DIFF_LANGUAGES:
+                    proposal.files.extend(_diff_files(code, pending_path))
+                elif pending_path:
+                    proposal.files.append(ProposedFile(
+                        pending_path, language_for(pending_path, fence_language), code
+                    ))
+                pending_path = None
+                code_lines = None
+            else:
+                code_lines.append(line)
+            continue
+
+        fence = _FENCE_RE.match(line)
+        if fence:
+            fence_language = fence.group(1)
+            code_lines = []
+            continue
+
+        file_match = _FILE_RE.match(line)
+        if file_match:
+            pending_path = _clean_path(file_match.group(1))
+            explanation = None
+            continue
+
+        explanation_match = _EXPLANATION_RE.match(line)
+        if explanation_match:
+            explanation = [explanation_match.group(1)]
+            explanations.append(explanation)
+            continue
+
+        if explanation is not None:
+            explanation.append(line)
+
+    proposal.explanation = "\n\n".join(
+        text for text in ("\n".join(lines).strip() for lines in explanations) if text
+    )
+    return proposal
@@ -0,0 +1,279 @@
+import atexit
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .fileio import is_binary
+from .index import WorkspaceIndex
+from .persist import DebouncedSave, SharedInstances, write_gzip_atomic
+
+INDEX_VERSION = 1
+TEXT_EXTENSIONS = {
+    ".py", ".js", ".ts", ".tsx", ".jsx", ".sh", ".yaml", ".yml", ".json", ".md", ".txt", ".rst",
+    ".html", ".css", ".scss", ".sql", ".go", ".rs", ".java", ".kt", ".c", ".h", ".cpp", ".hpp",
+    ".cs", ".rb", ".php", ".toml", ".ini", ".cfg", ".vue", ".svelte", ".lua", ".swift",
+}
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "are", "was", "were", "not", "but",
+    "you", "your", "all", "any", "can", "has", "have", "will", "its", "our", "out", "use", "get",
+    "self", "def", "return", "import", "none", "true", "false", "else", "elif", "var", "let", "const",
+}
+_WORD_RE = re.compile(r'[A-Za-z][A-Za-z0-9]*|\d+')
+_CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+_open_indexes = SharedInstances()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms with identifiers split on snake_case and camelCase boundaries"""
+    terms = []
+    for word in _WORD_RE.findall(text):
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            terms.append(word.lower())
+        terms.extend(part.lower() for part in parts)
+    return [term for term in terms if len(term) > 1 and term not in STOPWORDS]
+
+
+class Chunk(NamedTuple):
+    path: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    score: float
+    text: str
+
+
+class RetrievalIndex:
+    """BM25 index over line chunks of workspace text files, persisted as gzipped JSON.
+
+    Only changed files are re-chunked: a refresh compares each file's mtime and
+    size with what was indexed, and writes through the tools are pushed in
+    directly via update_files(). Agents should get one through open(), which
+    shares it between every session with the workspace open.
+    """
+
+    def __init__(self, workspace: WorkspaceIndex, cache_dir: str = "~/.cache/cintessa/retrieval",
+                 chunk_lines: int = 40, max_file_bytes: int = 512 * 1024, k1: float = 1.2, b: float = 0.75,
+                 max_staleness: float = 5.0, save_delay: float = 5.0):
+        self.workspace = workspace
+        self.root = workspace.root
+        self.chunk_lines = chunk_lines
+        self.max_file_bytes = max_file_bytes
+        self.k1 = k1
+        self.b = b
+        self.max_staleness = max_staleness
+        self.path = self.index_path(self.root, cache_dir)
+        self._lock = threading.RLock()
+        self._files: Dict[str, Tuple[float, int, List[int]]] = {}  # path -> (mtime, size, chunk ids)
+        self._chunks: Dict[int, Tuple[str, int, int, int]] = {}     # id -> (path, start, end, length)
+        self._postings: Dict[str, Dict[int, int]] = {}              # term -> {chunk id: term frequency}
+        self._next_id = 0
+        self._total_length = 0
+        self._stale: Set[int] = set()
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._building: Optional[threading.Thread] = None
+        self._saver = DebouncedSave(self.save, save_delay)
+        self._load()
+        atexit.register(self.close)
+
+    @staticmethod
+    def index_path(root: str, cache_dir: str) -> str:
+        digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(os.path.expanduser(cache_dir), f"{digest}.json.gz")
+
+    @classmethod
+    def open(cls, workspace: WorkspaceIndex, cache_dir: str = "~/.cache/cintessa/retrieval",
+             **options) -> "RetrievalIndex":
+        """The open index for this workspace, or a new one; each call needs a matching close()"""
+        return _open_indexes.acquire(cls.index_path(workspace.root, cache_dir),
+                                     lambda: cls(workspace, cache_dir, **options))
+
+    def _load(self):
+        """Restore a previously saved index; a missing or mismatched file just means a full build"""
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return
+        self._files = {path: (mtime, size, ids) for path, (mtime, size, ids) in data["files"].items()}
+        self._chunks = {int(cid): tuple(chunk) for cid, chunk in data["chunks"].items()}
+        self._postings = {term: {int(cid): tf for cid, tf in postings.items()}
+                          for term, postings in data["postings"].items()}
+        self._next_id = data["next_id"]
+        self._total_length = sum(chunk[3] for chunk in self._chunks.values())
+
+    def save(self):
+        """Write the index atomically if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._purge()
+            payload = json.dumps({
+                "version": INDEX_VERSION,
+                "root": self.root,
+                "files": self._files,
+                "chunks": self._chunks,
+                "postings": self._postings,
+                "next_id": self._next_id,
+            }, separators=(',', ':'))
+            self._dirty = False
+        write_gzip_atomic(self.path, payload)
+
+    def close(self):
+        """Release this user's handle; the last one writes any pending changes"""
+        if not _open_indexes.release(self.path, self):
+            return
+        atexit.unregister(self.close)  # otherwise the exit hook keeps a replaced index alive
+        self._saver.cancel()
+        self.save()
+
+    def _indexable(self, rel_path: str) -> bool:
+        return os.path.splitext(rel_path)[1].lower() in TEXT_EXTENSIONS
+
+    def _remove_file(self, rel_path: str):
+        """Drop a file's chunks; their postings are purged in one sweep by _purge()"""
+        entry = self._files.pop(rel_path, None)
+        if entry is None:
+            return
+        for cid in entry[2]:
+            self._total_length -= self._chunks.pop(cid)[3]
+            self._stale.add(cid)
+        self._dirty = True
+
+    def _purge(self):
+        """Remove postings of dropped chunks, one pass over the vocabulary however many files changed"""
+        if not self._stale:
+            return
+        for term in list(self._postings):
+            postings = self._postings[term]
+            for cid in self._stale.intersection(postings):
+                del postings[cid]
+            if not postings:
+                del self._postings[term]
+        self._stale.clear()
+
+    def _add_file(self, rel_path: str, mtime: float, size: int):
+        full_path = os.path.join(self.root, rel_path)
+        if size > self.max_file_bytes or is_binary(full_path):
+            self._files[rel_path] = (mtime, size, [])
+            return
+        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+        ids = []
+        for start in range(0, len(lines), self.chunk_lines):
+            window = lines[start:start + self.chunk_lines]
+            # The path is indexed with the chunk so a request naming a file finds it
+            terms = Counter(tokenize(rel_path) + tokenize("\n".join(window)))
+            if not terms:
+                continue
+            cid = self._next_id
+            self._next_id += 1
+            length = sum(terms.values())
+            self._chunks[cid] = (rel_path, start + 1, start + len(window), length)
+            self._total_length += length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[cid] = tf
+            ids.append(cid)
+        self._files[rel_path] = (mtime, size, ids)
+        self._dirty = True
+
+    def _sync_file(self, rel_path: str) -> bool:
+        """Re-index one file if its mtime or size changed; True if anything changed"""
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            if rel_path in self._files:
+                self._remove_file(rel_path)
+                return True
+            return False
+        entry = self._files.get(rel_path)
+        if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            return False
+        self._remove_file(rel_path)
+        try:
+            self._add_file(rel_path, stat.st_mtime, stat.st_size)
+        except OSError:
+            pass
+        return True
+
+    def refresh(self) -> int:
+        """Bring the index in line with the workspace; returns the number of files re-indexed"""
+        current = {path for path in self.workspace.list_files() if self._indexable(path)}
+        changed = 0
+        with self._lock:
+            for rel_path in set(self._files) - current:
+                self._remove_file(rel_path)
+                changed += 1
+            for rel_path in current:
+                changed += self._sync_file(rel_path)
+            self._last_refresh = time.monotonic()
+        if changed:
+            self.save()
+        return changed
+
+    def refresh_async(self):
+        """Build or refresh in a background thread so the UI is not blocked on a large workspace"""
+        with self._lock:
+            if self._building and self._building.is_alive():
+                return
+            self._building = threading.Thread(target=self.refresh, name="cintessa-retrieval", daemon=True)
+            self._building.start()
+
+    def update_files(self, rel_paths: Iterable[str]):
+        """Re-index files written through the tools without waiting for a refresh"""
+        with self._lock:
+            changed = sum(self._sync_file(os.path.normpath(p)) for p in rel_paths if self._indexable(p))
+        if changed:
+            self._saver.schedule()
+
+    def search(self, query: str, k: int = 5, exclude: Iterable[str] = ()) -> List[Chunk]:
+        """Top-k chunks by BM25 score for the query"""
+        if self._building is None or not self._building.is_alive():
+            if time.monotonic() - self._last_refresh >= self.max_staleness:
+                self.refresh()
+        excluded = set(exclude)
+        with self._lock:
+            count = len(self._chunks)
+            if not count:
+                return []
+            average = self._total_length / count
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for cid, tf in postings.items():
+                    if cid in self._stale:
+                        continue
+                    length = self._chunks[cid][3]
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / average)
+                    scores[cid] = scores.get(cid, 0.0) + idf * tf * (self.k1 + 1) / norm
+            ranked = sorted(
+                (cid for cid in scores if self._chunks[cid][0] not in excluded),
+                key=scores.get, reverse=True
+            )[:k]
+            hits = [(self._chunks[cid], scores[cid]) for cid in ranked]
+
+        results = []
+        for (path, start, end, _), score in hits:
+            try:
+                with open(os.path.join(self.root, path), 'r', encoding='utf-8', errors='replace') as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            results.append(Chunk(path, start, end, score, "\n".join(lines[start - 1:end])))
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._files), "chunks": len(self._chunks), "terms": len(self._postings)}
@@ -0,0 +1,355 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from .fileio import is_binary
+from .index import WorkspaceIndex
+from .persist import SharedInstances
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT PRIMARY KEY,
+    ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dead (
+    id INTEGER PRIMARY KEY
+);
+"""
+
+logger = logging.getLogger(__name__)
+_open_indexes = SharedInstances()
+
+
+class SearchHit(NamedTuple):
+    path: str
+    line: int
+    text: str
+
+
+def _grams(text: str) -> Set[str]:
+    """Lowercased character trigrams of text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _literal_runs(parsed) -> List[str]:
+    """Literal strings every match of a parsed regex must contain"""
+    runs, current = [], []
+
+    def end_run():
+        if len(current) >= 3:
+            runs.append("".join(current))
+        current.clear()
+
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        end_run()
+        if op is sre_parse.SUBPATTERN:
+            runs.extend(_literal_runs(av[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            runs.extend(_literal_runs(av[2]))
+        # Alternations, classes and optional parts require nothing in particular
+    end_run()
+    return runs
+
+
+def required_grams(query: str, regex: bool) -> Set[str]:
+    """Trigrams any file matching the query must contain; empty means every file is a candidate"""
+    if not regex:
+        return _grams(query)
+    try:
+        runs = _literal_runs(sre_parse.parse(query))
+    except Exception:
+        return set()
+    grams = set()
+    for run in runs:
+        grams |= _grams(run)
+    return grams
+
+
+def _contains(ids: array, file_id: int) -> bool:
+    i = bisect_left(ids, file_id)
+    return i < len(ids) and ids[i] == file_id
+
+
+class CodeSearchIndex:
+    """Trigram index over workspace file contents for fast literal and regex search.
+
+    Each trigram maps to a sorted array of file ids. A query intersects the
+    arrays of the trigrams it needs, and only the surviving files are read
+    and matched line by line. A changed file gets a fresh, larger id, so the
+    arrays stay sorted with plain appends, and the old id is only marked
+    dead. Dirty arrays are written to SQLite after each update, and dead ids
+    are compacted away once they pile up.
+
+    File ids come from an in-memory counter, so only one instance may write a
+    given database; get one through open(), which shares it per workspace.
+    """
+
+    def __init__(self, workspace: WorkspaceIndex, cache_dir: str = "~/.cache/cintessa/search",
+                 max_file_bytes: int = 1048576, max_staleness: float = 5.0):
+        self.workspace = workspace
+        self.root = workspace.root
+        self.max_file_bytes = max_file_bytes
+        self.max_staleness = max_staleness
+        self.path = self.db_path(self.root, cache_dir)
+        self._lock = threading.RLock()
+        self._files: Dict[str, Tuple[int, float, int]] = {}  # path -> (id, mtime, size)
+        self._paths: Dict[int, str] = {}
+        self._grams: Dict[str, array] = {}
+        self._dead: Set[int] = set()
+        self._dirty_grams: Set[str] = set()
+        self._dirty_files: Dict[str, Optional[Tuple[int, float, int]]] = {}
+        self._new_dead: Set[int] = set()
+        self._next_id = 1
+        self._last_refresh = 0.0
+        self._building: Optional[threading.Thread] = None
+        self._built = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._load()
+
+    @staticmethod
+    def db_path(root: str, cache_dir: str) -> str:
+        digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(os.path.expanduser(cache_dir), f"{digest}.db")
+
+    @classmethod
+    def open(cls, workspace: WorkspaceIndex, cache_dir: str = "~/.cache/cintessa/search",
+             **options) -> "CodeSearchIndex":
+        """The open index for this workspace, or a new one; each call needs a matching close()"""
+        return _open_indexes.acquire(cls.db_path(workspace.root, cache_dir),
+                                     lambda: cls(workspace, cache_dir, **options))
+
+    def _load(self):
+        for file_id, path, mtime, size in self._db.execute("SELECT id, path, mtime, size FROM files"):
+            self._files[path] = (file_id, mtime, size)
+            self._paths[file_id] = path
+        for gram, blob in self._db.execute("SELECT gram, ids FROM grams"):
+            ids = array('I')
+            ids.frombytes(blob)
+            self._grams[gram] = ids
+        self._dead = {row[0] for row in self._db.execute("SELECT id FROM dead")}
+        self._next_id = max([0, *self._paths, *self._dead]) + 1
+        self._built = bool(self._files)
+
+    def _forget(self, rel_path: str):
+        entry = self._files.pop(rel_path, None)
+        if entry is not None:
+            del self._paths[entry[0]]
+            self._dead.add(entry[0])
+            self._new_dead.add(entry[0])
+            self._dirty_files[rel_path] = None
+
+    def _index(self, rel_path: str, mtime: float, size: int, grams: Set[str]):
+        self._forget(rel_path)
+        file_id = self._next_id
+        self._next_id += 1
+        self._files[rel_path] = (file_id, mtime, size)
+        self._paths[file_id] = rel_path
+        self._dirty_files[rel_path] = (file_id, mtime, size)
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids is None:
+                ids = self._grams[gram] = array('I')
+            ids.append(file_id)
+            self._dirty_grams.add(gram)
+
+    def _read_grams(self, rel_path: str, size: int) -> Set[str]:
+        """Trigrams of a file's contents; binary and oversized files are listed but not indexed"""
+        full_path = os.path.join(self.root, rel_path)
+        if size > self.max_file_bytes or is_binary(full_path):
+            return set()
+        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+            return _grams(f.read())
+
+    def _sync_file(self, rel_path: str) -> bool:
+        """Re-index one file if it changed since it was indexed; True if anything changed"""
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+            entry = self._files.get(rel_path)
+            if entry and entry[1] == stat.st_mtime and entry[2] == stat.st_size:
+                return False
+            # Reading happens outside the lock so searches are not held up by a large refresh
+            grams = self._read_grams(rel_path, stat.st_size)
+        except OSError:
+            with self._lock:
+                if rel_path not in self._files:
+                    return False
+                self._forget(rel_path)
+            return True
+        with self._lock:
+            self._index(rel_path, stat.st_mtime, stat.st_size, grams)
+        return True
+
+    def _compact(self):
+        """Drop dead ids from every posting array once they are a fifth of all ids ever assigned"""
+        if len(self._dead) * 5 < self._next_id:
+            return
+        for gram in list(self._grams):
+            ids = array('I', (file_id for file_id in self._grams[gram] if file_id not in self._dead))
+            if ids:
+                self._grams[gram] = ids
+            else:
+                del self._grams[gram]
+            self._dirty_grams.add(gram)
+        self._dead.clear()
+        self._new_dead.clear()
+        self._db.execute("DELETE FROM dead")
+
+    def save(self):
+        """Write changed posting arrays and file rows in one transaction"""
+        with self._lock:
+            if self._db is None or not (self._dirty_grams or self._dirty_files or self._new_dead):
+                return
+            self._compact()
+            for rel_path, entry in self._dirty_files.items():
+                self._db.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+                if entry is not None:
+                    self._db.execute("INSERT INTO files (id, path, mtime, size) VALUES (?, ?, ?, ?)",
+                                     (entry[0], rel_path, entry[1], entry[2]))
+            self._db.executemany("INSERT OR IGNORE INTO dead (id) VALUES (?)", [(i,) for i in self._new_dead])
+            self._db.executemany(
+                "INSERT OR REPLACE INTO grams (gram, ids) VALUES (?, ?)",
+                [(gram, self._grams[gram].tobytes()) for gram in self._dirty_grams if gram in self._grams]
+            )
+            self._db.executemany(
+                "DELETE FROM grams WHERE gram = ?", [(gram,) for gram in self._dirty_grams if gram not in self._grams]
+            )
+            self._db.commit()
+            self._dirty_grams.clear()
+            self._dirty_files.clear()
+            self._new_dead.clear()
+
+    def refresh(self) -> int:
+        """Bring the index in line with the workspace; returns the number of files re-indexed"""
+        current = set(self.workspace.list_files())
+        with self._lock:
+            gone = set(self._files) - current
+            for rel_path in gone:
+                self._forget(rel_path)
+        changed = len(gone) + sum(self._sync_file(rel_path) for rel_path in current)
+        self.save()
+        self._built = True
+        self._last_refresh = time.monotonic()
+        return changed
+
+    def refresh_async(self):
+        """Build or refresh in a background thread"""
+        with self._lock:
+            if self._building and self._building.is_alive():
+                return
+            self._building = threading.Thread(target=self.refresh, name="cintessa-search", daemon=True)
+            self._building.start()
+
+    def update_files(self, rel_paths: Iterable[str]):
+        """Re-index files written through the tools straight away"""
+        if sum(self._sync_file(os.path.normpath(path)) for path in rel_paths):
+            self.save()
+
+    def _candidates(self, grams: Set[str]) -> List[int]:
+        """Live file ids whose contents contain every trigram"""
+        if not grams:
+            return [file_id for file_id in self._paths]
+        postings = []
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if not ids:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = [file_id for file_id in postings[0] if file_id not in self._dead]
+        for ids in postings[1:]:
+            candidates = [file_id for file_id in candidates if _contains(ids, file_id)]
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _path_filter(path: Optional[str]):
+        """Glob filter, or a directory prefix when the pattern has no wildcards"""
+        path = os.path.normpath(path.strip()).replace(os.sep, "/") if path and path.strip() else "."
+        if path == ".":
+            return None
+        if any(ch in path for ch in "*?["):
+            return lambda rel: fnmatch.fnmatch(rel, path) or fnmatch.fnmatch(os.path.basename(rel), path)
+        prefix = path.rstrip("/") + "/"
+        return lambda rel: rel == path or rel.startswith(prefix)
+
+    def search(self, query: str, regex: bool = False, path: str = None, ignore_case: bool = False,
+               max_results: int = 50) -> Tuple[List[SearchHit], bool]:
+        """Matching lines, and whether the result was cut at max_results; raises ValueError on a bad pattern"""
+        try:
+            pattern = re.compile(query if regex else re.escape(query), re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise ValueError(f"invalid pattern: {e}")
+
+        if not self._built:
+            self.refresh_async()
+            self._building.join()
+        elif time.monotonic() - self._last_refresh >= self.max_staleness:
+            # Answer from the current index; edits made outside the tools are picked up in the background
+            self.refresh_async()
+
+        accept = self._path_filter(path)
+        with self._lock:
+            paths = sorted(self._paths[file_id] for file_id in self._candidates(required_grams(query, regex)))
+        if accept:
+            paths = [rel for rel in paths if accept(rel)]
+
+        hits: List[SearchHit] = []
+        for rel_path in paths:
+            try:
+                with open(os.path.join(self.root, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+                    for number, line in enumerate(f, 1):
+                        if pattern.search(line):
+                            hits.append(SearchHit(rel_path, number, line.rstrip("\n")))
+                            if len(hits) >= max_results:
+                                return hits, True
+            except OSError:
+                continue
+        return hits, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._files), "grams": len(self._grams), "dead": len(self._dead)}
+
+    def close(self):
+        """Release this user's handle; the last one saves and closes the database"""
+        if not _open_indexes.release(self.path, self):
+            return
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                self.save()
+            except sqlite3.Error as e:
+                # Losing unsaved postings only costs a rescan next time; shutdown must still finish
+                logger.warning("Could not save the search index %s: %s", self.path, e)
+            self._db.close()
+            self._db = None
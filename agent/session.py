@@ -0,0 +1,241 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .proposal import CodeProposal, parse_proposal
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    proposal_id TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq);
+
+CREATE TABLE IF NOT EXISTS turns (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    input TEXT NOT NULL,
+    action TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, seq);
+
+CREATE TABLE IF NOT EXISTS proposals (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    user_request TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS proposals_session ON proposals (session_id, status);
+"""
+
+
+class SessionStore:
+    """SQLite (WAL) store for chat messages, agent turns and code proposals.
+
+    Messages and turns are buffered and written in batches; proposals are
+    written straight away because accepting one must survive a restart.
+    """
+
+    def __init__(self, path: str, batch_size: int = 32, flush_interval: float = 2.0):
+        self.path = os.path.expanduser(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending_messages: List[tuple] = []
+        self._pending_turns: List[tuple] = []
+        self._last_flush = time.time()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, session_config: Dict[str, Any]) -> "SessionStore":
+        """Build a store from the 'session' section of config.yaml"""
+        return cls(
+            path=session_config.get('path', '~/.cache/cintessa/sessions.db'),
+            batch_size=session_config.get('batch_size', 32),
+            flush_interval=session_config.get('flush_interval', 2.0)
+        )
+
+    def _maybe_flush(self):
+        """Flush once the batch is full or has waited long enough"""
+        buffered = len(self._pending_messages) + len(self._pending_turns)
+        if buffered >= self.batch_size or time.time() - self._last_flush >= self.flush_interval:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending_messages:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO messages (id, session_id, role, content, proposal_id, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)", self._pending_messages
+            )
+        if self._pending_turns:
+            self._db.executemany(
+                "INSERT INTO turns (session_id, input, action, params, result, created) VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending_turns
+            )
+        self._db.commit()
+        self._pending_messages.clear()
+        self._pending_turns.clear()
+        self._last_flush = time.time()
+
+    def flush(self):
+        """Write buffered messages and turns in one transaction"""
+        with self._lock:
+            if self._db is not None:
+                self._flush_locked()
+
+    def append_message(self, session_id: str, role: str, content: str, proposal_id: str = None,
+                       message_id: str = None) -> str:
+        """Queue a chat message and return its id"""
+        message_id = message_id or uuid.uuid4().hex
+        with self._lock:
+            self._pending_messages.append((message_id, session_id, role, content, proposal_id, time.time()))
+            self._maybe_flush()
+        return message_id
+
+    @staticmethod
+    def _before(before_id: Optional[str]) -> str:
+        """SQL restricting to messages older than the one with before_id"""
+        return " AND seq < (SELECT seq FROM messages WHERE id = ?)" if before_id else ""
+
+    def recent_messages(self, session_id: str, limit: int = 50, before_id: str = None) -> List[Dict[str, Any]]:
+        """Newest `limit` messages (optionally older than message before_id), oldest first"""
+        self.flush()
+        args = [session_id] + ([before_id] if before_id else []) + [limit]
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, role, content, proposal_id FROM messages WHERE session_id = ?"
+                + self._before(before_id) + " ORDER BY seq DESC LIMIT ?", args
+            ).fetchall()
+        return [
+            {"id": message_id, "role": role, "content": content, "proposal_id": proposal_id}
+            for message_id, role, content, proposal_id in reversed(rows)
+        ]
+
+    def count_messages(self, session_id: str, before_id: str = None) -> int:
+        """Number of stored messages (optionally older than message before_id)"""
+        self.flush()
+        args = [session_id] + ([before_id] if before_id else [])
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?" + self._before(before_id), args
+            ).fetchone()
+        return row[0]
+
+    def append_turn(self, session_id: str, turn: Dict[str, Any]):
+        """Queue one agent turn (input, action, params, result)"""
+        with self._lock:
+            self._pending_turns.append((
+                session_id, turn["input"], turn["action"], json.dumps(turn.get("params", {}), default=str),
+                turn["result"], time.time()
+            ))
+            self._maybe_flush()
+
+    def recent_turns(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest `limit` turns, oldest first"""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT input, action, params, result FROM turns WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        return [
+            {"input": user_input, "action": action, "params": json.loads(params), "result": result}
+            for user_input, action, params, result in reversed(rows)
+        ]
+
+    def save_proposal(self, session_id: str, proposal: CodeProposal):
+        """Persist a pending proposal immediately"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO proposals (id, session_id, user_request, raw, timestamp, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                (proposal.id, session_id, proposal.user_request, proposal.raw, proposal.timestamp, time.time())
+            )
+            self._db.commit()
+
+    def set_proposal_status(self, proposal_id: str, status: str):
+        """Mark a proposal accepted or rejected"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE proposals SET status = ?, updated = ? WHERE id = ?", (status, time.time(), proposal_id)
+            )
+            self._db.commit()
+
+    def get_proposal(self, proposal_id: str) -> Optional[CodeProposal]:
+        """A proposal by id in any status, re-parsed from its stored text"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, user_request, raw, timestamp FROM proposals WHERE id = ?", (proposal_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        proposal_id, user_request, raw, timestamp = row
+        return parse_proposal(raw, proposal_id, user_request, timestamp)
+
+    def pending_proposals(self, session_id: str) -> Dict[str, CodeProposal]:
+        """Proposals still awaiting accept/reject, keyed by id"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, user_request, raw, timestamp FROM proposals "
+                "WHERE session_id = ? AND status = 'pending' ORDER BY updated",
+                (session_id,)
+            ).fetchall()
+        return {
+            proposal_id: parse_proposal(raw, proposal_id, user_request, timestamp)
+            for proposal_id, user_request, raw, timestamp in rows
+        }
+
+    def clear_session(self, session_id: str):
+        """Forget a session's messages, turns and proposals"""
+        with self._lock:
+            self._flush_locked()
+            for table in ("messages", "turns", "proposals"):
+                self._db.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def close(self):
+        atexit.unregister(self.close)  # otherwise the exit hook keeps a dropped store alive
+        with self._lock:
+            if self._db is None:
+                return
+            self._flush_locked()
+            self._db.close()
+            self._db = None
+
+
+class Conversation:
+    """Conversation state of one session: recent turns, pending proposals and the turn counter"""
+
+    def __init__(self, session_id: str, memory_window: int = 50, store: SessionStore = None):
+        self.session_id = session_id
+        self.memory = deque(maxlen=memory_window)
+        self.pending_changes: Dict[str, CodeProposal] = {}
+        self.last_proposal_id: Optional[str] = None
+        self.last_intent = None
+        self.turns = 0
+        if store:
+            self.memory.extend(store.recent_turns(session_id, memory_window))
+            self.pending_changes.update(store.pending_proposals(session_id))
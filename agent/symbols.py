@@ -0,0 +1,310 @@
+import ast
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .index import WorkspaceIndex
+from .persist import DebouncedSave, SharedInstances, write_gzip_atomic
+
+INDEX_VERSION = 1
+# Below this many files a process pool costs more to start than it saves
+POOL_THRESHOLD = 64
+_open_indexes = SharedInstances()
+
+
+class Definition(NamedTuple):
+    path: str
+    qualname: str
+    kind: str  # class, function, method or variable
+    line: int
+    end_line: int
+
+
+class Reference(NamedTuple):
+    path: str
+    line: int
+    detail: str  # the caller's qualname, or the imported module path
+
+
+def parse_symbols(source: str) -> Dict[str, list]:
+    """Definitions, imports and call sites of a Python module, as JSON-friendly lists"""
+    tree = ast.parse(source)
+    defs, imports, calls = [], [], []
+
+    def visit(node, scope: List[str], in_class: bool):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = ".".join(scope + [child.name])
+                if isinstance(child, ast.ClassDef):
+                    kind = "class"
+                else:
+                    kind = "method" if in_class else "function"
+                defs.append([child.name, qualname, kind, child.lineno, child.end_lineno])
+                visit(child, scope + [child.name], isinstance(child, ast.ClassDef))
+                continue
+            if isinstance(child, ast.Import):
+                for alias in child.names:
+                    imports.append([(alias.asname or alias.name).split(".")[0], alias.name, child.lineno])
+            elif isinstance(child, ast.ImportFrom):
+                module = "." * child.level + (child.module or "")
+                for alias in child.names:
+                    imports.append([alias.asname or alias.name, f"{module}.{alias.name}", child.lineno])
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)) and not scope:
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        defs.append([target.id, target.id, "variable", child.lineno, child.end_lineno])
+            elif isinstance(child, ast.Call):
+                func = child.func
+                name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+                if name:
+                    calls.append([name, child.lineno, ".".join(scope)])
+            visit(child, scope, in_class)
+
+    visit(tree, [], False)
+    return {"defs": defs, "imports": imports, "calls": calls}
+
+
+def _parse_file(root: str, rel_path: str, known_hash: Optional[str]) -> Tuple[str, float, int, str, Optional[dict]]:
+    """Stat, hash and parse one file; the record is None when the content hash is unchanged"""
+    full_path = os.path.join(root, rel_path)
+    stat = os.stat(full_path)
+    with open(full_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_hash:
+        return rel_path, stat.st_mtime, stat.st_size, digest, None
+    try:
+        record = parse_symbols(data.decode('utf-8', errors='replace'))
+    except (SyntaxError, ValueError, RecursionError):
+        record = {"defs": [], "imports": [], "calls": [], "error": True}
+    return rel_path, stat.st_mtime, stat.st_size, digest, record
+
+
+class SymbolIndex:
+    """Definitions, imports and call sites of every workspace .py file, from `ast`.
+
+    The first build parses in a process pool. After that only files whose
+    mtime or size changed are re-read, and only those whose content hash
+    changed are re-parsed. Records are saved as gzipped JSON between runs.
+    Agents should get one through open(), which shares it between every
+    session with the workspace open.
+    """
+
+    def __init__(self, workspace: WorkspaceIndex, cache_dir: str = "~/.cache/cintessa/symbols",
+                 workers: int = None, max_file_bytes: int = 1048576, max_staleness: float = 5.0,
+                 save_delay: float = 5.0):
+        self.workspace = workspace
+        self.root = workspace.root
+        self.workers = workers
+        self.max_file_bytes = max_file_bytes
+        self.max_staleness = max_staleness
+        self.path = self.index_path(self.root, cache_dir)
+        self._lock = threading.RLock()
+        self._files: Dict[str, Dict[str, Any]] = {}  # path -> {mtime, size, hash, defs, imports, calls}
+        self._by_name: Dict[str, List[Definition]] = {}
+        self._calls: Dict[str, List[Reference]] = {}
+        self._imports: Dict[str, List[Reference]] = {}
+        self._stale_lookup = True
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._building: Optional[threading.Thread] = None
+        self._saver = DebouncedSave(self.save, save_delay)
+        self._load()
+        atexit.register(self.close)
+
+    @staticmethod
+    def index_path(root: str, cache_dir: str) -> str:
+        digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(os.path.expanduser(cache_dir), f"{digest}.json.gz")
+
+    @classmethod
+    def open(cls, workspace: WorkspaceIndex, cache_dir: str = "~/.cache/cintessa/symbols",
+             **options) -> "SymbolIndex":
+        """The open index for this workspace, or a new one; each call needs a matching close()"""
+        return _open_indexes.acquire(cls.index_path(workspace.root, cache_dir),
+                                     lambda: cls(workspace, cache_dir, **options))
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("root") == self.root:
+            self._files = data["files"]
+
+    def save(self):
+        """Write the index atomically if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"version": INDEX_VERSION, "root": self.root, "files": self._files},
+                                 separators=(',', ':'))
+            self._dirty = False
+        write_gzip_atomic(self.path, payload)
+
+    def close(self):
+        """Release this user's handle; the last one writes any pending changes"""
+        if not _open_indexes.release(self.path, self):
+            return
+        atexit.unregister(self.close)  # otherwise the exit hook keeps a replaced index alive
+        self._saver.cancel()
+        self.save()
+
+    def _changed(self, rel_path: str) -> bool:
+        """True if the file's mtime or size differs from what was indexed"""
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            return rel_path in self._files
+        entry = self._files.get(rel_path)
+        if stat.st_size > self.max_file_bytes:
+            return entry is not None
+        return not entry or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size
+
+    def _store(self, result: Tuple[str, float, int, str, Optional[dict]]):
+        rel_path, mtime, size, digest, record = result
+        with self._lock:
+            if record is None:
+                # Touched but identical: keep the parsed symbols, remember the new stat
+                self._files[rel_path].update(mtime=mtime, size=size)
+            else:
+                self._files[rel_path] = dict(record, mtime=mtime, size=size, hash=digest)
+                self._stale_lookup = True
+            self._dirty = True
+
+    def _drop(self, rel_path: str):
+        with self._lock:
+            if self._files.pop(rel_path, None) is not None:
+                self._stale_lookup = True
+                self._dirty = True
+
+    def _parse_all(self, rel_paths: List[str]):
+        """Parse files, in a process pool when there are enough of them to pay for it"""
+        jobs = [(self.root, path, self._files.get(path, {}).get("hash")) for path in rel_paths]
+        if len(jobs) >= POOL_THRESHOLD:
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    for result in pool.map(_parse_file, *zip(*jobs), chunksize=16):
+                        self._store(result)
+                return
+            except (OSError, RuntimeError):
+                pass  # no process support here (e.g. a sandbox); fall back to parsing in this process
+        for root, path, known_hash in jobs:
+            if path in self._files and self._files[path].get("hash") != known_hash:
+                continue  # already stored by the pool before it failed
+            try:
+                self._store(_parse_file(root, path, known_hash))
+            except OSError:
+                self._drop(path)
+
+    def _needs_parse(self, rel_path: str) -> bool:
+        try:
+            return os.path.getsize(os.path.join(self.root, rel_path)) <= self.max_file_bytes
+        except OSError:
+            return False
+
+    def refresh(self) -> int:
+        """Bring the index in line with the workspace; returns the number of files re-read"""
+        current = {path for path in self.workspace.list_files() if path.endswith(".py")}
+        for rel_path in set(self._files) - current:
+            self._drop(rel_path)
+        changed = [path for path in current if self._changed(path)]
+        for rel_path in changed:
+            if not self._needs_parse(rel_path):
+                self._drop(rel_path)
+        self._parse_all([path for path in changed if self._needs_parse(path)])
+        self._last_refresh = time.monotonic()
+        self.save()
+        return len(changed)
+
+    def refresh_async(self):
+        """Build or refresh in a background thread"""
+        with self._lock:
+            if self._building and self._building.is_alive():
+                return
+            self._building = threading.Thread(target=self.refresh, name="cintessa-symbols", daemon=True)
+            self._building.start()
+
+    def update_files(self, rel_paths: Iterable[str]):
+        """Re-parse Python files written through the tools straight away"""
+        changed = False
+        for rel_path in rel_paths:
+            rel_path = os.path.normpath(rel_path)
+            if not rel_path.endswith(".py") or not self._changed(rel_path):
+                continue
+            changed = True
+            if not self._needs_parse(rel_path):
+                self._drop(rel_path)
+                continue
+            try:
+                self._store(_parse_file(self.root, rel_path, self._files.get(rel_path, {}).get("hash")))
+            except OSError:
+                self._drop(rel_path)
+        if changed:
+            self._saver.schedule()
+
+    def _ensure_lookup(self):
+        """Refresh if due, then rebuild the name tables if any file changed"""
+        if self._building is None or not self._building.is_alive():
+            if time.monotonic() - self._last_refresh >= self.max_staleness:
+                self.refresh()
+        with self._lock:
+            if not self._stale_lookup:
+                return
+            by_name, calls, imports = {}, {}, {}
+            for path, record in self._files.items():
+                for name, qualname, kind, line, end_line in record["defs"]:
+                    by_name.setdefault(name, []).append(Definition(path, qualname, kind, line, end_line))
+                for name, line, caller in record["calls"]:
+                    calls.setdefault(name, []).append(Reference(path, line, caller))
+                for name, target, line in record["imports"]:
+                    imports.setdefault(target.rsplit(".", 1)[-1], []).append(Reference(path, line, target))
+            self._by_name, self._calls, self._imports = by_name, calls, imports
+            self._stale_lookup = False
+
+    def definitions(self, name: str) -> List[Definition]:
+        """Definitions of a bare name or a dotted qualname such as Class.method"""
+        self._ensure_lookup()
+        short = name.rsplit(".", 1)[-1]
+        found = self._by_name.get(short, [])
+        if "." in name:
+            found = [d for d in found if d.qualname == name or d.qualname.endswith("." + name)]
+        # Classes and functions before methods and variables, then by path
+        order = {"class": 0, "function": 1, "method": 2, "variable": 3}
+        return sorted(found, key=lambda d: (order[d.kind], d.path, d.line))
+
+    def callers(self, name: str) -> List[Reference]:
+        """Call sites of a name, matched on the called attribute or function name"""
+        self._ensure_lookup()
+        return sorted(self._calls.get(name.rsplit(".", 1)[-1], []))
+
+    def importers(self, name: str) -> List[Reference]:
+        """Imports that bind a name"""
+        self._ensure_lookup()
+        return sorted(self._imports.get(name.rsplit(".", 1)[-1], []))
+
+    def known(self, name: str) -> bool:
+        self._ensure_lookup()
+        return name.rsplit(".", 1)[-1] in self._by_name
+
+    def snippet(self, definition: Definition) -> str:
+        """Source lines of a definition"""
+        with open(os.path.join(self.root, definition.path), 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+        return "\n".join(lines[definition.line - 1:definition.end_line])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "definitions": sum(len(r["defs"]) for r in self._files.values()),
+                "errors": sum(1 for r in self._files.values() if r.get("error"))
+            }
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Optional, Tuple
+
+
+class Segment:
+    """One command's span of lines in the terminal buffer"""
+
+    def __init__(self, command: str, start_seq: int):
+        self.command = command
+        self.start_seq = start_seq
+        self.end_seq: Optional[int] = None
+        self.exit_code: Optional[int] = None
+        self.status = "running"
+        self.started = time.time()
+        self.duration: Optional[float] = None
+
+
+class TerminalBuffer:
+    """Line-oriented ring buffer for terminal output with optional spill of full history to disk"""
+
+    def __init__(self, max_lines: int = 5000, max_segments: int = 200, spill_path: str = None):
+        self._lines: Deque[Tuple[int, str]] = deque(maxlen=max_lines)
+        self.segments: Deque[Segment] = deque(maxlen=max_segments)
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self.spill_path = os.path.expanduser(spill_path) if spill_path else None
+        self._spill = None
+        if self.spill_path:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            self._spill = open(self.spill_path, 'a', encoding='utf-8', buffering=1)
+
+    def write(self, text: str):
+        """Append text; it is split into lines and the oldest lines fall off the front"""
+        if not text:
+            return
+        lines = text.splitlines()
+        with self._lock:
+            for line in lines:
+                self._lines.append((self._next_seq, line))
+                self._next_seq += 1
+            if self._spill:
+                self._spill.write("\n".join(lines) + "\n")
+
+    def begin(self, command: str) -> Segment:
+        """Start a segment for a command"""
+        self.write(f"💲 {command}")
+        with self._lock:
+            segment = Segment(command, self._next_seq - 1)
+            self.segments.append(segment)
+        return segment
+
+    def end(self, segment: Segment, exit_code: int, status: str = "finished", duration: float = None):
+        """Close a segment with its exit code and timing"""
+        segment.exit_code = exit_code
+        segment.status = status
+        segment.duration = duration if duration is not None else time.time() - segment.started
+        self.write(f"📟 [Exit: {exit_code}] {status} in {segment.duration:.1f}s")
+        segment.end_seq = self._next_seq - 1
+
+    def record(self, command: str, out: str = "", err: str = "", exit_code: int = 0, duration: float = None):
+        """Add a completed command in one call"""
+        segment = self.begin(command)
+        self.write(out)
+        if err:
+            self.write("\n".join(f"🔴 {line}" for line in err.splitlines()))
+        self.end(segment, exit_code, duration=duration)
+        return segment
+
+    def view(self, height: int = 200, offset: int = 0) -> str:
+        """Text of `height` lines ending `offset` lines before the newest"""
+        with self._lock:
+            # Walking from the newest end keeps the cost proportional to offset + height
+            window = list(islice(reversed(self._lines), offset, offset + height))
+        return "\n".join(line for _, line in reversed(window))
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    @property
+    def total_written(self) -> int:
+        """Lines written since creation, including those that fell out of the buffer"""
+        return self._next_seq
+
+    def recent_segments(self, count: int = 10) -> List[Segment]:
+        """Newest segments first"""
+        with self._lock:
+            return list(self.segments)[-count:][::-1]
+
+    def clear(self, banner: str = ""):
+        """Drop retained lines and segments; the spill file keeps the full history"""
+        with self._lock:
+            self._lines.clear()
+            self.segments.clear()
+        self.write(banner)
+
+    def close(self):
+        if self._spill:
+            self._spill.close()
+            self._spill = None
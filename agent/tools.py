@@ -1,22 +1,24 @@
 import os
-import subprocess
 import shutil
 from pathlib import Path
 from typing import List, Tuple
 
+from .fileio import is_binary, read_bytes
+from .index import WorkspaceIndex, names_same_file
+from .process import ProcessRunner
+
 class Tools:
-    def __init__(self, workspace_path: str = "./workspace"):
+    def __init__(self, workspace_path: str = "./workspace", ignore: List[str] = None, max_read_bytes: int = 1048576):
         self.workspace_path = Path(workspace_path)
+        self.max_read_bytes = max_read_bytes
+        self.runner = ProcessRunner()
         self.workspace_path.mkdir(exist_ok=True)
+        self.index = WorkspaceIndex(str(self.workspace_path), ignore)
     
     def list_workspace(self, path: str = None) -> List[str]:
         """List all files and folders in workspace"""
-        target_path = self.workspace_path / path if path else self.workspace_path
-        files = []
         try:
-            for item in target_path.rglob("*"):
-                if item.is_file():
-                    files.append(str(item.relative_to(self.workspace_path)))
+            files = self.index.list_files(path)
         except Exception as e:
             files = [f"Error: {e}"]
         return files
@@ -26,37 +28,44 @@ class Tools:
         try:
             full_path = self.workspace_path / file_path
             if full_path.exists():
-                return full_path.read_text(encoding='utf-8')
+                return self._read_capped(full_path)
             else:
-                # Try to find the file case-insensitively
-                for actual_file in self.workspace_path.rglob("*"):
-                    if actual_file.is_file() and actual_file.name.lower() == file_path.lower():
-                        return actual_file.read_text(encoding='utf-8')
+                # Fall back to a case-insensitive name lookup in the index
+                candidates = self.index.find_by_name(file_path)
+                if candidates and names_same_file(file_path, candidates[0][0]):
+                    return self._read_capped(self.workspace_path / candidates[0][0])
+                if candidates:
+                    suggestions = ", ".join(path for path, _ in candidates)
+                    return f"Error: File '{file_path}' not found in workspace. Did you mean: {suggestions}"
                 return f"Error: File '{file_path}' not found in workspace"
         except Exception as e:
             return f"Error reading file: {e}"
     
+    def _read_capped(self, full_path: Path) -> str:
+        """Read text, refusing binaries and truncating past max_read_bytes"""
+        size = full_path.stat().st_size
+        if is_binary(str(full_path)):
+            return f"Error: '{full_path.name}' looks like a binary file ({size:,} bytes)"
+        if size > self.max_read_bytes:
+            head = read_bytes(str(full_path), 0, self.max_read_bytes)
+            return head + f"\n\n[Truncated: showing the first {self.max_read_bytes:,} of {size:,} bytes]"
+        return full_path.read_text(encoding='utf-8')
+    
     def write_file(self, file_path: str, content: str) -> str:
         """Write content to file"""
         try:
             full_path = self.workspace_path / file_path
             full_path.parent.mkdir(parents=True, exist_ok=True)
             full_path.write_text(content, encoding='utf-8')
+            self.index.touch(file_path)
             return f"Successfully wrote to {file_path}"
         except Exception as e:
             return f"Error writing file: {e}"
     
-    def run_shell(self, command: str) -> Tuple[int, str, str]:
+    def run_shell(self, command: str, timeout: float = None) -> Tuple[int, str, str]:
         """Execute shell command in workspace"""
         try:
-            process = subprocess.run(
-                command,
-                shell=True,
-                cwd=self.workspace_path,
-                capture_output=True,
-                text=True
-            )
-            return process.returncode, process.stdout, process.stderr
+            return self.runner.run(command, str(self.workspace_path), timeout=timeout)
         except Exception as e:
             return 1, "", f"Error executing command: {e}"
     
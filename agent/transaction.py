@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+STAGING_DIR = ".cintessa-txn"
+
+_workspace_locks: Dict[str, threading.Lock] = {}
+_workspace_locks_guard = threading.Lock()
+
+
+def workspace_lock(root: str) -> threading.Lock:
+    """One lock per workspace, shared by every session writing to it"""
+    root = os.path.realpath(root)
+    with _workspace_locks_guard:
+        return _workspace_locks.setdefault(root, threading.Lock())
+
+
+class TransactionError(Exception):
+    """A transaction could not be committed; the workspace was left as it was"""
+
+
+def _fsync_dir(path: str):
+    """Persist directory entries (renames) where the platform allows it"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteTransaction:
+    """All-or-nothing write of several workspace files.
+
+    Content is staged in a directory inside the workspace (so renames stay on
+    one filesystem), written and fsynced in parallel, then swapped in with
+    os.replace. If any step fails, files already swapped in are restored and
+    directories created for new files are removed again.
+    """
+
+    def __init__(self, root: str, max_workers: int = 4):
+        self.root = os.path.realpath(root)
+        self.max_workers = max_workers
+        self._files: "OrderedDict[str, str]" = OrderedDict()
+
+    def write(self, rel_path: str, content: str):
+        """Queue a file; later writes to the same path replace earlier ones"""
+        target = os.path.realpath(os.path.join(self.root, rel_path))
+        if os.path.commonpath([self.root, target]) != self.root or target == self.root:
+            raise TransactionError(f"'{rel_path}' is outside the workspace")
+        if os.path.isdir(target):
+            raise TransactionError(f"'{rel_path}' is a directory")
+        self._files[target] = content
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def _stage(self, staging: str, number: int, target: str, content: str) -> str:
+        staged = os.path.join(staging, f"{number}.new")
+        with open(staged, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(target):
+            shutil.copymode(target, staged)
+        return staged
+
+    def commit(self) -> List[str]:
+        """Apply every queued write or none of them; returns the written paths relative to the root"""
+        if not self._files:
+            return []
+
+        with workspace_lock(self.root):
+            staging_root = os.path.join(self.root, STAGING_DIR)
+            os.makedirs(staging_root, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=staging_root)
+            # (target, backup or None) for every file already swapped in
+            applied: List[Tuple[str, Optional[str]]] = []
+            created_dirs: List[str] = []
+            try:
+                targets = list(self._files.items())
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(targets))) as pool:
+                    staged = list(pool.map(
+                        lambda item: self._stage(staging, item[0], *item[1]), enumerate(targets)
+                    ))
+
+                for number, ((target, _), staged_path) in enumerate(zip(targets, staged)):
+                    created_dirs.extend(self._missing_dirs(os.path.dirname(target)))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    backup = None
+                    if os.path.exists(target):
+                        # A hard link keeps the original reachable while the target is replaced in one step
+                        backup = os.path.join(staging, f"{number}.orig")
+                        try:
+                            os.link(target, backup)
+                        except OSError:
+                            shutil.copy2(target, backup)
+                    applied.append((target, backup))
+                    os.replace(staged_path, target)
+
+                for directory in {os.path.dirname(target) for target, _ in targets}:
+                    _fsync_dir(directory)
+            except Exception as e:
+                self._rollback(applied, created_dirs)
+                raise TransactionError(f"{e}; no files were changed") from e
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+                try:
+                    os.rmdir(staging_root)  # keep the workspace (and git status) free of it between commits
+                except OSError:
+                    pass
+
+        return [os.path.relpath(target, self.root) for target in self._files]
+
+    def _missing_dirs(self, directory: str) -> List[str]:
+        """Directories os.makedirs would create for directory, outermost first"""
+        missing = []
+        while directory != self.root and not os.path.exists(directory):
+            missing.append(directory)
+            directory = os.path.dirname(directory)
+        return list(reversed(missing))
+
+    def _rollback(self, applied: List[Tuple[str, Optional[str]]], created_dirs: List[str]):
+        """Undo swapped-in files, newest first, then remove the directories made for them"""
+        for target, backup in reversed(applied):
+            try:
+                if backup is not None:
+                    os.replace(backup, target)
+                elif os.path.exists(target):
+                    os.unlink(target)
+            except OSError:
+                pass
+        for directory in reversed(created_dirs):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
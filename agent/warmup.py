@@ -0,0 +1,178 @@
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import requests
+
+DEFAULT_KEEP_ALIVE = "10m"
+
+# One warmer per Ollama server for the whole process, however many agents (browser tabs) exist
+_warmers: Dict[str, "ModelWarmer"] = {}
+_warmers_lock = threading.Lock()
+
+
+def _normalize(model: str) -> str:
+    """Ollama lists untagged models as name:latest"""
+    return model if ":" in model else f"{model}:latest"
+
+
+def installed_models(base_url: str, timeout: float = 5.0) -> Set[str]:
+    """Names of the models Ollama has pulled, from /api/tags"""
+    response = requests.get(f"{base_url}/api/tags", timeout=timeout)
+    response.raise_for_status()
+    return {_normalize(model["name"]) for model in response.json().get("models", [])}
+
+
+class ModelStatus:
+    """Readiness of the model serving one route"""
+
+    __slots__ = ("route", "model", "state", "load_seconds", "last_ping", "error")
+
+    def __init__(self, route: str, model: Optional[str] = None):
+        self.route = route
+        self.model = model
+        self.state = "pending"  # pending, loading, ready, missing, error
+        self.load_seconds: Optional[float] = None
+        self.last_ping: Optional[float] = None
+        self.error = ""
+
+
+class ModelWarmer:
+    """Preloads each route's model in the background and pings it so Ollama keeps it in memory.
+
+    Ollama unloads idle models after their keep_alive expires, and the next
+    request then pays the full load time. Loading at startup and re-sending an
+    empty request before keep_alive runs out keeps the first real request fast.
+    """
+
+    def __init__(self, client, ping_interval: float = 240.0):
+        self.client = client
+        self.ping_interval = ping_interval
+        # Other clients for the same server that should learn which models are missing
+        self._clients: "weakref.WeakSet" = weakref.WeakSet()
+        routes = client.routes or {"default": client.route()}
+        self.statuses: Dict[str, ModelStatus] = {name: ModelStatus(name) for name in routes}
+        self._routes = routes
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cintessa-warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def attach(self, client):
+        """Share missing-model updates with another client; it is dropped once garbage collected"""
+        self._clients.add(client)
+
+    def _run(self):
+        self.warm_all()
+        while not self._stop.wait(self.ping_interval):
+            self.warm_all()
+
+    def _sync_missing(self):
+        """Tell the client which route models are not pulled, saving a 404 per request.
+
+        Runs every cycle, so a model pulled after startup is routed to again
+        without a restart.
+        """
+        try:
+            installed = installed_models(self.client.base_url, self.client.timeout[0])
+        except Exception:
+            return
+        absent = {model for route in self._routes.values() for model in route.models
+                  if _normalize(model) not in installed}
+        for client in [self.client, *self._clients]:
+            for model in list(client.missing_models):
+                if _normalize(model) in installed:
+                    client.missing_models.discard(model)
+            client.missing_models.update(absent)
+
+    def warm_all(self):
+        """Load (or keep loaded) one model per route; models shared by routes load once"""
+        self._sync_missing()
+        loaded: Dict[str, ModelStatus] = {}
+        for name, route in self._routes.items():
+            if self._stop.is_set():
+                return
+            status = self.statuses[name]
+            model = self.client.candidates(route)[0]
+            if model in loaded:
+                done = loaded[model]
+                status.model, status.state, status.error = model, done.state, done.error
+                status.load_seconds, status.last_ping = done.load_seconds, done.last_ping
+                continue
+            self._warm(status, route)
+            loaded[status.model] = status
+
+    def _warm(self, status: ModelStatus, route):
+        """Load the first installed model of a route, falling back like a real request would"""
+        previous = status.model
+        for model in self.client.candidates(route):
+            status.model = model
+            if status.state != "ready":
+                status.state = "loading"
+            try:
+                seconds = self.client.load_model(model, route.keep_alive or DEFAULT_KEEP_ALIVE)
+            except Exception as e:
+                status.state, status.error = "error", str(e)
+                return
+            if seconds is None:
+                continue  # not installed; try the route's next model
+            if status.load_seconds is None or model != previous:
+                status.load_seconds = seconds  # later pings of a loaded model return almost at once
+            status.state, status.error = "ready", ""
+            status.last_ping = time.time()
+            return
+        status.state = "missing"
+        status.error = f"none of {', '.join(route.models)} are installed"
+
+    @property
+    def ready(self) -> bool:
+        return all(status.state == "ready" for status in self.statuses.values())
+
+    def readiness(self) -> List[Dict[str, Any]]:
+        """Route, model, state and load time for display"""
+        return [
+            {"route": s.route, "model": s.model, "state": s.state, "load_seconds": s.load_seconds, "error": s.error}
+            for s in self.statuses.values()
+        ]
+
+
+def shared_warmer(base_url: str, make_client: Callable[[], Any], ping_interval: float = 240.0,
+                  start: bool = True) -> ModelWarmer:
+    """The process-wide warmer for an Ollama server, built with its own client on first use"""
+    with _warmers_lock:
+        warmer = _warmers.get(base_url)
+        if warmer is None:
+            warmer = _warmers[base_url] = ModelWarmer(make_client(), ping_interval)
+    if start:
+        warmer.start()
+    return warmer
+
+
+def probe(config: Dict[str, Any], timeout: float = 5.0) -> Tuple[bool, List[str]]:
+    """Check Ollama is up and every route has an installed model; returns (ok, report lines)"""
+    ollama_config = config.get('ollama', {})
+    base_url = ollama_config.get('base_url', 'http://localhost:11434')
+    try:
+        installed = installed_models(base_url, timeout)
+    except Exception as e:
+        return False, [f"Ollama is not reachable at {base_url}: {e}"]
+
+    routes = ollama_config.get('routes') or {"default": {"models": [ollama_config.get('model', 'qwen2:7b')]}}
+    ok, lines = True, []
+    for name, route in routes.items():
+        models = route.get('models') or [route.get('model', ollama_config.get('model', 'qwen2:7b'))]
+        available = [model for model in models if _normalize(model) in installed]
+        if available:
+            lines.append(f"{name}: {available[0]}")
+        else:
+            ok = False
+            lines.append(f"{name}: none of {', '.join(models)} installed (ollama pull {models[0]})")
+    return ok, lines
+
@@ -0,0 +1,142 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+PARSER_REPLY = '{"action": "ask_question", "params": {"question": "benchmark"}}'
+CODEGEN_REPLY = """FILE: bench_generated.py
+```python
+def generated(value):
+    # Produced by the fake Ollama server
+    return value * 2
+```
+
+EXPLANATION: A small helper so the proposal has a file to apply.
+"""
+CHAT_WORDS = ("Sure", "here", "is", "a", "short", "answer", "from", "the", "benchmark", "server")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Pooled clients drop idle keep-alive connections; that is not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeOllama:
+    """Local stand-in for Ollama's /api/generate and /api/tags with controllable timing.
+
+    `latency` is the delay before the first token, and `token_rate` is tokens
+    per second after it (0 means no delay). Replies are picked by system
+    prompt: JSON for the command parser, a FILE: block for code proposals,
+    and `chat_tokens` words for everything else.
+    """
+
+    def __init__(self, latency: float = 0.05, token_rate: float = 200.0, chat_tokens: int = 40,
+                 models: List[str] = None, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.chat_tokens = chat_tokens
+        self.models = models or ["qwen2:7b"]
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reply_tokens(self, body: Dict[str, Any]) -> List[str]:
+        """The reply for a request, split into streamed tokens"""
+        system = body.get("system") or ""
+        if not body.get("prompt"):
+            return []  # a keep_alive load from the warm-up thread
+        if "command parser" in system:
+            return [PARSER_REPLY]
+        if "Always specify the filename" in system:
+            return [line + "\n" for line in CODEGEN_REPLY.splitlines()]
+        return [f"{CHAT_WORDS[i % len(CHAT_WORDS)]} " for i in range(self.chat_tokens)]
+
+    def _pace(self, tokens: int):
+        if self.token_rate > 0 and tokens:
+            time.sleep(tokens / self.token_rate)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: Dict[str, Any]):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/api/tags":
+                    self._send_json({"models": [{"name": model} for model in fake.models]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/api/generate":
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                tokens = fake.reply_tokens(body)
+                context = list(range(len(tokens) + 8))
+                time.sleep(fake.latency)
+
+                if not body.get("stream", True):
+                    fake._pace(len(tokens))
+                    self._send_json({"model": body.get("model"), "response": "".join(tokens), "done": True,
+                                     "context": context, "eval_count": len(tokens)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in tokens:
+                    self._chunk({"model": body.get("model"), "response": token, "done": False})
+                    fake._pace(1)
+                self._chunk({"model": body.get("model"), "response": "", "done": True,
+                             "context": context, "eval_count": len(tokens)})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, payload: Dict[str, Any]):
+                data = (json.dumps(payload) + "\n").encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
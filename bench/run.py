@@ -0,0 +1,242 @@
+"""Benchmark the agent against a fake Ollama server and synthetic workspaces.
+
+    python -m bench.run --sizes 1000,10000 --iterations 50 --output bench.json
+    python -m bench.run --baseline bench.json --tolerance 0.25
+
+Prints p50/p95/p99 latency (ms) and throughput (ops/s) per workload and
+workspace size as JSON. With --baseline, exits 1 if any workload's p95 got
+slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent.core import CintessaAgent  # noqa: E402
+from agent.filetree import FileTree  # noqa: E402
+from agent.proposal import parse_proposal  # noqa: E402
+
+from bench.fake_ollama import FakeOllama  # noqa: E402
+from bench.workspace import GENERATED_DIR, make_workspace, reset_workspace  # noqa: E402
+
+WORKLOADS = ("parse_command", "chat", "chat_stream", "list_workspace", "get_file_tree", "accept_code_proposal")
+PARSE_INPUTS = [
+    "list files", "read file target.py", "create folder called build", "help",
+    "what is a decorator in python", "please tidy up the thing we discussed yesterday",
+]
+CHAT_INPUTS = ["what is a decorator in python", "explain how recursion works", "how do i reverse a list"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], wall_seconds: float, extra: Dict[str, List[float]] = None) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    summary = {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+    for name, values in (extra or {}).items():
+        values = sorted(values)
+        summary[f"{name}_p50_ms"] = round(percentile(values, 0.50) * 1000, 3)
+        summary[f"{name}_p95_ms"] = round(percentile(values, 0.95) * 1000, 3)
+    return summary
+
+
+def timed(iterations: int, operation: Callable[[int], Any], warmup: int = 2) -> Dict[str, Any]:
+    """Run operation(i) `iterations` times after a few untimed warm-up calls"""
+    for i in range(warmup):
+        operation(-1 - i)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def bench_config(base_url: str, scratch: str, use_cache: bool) -> str:
+    """The repo's config.yaml pointed at the fake server, with all state kept in scratch"""
+    with open(os.path.join(ROOT, "config.yaml")) as f:
+        config = yaml.safe_load(f)
+    config["ollama"]["base_url"] = base_url
+    config["cache"]["enabled"] = use_cache
+    config["cache"]["sqlite_path"] = None
+    config.setdefault("warmup", {})["enabled"] = False
+    config.setdefault("session", {})["path"] = os.path.join(scratch, "sessions.db")
+    for section in ("retrieval", "search", "symbols"):
+        config.setdefault(section, {})["cache_dir"] = os.path.join(scratch, section)
+    config.setdefault("git", {})["enabled"] = False
+    path = os.path.join(scratch, "config.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def target_proposal(workspace: str, i: int):
+    """A proposal that patches target.py against its current content and adds one new file"""
+    with open(os.path.join(workspace, "target.py"), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    raw = (
+        "FILE: target.py\n```diff\n@@ -1,3 +1,3 @@\n"
+        f" {lines[0]}\n-{lines[1]}\n+    value = {i}\n {lines[2]}\n```\n"
+        f"FILE: {GENERATED_DIR}/gen_{i}.py\n```python\nVALUE = {i}\n```\n"
+    )
+    return parse_proposal(raw, f"bench{i}", "benchmark proposal")
+
+
+def run_size(size: int, args, server: FakeOllama, scratch: str, config_path: str) -> Dict[str, Any]:
+    workspace = make_workspace(os.path.join(args.workspaces, f"ws_{size}"), size)
+    agent = CintessaAgent(config_path, session_id=f"bench-{size}")
+    results: Dict[str, Any] = {}
+    try:
+        t0 = time.perf_counter()
+        agent.set_workspace(workspace)
+        agent.tools.list_workspace()
+        results["setup"] = {"set_workspace_and_first_list_ms": round((time.perf_counter() - t0) * 1000, 3)}
+        n = args.iterations
+
+        if "parse_command" in args.workloads:
+            results["parse_command"] = timed(n, lambda i: agent.parse_command(PARSE_INPUTS[i % len(PARSE_INPUTS)]))
+            results["parse_command"]["local_hit_rate"] = round(agent.intent_engine.stats()["local_hit_rate"], 3)
+
+        if "chat" in args.workloads:
+            results["chat"] = timed(n, lambda i: agent.chat(CHAT_INPUTS[i % len(CHAT_INPUTS)]))
+
+        if "chat_stream" in args.workloads:
+            first_tokens, totals = [], []
+            started = time.perf_counter()
+            for i in range(n):
+                t0 = time.perf_counter()
+                stream = agent.chat_stream(CHAT_INPUTS[i % len(CHAT_INPUTS)])
+                next(stream, None)
+                first_tokens.append(time.perf_counter() - t0)
+                for _ in stream:
+                    pass
+                totals.append(time.perf_counter() - t0)
+            results["chat_stream"] = summarize(totals, time.perf_counter() - started, {"first_token": first_tokens})
+
+        if "list_workspace" in args.workloads:
+            results["list_workspace"] = timed(n, lambda i: agent.tools.list_workspace())
+
+        if "get_file_tree" in args.workloads:
+            # The Explorer's cached model (main.get_tree_model) as display_file_tree reads it
+            tree = FileTree(workspace)
+
+            def file_tree(i):
+                tree.refresh()
+                return tree.rows(max_files=200)
+            results["get_file_tree"] = timed(n, file_tree)
+
+        if "accept_code_proposal" in args.workloads:
+            def accept(i):
+                proposal = target_proposal(workspace, i)
+                agent.pending_changes[proposal.id] = proposal
+                result = agent.accept_code_proposal(proposal.id)
+                if not result.startswith("✅"):
+                    raise RuntimeError(result)
+            results["accept_code_proposal"] = timed(n, accept)
+    finally:
+        agent.shutdown()
+        reset_workspace(workspace)
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Workloads whose p95 regressed past the tolerance"""
+    regressions = []
+    for size, workloads in results["results"].items():
+        for name, summary in workloads.items():
+            before = baseline.get("results", {}).get(size, {}).get(name, {})
+            if "p95_ms" in summary and before.get("p95_ms"):
+                ratio = summary["p95_ms"] / before["p95_ms"]
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{size} files / {name}: p95 {before['p95_ms']}ms -> {summary['p95_ms']}ms")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated workspace file counts")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server delay before the first token (s)")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="fake server tokens per second (0 = instant)")
+    parser.add_argument("--chat-tokens", type=int, default=40)
+    parser.add_argument("--cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--workspaces", default=os.path.join(tempfile.gettempdir(), "cintessa-bench"),
+                        help="where synthetic workspaces are created and reused")
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="previous report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown vs baseline")
+    args = parser.parse_args(argv)
+    args.workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "server": {"latency_s": args.latency, "token_rate": args.token_rate, "chat_tokens": args.chat_tokens},
+            "response_cache": args.cache,
+        },
+        "results": {},
+    }
+    with FakeOllama(args.latency, args.token_rate, args.chat_tokens) as server, \
+            tempfile.TemporaryDirectory(prefix="cintessa-bench-state-") as scratch:
+        config_path = bench_config(server.base_url, scratch, args.cache)
+        # Route models are whatever config.yaml names; report them all as installed
+        with open(config_path) as f:
+            routes = yaml.safe_load(f)["ollama"].get("routes") or {}
+        server.models = sorted({model for route in routes.values() for model in route.get("models", [])}) or \
+            server.models
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            print(f"benchmarking {size} files...", file=sys.stderr)
+            report["results"][str(size)] = run_size(size, args, server, scratch, config_path)
+        report["meta"]["llm_requests"] = server.requests
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
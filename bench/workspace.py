@@ -0,0 +1,74 @@
+import os
+import random
+import shutil
+
+MARKER = ".bench-workspace"
+# Written by the accept_code_proposal workload; reset on reuse so every run starts from the same tree
+GENERATED_DIR = "generated"
+TARGET_SOURCE = "def target():\n    value = 0\n    return value\n"
+FILES_PER_DIR = 50
+DIRS_PER_DIR = 8
+
+PYTHON_TEMPLATE = '''"""Synthetic module {index}"""
+import os
+
+
+class Widget{index}:
+    def __init__(self, size):
+        self.size = size
+
+    def area(self):
+        return self.size * {factor}
+
+
+def helper_{index}(value):
+    return Widget{index}(value).area() + {factor}
+'''
+
+
+def _dir_path(index: int) -> str:
+    """Relative directory for the index-th directory of a tree DIRS_PER_DIR wide"""
+    parts = []
+    while index:
+        index -= 1
+        parts.append(f"pkg{index % DIRS_PER_DIR}")
+        index //= DIRS_PER_DIR
+    return os.path.join(*reversed(parts)) if parts else ""
+
+
+def reset_workspace(root: str):
+    """Undo what the workloads write: drop generated files and restore target.py"""
+    shutil.rmtree(os.path.join(root, GENERATED_DIR), ignore_errors=True)
+    with open(os.path.join(root, "target.py"), 'w', encoding='utf-8') as f:
+        f.write(TARGET_SOURCE)
+
+
+def make_workspace(root: str, files: int, seed: int = 0) -> str:
+    """Create (or reuse) a workspace of `files` small source files spread over nested directories"""
+    marker = os.path.join(root, MARKER)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if f.read().strip() == f"{files} {seed}":
+                reset_workspace(root)
+                return root
+
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    for index in range(files):
+        directory = os.path.join(root, _dir_path(index // FILES_PER_DIR))
+        if index % FILES_PER_DIR == 0:
+            os.makedirs(directory, exist_ok=True)
+        kind = rng.random()
+        if kind < 0.7:
+            name, content = f"module_{index}.py", PYTHON_TEMPLATE.format(index=index, factor=rng.randint(2, 9))
+        elif kind < 0.9:
+            name, content = f"notes_{index}.md", f"# Notes {index}\n\nTODO: document widget {index}\n"
+        else:
+            name, content = f"data_{index}.json", f'{{"id": {index}, "value": {rng.random():.6f}}}\n'
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    reset_workspace(root)
+    with open(marker, 'w') as f:
+        f.write(f"{files} {seed}")
+    return root
@@ -2,8 +2,15 @@ import streamlit as st
 import os
 import re
 import time
+import uuid
+from collections import deque
 from pathlib import Path
 from agent.core import CintessaAgent
+from agent.filetree import FileTree
+from agent.terminal import TerminalBuffer
+
+# Session ids come from the URL and end up in file names, so only plain ids are accepted
+SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
 
 st.set_page_config(
     page_title="Cintessa Agent - Cyber AI IDE",
@@ -292,7 +299,7 @@ def browse_folder_interactive():
     if st.button("✅ SELECT THIS FOLDER AS WORKSPACE", use_container_width=True, type="primary"):
         st.session_state.workspace_path = str(st.session_state.current_path)
         st.session_state.agent.set_workspace(st.session_state.workspace_path)
-        st.session_state.file_tree = []
+        st.session_state.tree_model = None
         st.success(f"🎯 Workspace set to: {st.session_state.current_path}")
         st.markdown('</div>', unsafe_allow_html=True)
         return True
@@ -300,53 +307,84 @@ def browse_folder_interactive():
     st.markdown('</div>', unsafe_allow_html=True)
     return False
 
-def get_file_tree(startpath):
-    """Generate a file tree structure"""
-    if not startpath:
-        return ["No workspace set"]
-    
-    tree = []
-    try:
-        for root, dirs, files in os.walk(startpath):
-            # Limit depth to avoid too much recursion
-            if root.count(os.sep) - startpath.count(os.sep) > 3:
-                continue
-                
-            level = root.replace(str(startpath), '').count(os.sep)
-            indent = ' ' * 2 * level
-            tree.append(f"{indent}📁 {os.path.basename(root)}/")
-            subindent = ' ' * 2 * (level + 1)
-            for file in files[:50]:  # Limit files per directory
-                tree.append(f"{subindent}📄 {file}")
-    except Exception as e:
-        tree.append(f"❌ Error reading directory: {e}")
-    return tree
+def get_tree_model(startpath):
+    """Get the cached lazy tree model for a workspace"""
+    model = st.session_state.get("tree_model")
+    if model is None or model.root != os.path.abspath(startpath):
+        model = FileTree(startpath)
+        st.session_state.tree_model = model
+    return model
+
+def display_file_tree(model, page_size=100):
+    """Render the expanded part of the tree one page at a time"""
+    rows = model.rows(max_files=200)
+    pages = max(1, (len(rows) + page_size - 1) // page_size)
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="tree_page") if pages > 1 else 1
+    
+    st.markdown('<div class="file-tree">', unsafe_allow_html=True)
+    for row in rows[(page - 1) * page_size:page * page_size]:
+        indent = ' ' * 2 * row.depth
+        if row.is_dir:
+            icon = "📂" if row.path in model.expanded else "📁"
+            if st.button(f"{indent}{icon} {row.name}/", key=f"tree_{row.path}"):
+                model.toggle(row.path)
+                st.rerun()
+        else:
+            st.text(f"{indent}📄 {row.name}")
+    st.markdown('</div>', unsafe_allow_html=True)
+    st.caption(f"{len(rows)} visible entries · page {page}/{pages}")
+
+def browser_session_id():
+    """Session id of this browser tab, kept in the URL so a reload resumes the same chat"""
+    session_id = st.query_params.get("session", "")
+    if not SESSION_ID_RE.match(session_id):
+        session_id = uuid.uuid4().hex[:16]
+        st.query_params["session"] = session_id
+    return session_id
+
+def create_terminal_buffer(config, session_id):
+    """Terminal ring buffer sized from the 'terminal' section of config.yaml"""
+    terminal_config = config.get('terminal', {})
+    spill_dir = terminal_config.get('spill_dir')
+    return TerminalBuffer(
+        max_lines=terminal_config.get('max_lines', 5000),
+        spill_path=os.path.join(os.path.expanduser(spill_dir), f"terminal-{session_id}.log") if spill_dir else None
+    )
+
+def record_job(job):
+    """Append a finished command's output to the terminal"""
+    terminal = st.session_state.terminal
+    segment = terminal.begin(job.command)
+    for stream, line in job.lines:
+        terminal.write(line if stream == "stdout" else f"🔴 {line}")
+    terminal.end(segment, job.returncode, job.status, job.duration)
 
-def display_code_proposal(proposal_content, proposal_id):
-    """Display a code proposal with accept/reject buttons"""
+def display_code_proposal(proposal):
+    """Display a parsed CodeProposal with accept/reject buttons"""
+    proposal_id = proposal.id
     st.markdown('<div class="code-proposal">', unsafe_allow_html=True)
     st.markdown(f"### 💡 **Code Proposal** `{proposal_id}`")
     
-    # Extract and display code blocks
-    code_blocks = re.findall(r'```(?:\w+)?\n(.*?)\n```', proposal_content, re.DOTALL)
-    file_sections = re.findall(r'FILE:\s*(.*?\.\w+)', proposal_content)
-    
-    for i, (file_section, code_block) in enumerate(zip(file_sections, code_blocks)):
-        st.markdown(f"**📄 {file_section}**")
+    # Display code blocks
+    for proposed in proposal.files:
+        label = "✏️ patch" if proposed.is_patch else "new file"
+        st.markdown(f"**📄 {proposed.path}** · {label}")
         st.markdown(f'<div class="code-block">', unsafe_allow_html=True)
-        st.code(code_block, language='python')
+        st.code(proposed.code, language=proposed.language)
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Display explanation
-    explanation_match = re.search(r'EXPLANATION:\s*(.*?)(?=FILE:|\Z)', proposal_content, re.DOTALL)
-    if explanation_match:
+    if proposal.explanation:
         st.markdown("**💬 Explanation:**")
-        st.info(explanation_match.group(1).strip())
+        st.info(proposal.explanation)
     
     # Accept/Reject buttons
     st.markdown('<div class="proposal-actions">', unsafe_allow_html=True)
     st.markdown("**🔧 Actions:**")
-    col1, col2 = st.columns(2)
+    # In a git workspace a proposal can also go to a scratch branch instead of the working tree
+    can_branch = st.session_state.agent.git is not None
+    columns = st.columns(3 if can_branch else 2)
+    col1, col2 = columns[0], columns[1]
     
     with col1:
         if st.button("✅ Accept Proposal", key=f"accept_{proposal_id}", use_container_width=True, type="primary"):
@@ -358,27 +396,119 @@ def display_code_proposal(proposal_content, proposal_id):
             st.session_state.pending_reject = proposal_id
             st.rerun()
     
+    if can_branch:
+        with columns[2]:
+            if st.button("🌿 Commit to Branch", key=f"branch_{proposal_id}", use_container_width=True):
+                st.session_state.pending_branch = proposal_id
+                st.rerun()
+    
     st.markdown('</div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+def add_message(role, content, proposal=None):
+    """Append a chat message with a stable id for fragment caching"""
+    message = {"id": uuid.uuid4().hex, "role": role, "content": content}
+    if proposal is not None:
+        message["proposal"] = proposal
+    history = st.session_state.chat_history
+    history.append(message)
+    
+    store = st.session_state.agent.session_store
+    if store:
+        store.append_message(st.session_state.session_id, role, content,
+                             proposal.id if proposal is not None else None, message["id"])
+        # Stored messages beyond the window are dropped here and paged back in on demand
+        while len(history) > st.session_state.chat_window:
+            dropped = history.pop(0)
+            st.session_state.message_fragments.pop(dropped["id"], None)
+
+def load_messages(agent, limit, before_id=None):
+    """Messages from the session store, with still-pending proposals re-attached"""
+    messages = agent.session_store.recent_messages(agent.session_id, limit, before_id)
+    for message in messages:
+        proposal_id = message.pop("proposal_id")
+        if proposal_id and proposal_id in agent.pending_changes:
+            message["proposal"] = agent.pending_changes[proposal_id]
+    return messages
+
+def init_chat_state(agent):
+    """Fresh chat state for an agent, restored from its session store when enabled"""
+    st.session_state.chat_window = agent.config.get('chat', {}).get('window', 50)
+    st.session_state.message_fragments = {}
+    st.session_state.chat_history = (
+        load_messages(agent, st.session_state.chat_window) if agent.session_store else []
+    )
+
+def build_fragment(msg):
+    """Pre-render a message once; the result is reused on every rerun"""
+    if msg["role"] == "user":
+        return "html", f'<div class="chat-message-user">👤 **YOU:** {msg["content"]}</div>'
+    elif msg["role"] == "assistant":
+        # Proposals arrive already parsed by the agent
+        if msg.get("proposal") is not None:
+            return "proposal", msg["proposal"]
+        return "html", f'<div class="chat-message-assistant">🤖 **CINTESSA:** {msg["content"]}</div>'
+    return "system", f"🔧 **SYSTEM:** {msg['content']}"
+
+def render_message(msg):
+    """Render a chat message from its cached fragment"""
+    fragments = st.session_state.message_fragments
+    fragment = fragments.get(msg["id"])
+    if fragment is None:
+        fragment = fragments[msg["id"]] = build_fragment(msg)
+    
+    kind, payload = fragment
+    if kind == "proposal":
+        display_code_proposal(payload)
+    elif kind == "html":
+        st.markdown(payload, unsafe_allow_html=True)
+    else:
+        st.info(payload)
+
+def display_chat_history():
+    """Render only the newest messages, with a button to page in older ones"""
+    agent = st.session_state.agent
+    history = st.session_state.chat_history
+    start = max(0, len(history) - st.session_state.chat_window)
+    stored = 0
+    if agent.session_store and history:
+        stored = agent.session_store.count_messages(agent.session_id, history[0]["id"])
+    hidden = start + stored
+    if hidden:
+        if st.button(f"⬆️ Load older messages ({hidden} hidden)", use_container_width=True):
+            page = agent.config.get('chat', {}).get('page_size', 50)
+            if not start and stored:
+                history[:0] = load_messages(agent, page, history[0]["id"])
+            st.session_state.chat_window += page
+            st.rerun()
+    for msg in history[start:]:
+        render_message(msg)
+
 def main():
     st.markdown('<div class="main-header">⚡ CINTESSA AGENT - CYBER AI IDE</div>', unsafe_allow_html=True)
     
     # Initialize session state
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = browser_session_id()
+    
     if "agent" not in st.session_state:
-        st.session_state.agent = CintessaAgent()
+        st.session_state.agent = CintessaAgent(session_id=st.session_state.session_id)
     
     if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+        init_chat_state(st.session_state.agent)
     
     if "workspace_path" not in st.session_state:
         st.session_state.workspace_path = None
     
-    if "terminal_output" not in st.session_state:
-        st.session_state.terminal_output = "⚡ CYBER TERMINAL READY\\n> Type 'help' for commands\\n"
+    if "terminal" not in st.session_state:
+        st.session_state.terminal = create_terminal_buffer(st.session_state.agent.config, st.session_state.session_id)
+        st.session_state.terminal.write("⚡ CYBER TERMINAL READY\n> Type 'help' for commands")
+    
+    if "terminal_jobs" not in st.session_state:
+        st.session_state.terminal_jobs = []
     
-    if "file_tree" not in st.session_state:
-        st.session_state.file_tree = []
+    if "tree_model" not in st.session_state:
+        st.session_state.tree_model = None
     
     if "agent_paused" not in st.session_state:
         st.session_state.agent_paused = False
@@ -388,21 +518,31 @@ def main():
     
     if "pending_reject" not in st.session_state:
         st.session_state.pending_reject = None
+    
+    if "pending_branch" not in st.session_state:
+        st.session_state.pending_branch = None
 
     # Handle pending accept/reject actions
     if st.session_state.pending_accept:
         proposal_id = st.session_state.pending_accept
         result = st.session_state.agent.accept_code_proposal(proposal_id)
-        st.session_state.chat_history.append({"role": "system", "content": result})
+        add_message("system", result)
         st.session_state.pending_accept = None
         st.rerun()
     
     if st.session_state.pending_reject:
         proposal_id = st.session_state.pending_reject
         result = st.session_state.agent.reject_code_proposal(proposal_id)
-        st.session_state.chat_history.append({"role": "system", "content": result})
+        add_message("system", result)
         st.session_state.pending_reject = None
         st.rerun()
+    
+    if st.session_state.pending_branch:
+        proposal_id = st.session_state.pending_branch
+        result = st.session_state.agent.branch_code_proposal(proposal_id)
+        add_message("system", result)
+        st.session_state.pending_branch = None
+        st.rerun()
 
     # Sidebar with cyberpunk style
     with st.sidebar:
@@ -425,9 +565,10 @@ def main():
         
         with col2:
             if st.button("🔄 RESTART", use_container_width=True):
-                st.session_state.agent = CintessaAgent()
+                st.session_state.agent.shutdown()
+                st.session_state.agent = CintessaAgent(session_id=st.session_state.session_id)
                 st.session_state.workspace_path = None
-                st.session_state.chat_history = []
+                init_chat_state(st.session_state.agent)
                 st.session_state.agent_paused = False
                 st.success("🔄 Agent restarted!")
                 st.rerun()
@@ -440,6 +581,17 @@ def main():
             st.success("▶️ **AGENT ACTIVE**")
             st.info("Ready to process commands")
         
+        # Model readiness from the background warm-up
+        st.markdown("### 🧠 MODELS")
+        state_icons = {"ready": "🟢", "loading": "🟡", "pending": "⚪", "missing": "🔴", "error": "🔴"}
+        for status in st.session_state.agent.model_warmer.readiness():
+            line = f"{state_icons.get(status['state'], '⚪')} **{status['route']}** · `{status['model'] or '…'}` · {status['state']}"
+            if status['load_seconds'] is not None:
+                line += f" ({status['load_seconds']:.1f}s load)"
+            st.markdown(line)
+            if status['error']:
+                st.caption(status['error'])
+        
         st.markdown("---")
         
         # Workspace status
@@ -456,11 +608,11 @@ def main():
             with col1:
                 if st.button("📋 List Files", use_container_width=True, disabled=st.session_state.agent_paused):
                     result = st.session_state.agent.execute_action("list_files", {})
-                    st.session_state.terminal_output += f"\\n> ls\\n{result}\\n"
+                    st.session_state.terminal.record("ls", result)
             
             with col2:
                 if st.button("🔄 Refresh Tree", use_container_width=True, disabled=st.session_state.agent_paused):
-                    st.session_state.file_tree = get_file_tree(st.session_state.workspace_path)
+                    get_tree_model(st.session_state.workspace_path).refresh()
                     st.rerun()
         
         else:
@@ -487,24 +639,8 @@ def main():
         if st.session_state.agent_paused:
             st.error("⏸️ **AGENT PAUSED** - Chat commands disabled")
         
-        # Display chat history with cyberpunk style
-        for msg in st.session_state.chat_history:
-            if msg["role"] == "user":
-                st.markdown(f'<div class="chat-message-user">👤 **YOU:** {msg["content"]}</div>', unsafe_allow_html=True)
-            elif msg["role"] == "assistant":
-                # Check if this is a code proposal
-                if "💡 **Code Proposal**" in msg["content"]:
-                    # Extract proposal ID
-                    proposal_id_match = re.search(r'`([a-f0-9]+)`', msg["content"])
-                    if proposal_id_match:
-                        proposal_id = proposal_id_match.group(1)
-                        display_code_proposal(msg["content"], proposal_id)
-                    else:
-                        st.markdown(f'<div class="chat-message-assistant">🤖 **CINTESSA:** {msg["content"]}</div>', unsafe_allow_html=True)
-                else:
-                    st.markdown(f'<div class="chat-message-assistant">🤖 **CINTESSA:** {msg["content"]}</div>', unsafe_allow_html=True)
-            elif msg["role"] == "system":
-                st.info(f"🔧 **SYSTEM:** {msg['content']}")
+        # Display chat history with cyberpunk style (newest window only)
+        display_chat_history()
         
         # Chat input at bottom - ALWAYS ENABLED (unless paused)
         if prompt := st.chat_input("💭 Ask Cintessa anything...", 
@@ -513,14 +649,21 @@ def main():
                 st.error("❌ Agent is paused. Please resume to process commands.")
             else:
                 # Add user message to history
-                st.session_state.chat_history.append({"role": "user", "content": prompt})
-                
-                # Get agent response
-                with st.spinner("🔮 Cintessa is processing..."):
-                    response = st.session_state.agent.chat(prompt)
+                add_message("user", prompt)
                 
-                # Add assistant response to history
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
+                # Stream agent response as tokens arrive
+                st.markdown(f'<div class="chat-message-user">👤 **YOU:** {prompt}</div>', unsafe_allow_html=True)
+                placeholder = st.empty()
+                placeholder.markdown("🔮 Cintessa is processing...")
+                response = ""
+                for chunk in st.session_state.agent.chat_stream(prompt):
+                    response += chunk
+                    placeholder.markdown(f'<div class="chat-message-assistant">🤖 **CINTESSA:** {response}▌</div>', unsafe_allow_html=True)
+
+                # Add assistant response to history, with the parsed proposal if one was made
+                agent = st.session_state.agent
+                proposal = agent.get_proposal(agent.last_proposal_id) if agent.last_proposal_id else None
+                add_message("assistant", response, proposal)
                 
                 # Rerun to show new messages
                 st.rerun()
@@ -557,13 +700,7 @@ def main():
             
             with col1:
                 st.markdown("**🌳 PROJECT TREE**")
-                if st.session_state.file_tree:
-                    st.markdown('<div class="file-tree">', unsafe_allow_html=True)
-                    for item in st.session_state.file_tree[:100]:
-                        st.text(item)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                else:
-                    st.info("🔄 Click 'Refresh Tree' in sidebar to view file tree")
+                display_file_tree(get_tree_model(st.session_state.workspace_path))
             
             with col2:
                 st.subheader("🔧 FILE OPERATIONS")
@@ -575,10 +712,29 @@ def main():
                 if op_type == "Read File":
                     file_path = st.text_input("File path (relative to workspace):", 
                                             placeholder="e.g., src/main.py")
+                    col_mode, col_size, col_page = st.columns(3)
+                    with col_mode:
+                        view_mode = st.selectbox("View", ["Page", "Head", "Tail"], key="read_mode")
+                    with col_size:
+                        page_size = st.number_input("Lines per page", min_value=10, max_value=5000, value=200, step=50, key="read_page_size")
+                    with col_page:
+                        page_number = st.number_input("Page", min_value=1, value=1, key="read_page", disabled=view_mode != "Page")
                     if st.button("📖 Read File", key="read_btn", disabled=st.session_state.agent_paused):
-                        if file_path:
-                            content = st.session_state.agent.tools.read_file(file_path)
-                            st.text_area("📄 File Content:", content, height=300)
+                        st.session_state.read_target = file_path
+                    if file_path and st.session_state.get("read_target") == file_path:
+                        # Only the requested window is read; large files are paged via mmap
+                        page, error = st.session_state.agent.tools.read_file_page(
+                            file_path,
+                            start_line=(page_number - 1) * page_size + 1,
+                            num_lines=page_size,
+                            mode=view_mode.lower() if view_mode != "Page" else "lines"
+                        )
+                        if error:
+                            st.error(error)
+                        else:
+                            total = page.total_lines if page.total_lines is not None else "?"
+                            st.caption(f"Lines {page.start_line}-{page.end_line} of {total}")
+                            st.text_area("📄 File Content:", page.text, height=300)
                 
                 elif op_type == "Write File":
                     file_path = st.text_input("File path to create/edit:", 
@@ -589,7 +745,7 @@ def main():
                         if file_path and content:
                             result = st.session_state.agent.tools.write_file(file_path, content)
                             st.success(result)
-                            st.session_state.file_tree = get_file_tree(st.session_state.workspace_path)
+                            get_tree_model(st.session_state.workspace_path).refresh()
                 
                 elif op_type == "Create File":
                     file_path = st.text_input("New file path:", 
@@ -598,7 +754,7 @@ def main():
                         if file_path:
                             result = st.session_state.agent.tools.write_file(file_path, "# New file created by Cintessa\\n")
                             st.success(result)
-                            st.session_state.file_tree = get_file_tree(st.session_state.workspace_path)
+                            get_tree_model(st.session_state.workspace_path).refresh()
         
         else:
             st.warning("🎯 Please select a workspace folder first!")
@@ -615,11 +771,23 @@ def main():
         if st.session_state.agent_paused:
             st.warning("⏸️ **AGENT PAUSED** - Terminal commands disabled")
         
-        # Terminal output
+        # Terminal output: only a window of the ring buffer is rendered
+        terminal = st.session_state.terminal
+        view_lines = st.session_state.agent.config.get('terminal', {}).get('view_lines', 200)
+        scroll = 0
+        if len(terminal) > view_lines:
+            scroll = st.slider("⬆️ Scroll back (lines)", 0, len(terminal) - view_lines, 0, key="term_scroll")
         st.markdown('<div class="terminal">', unsafe_allow_html=True)
-        st.text(st.session_state.terminal_output)
+        st.text(terminal.view(view_lines, scroll))
         st.markdown('</div>', unsafe_allow_html=True)
         
+        segments = terminal.recent_segments(10)
+        if segments:
+            with st.expander(f"📜 Recent commands ({len(terminal)} of {terminal.total_written} lines kept)"):
+                for segment in segments:
+                    icon = "✅" if segment.exit_code == 0 else "🔴"
+                    st.text(f"{icon} [{segment.exit_code}] {segment.duration:.1f}s  {segment.command}")
+        
         # Terminal input
         col1, col2 = st.columns([4, 1])
         with col1:
@@ -629,36 +797,69 @@ def main():
                                        placeholder="Type command and press Enter...",
                                        disabled=st.session_state.agent_paused)
         with col2:
-            if st.button("⚡ RUN", use_container_width=True, 
-                       disabled=st.session_state.agent_paused) and terminal_cmd:
-                code, out, err = st.session_state.agent.tools.run_shell(terminal_cmd)
-                
-                # Add to terminal output with cyber style
-                st.session_state.terminal_output += f"\\n💲 {terminal_cmd}\\n"
-                if out:
-                    st.session_state.terminal_output += f"{out}\\n"
-                if err:
-                    st.session_state.terminal_output += f"🔴 {err}\\n"
-                st.session_state.terminal_output += f"📟 [Exit: {code}]\\n"
-                
-                # Refresh to show new output
-                st.rerun()
+            run_clicked = st.button("⚡ RUN", use_container_width=True, 
+                       disabled=st.session_state.agent_paused) and terminal_cmd
+        
+        tools = st.session_state.agent.tools
+        streaming = None
+        if run_clicked:
+            try:
+                streaming = tools.start_shell(terminal_cmd, session_id=st.session_state.session_id)
+            except Exception as e:
+                st.error(f"❌ {e}")
+            else:
+                st.session_state.terminal_jobs.append(streaming.id)
+        
+        # Running commands with their Cancel buttons. They render before the new command's output is
+        # streamed below, so it can be cancelled too: a click reruns the script, which stops the stream
+        live = None
+        for job_id in list(st.session_state.terminal_jobs):
+            job = tools.runner.get(job_id)
+            if job is None or (job.done and job is not streaming):
+                if job is not None:
+                    record_job(job)
+                st.session_state.terminal_jobs.remove(job_id)
+                continue
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"⏳ `{job.id}` **{job.command}** — running {job.duration:.0f}s")
+                if job is streaming:
+                    live = st.empty()
+                else:
+                    st.text("".join(line for _, line in job.lines[-20:]))
+            with col2:
+                if st.button("⛔ Cancel", key=f"cancel_{job.id}", use_container_width=True):
+                    tools.runner.cancel(job.id)
+                    st.rerun()
+        
+        if streaming is not None:
+            streamed = deque(maxlen=200)
+            for stream, line in tools.runner.stream(streaming):
+                # Quiet polls redraw too: Streamlit can only stop the script (e.g. for Cancel) at an st call
+                if line is not None:
+                    streamed.append(line if stream == "stdout" else f"🔴 {line}")
+                live.text("".join(streamed) or f"… running {streaming.duration:.0f}s")
+            # Refresh to show new output
+            st.rerun()
+        
+        if st.session_state.terminal_jobs and st.button("🔄 Refresh Jobs", use_container_width=True):
+            st.rerun()
         
         # Terminal utilities
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("🔄 Clear Terminal", use_container_width=True, disabled=st.session_state.agent_paused):
-                st.session_state.terminal_output = "⚡ TERMINAL CLEARED\\n> Ready for commands\\n"
+                st.session_state.terminal.clear("⚡ TERMINAL CLEARED\n> Ready for commands")
                 st.rerun()
         with col2:
             if st.button("📊 System Info", use_container_width=True, disabled=st.session_state.agent_paused):
-                code, out, err = st.session_state.agent.tools.run_shell("pwd && ls -la")
-                st.session_state.terminal_output += f"\\n💲 system info\\n{out}\\n"
+                code, out, err = st.session_state.agent.tools.run_shell("pwd && ls -la", session_id=st.session_state.session_id)
+                st.session_state.terminal.record("system info", out, err, code)
                 st.rerun()
         with col3:
             if st.button("🐍 Python Check", use_container_width=True, disabled=st.session_state.agent_paused):
-                code, out, err = st.session_state.agent.tools.run_shell("python --version")
-                st.session_state.terminal_output += f"\\n💲 python check\\n{out}\\n"
+                code, out, err = st.session_state.agent.tools.run_shell("python --version", session_id=st.session_state.session_id)
+                st.session_state.terminal.record("python check", out, err, code)
                 st.rerun()
         
         st.markdown('</div>', unsafe_allow_html=True)
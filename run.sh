@@ -44,11 +44,24 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 
-# Check if Ollama is running
-echo -e "${YELLOW}🤖 Checking Ollama connection...${NC}"
-if ! curl -s http://localhost:11434/api/tags > /dev/null; then
-    echo -e "${YELLOW}⚠️  Ollama not running or not accessible${NC}"
-    echo -e "${YELLOW}   Make sure to start Ollama: ollama serve${NC}"
+# Wait for Ollama, then check every configured route has an installed model
+echo -e "${YELLOW}🤖 Checking Ollama readiness...${NC}"
+for attempt in $(seq 1 10); do
+    if curl -sf http://localhost:11434/api/tags > /dev/null; then
+        break
+    fi
+    sleep 1
+done
+
+if ! python -c '
+import sys, yaml
+from agent.warmup import probe
+ok, report = probe(yaml.safe_load(open("config.yaml")))
+print("\n".join(report))
+sys.exit(0 if ok else 1)
+'; then
+    echo -e "${YELLOW}⚠️  Ollama is not ready for every configured model${NC}"
+    echo -e "${YELLOW}   Make sure Ollama is running (ollama serve) and pull the models listed above${NC}"
 fi
 
 echo -e "${GREEN}"
@@ -0,0 +1,29 @@
+from agent.core import Tools
+from agent.index import names_same_file
+
+
+def _tools(tmp_path):
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "Config.py").write_text("LIB = True\n")
+    return Tools(str(tmp_path))
+
+
+def test_bare_name_resolves_case_insensitively(tmp_path):
+    assert _tools(tmp_path).read_file("config.py") == "LIB = True\n"
+
+
+def test_matching_directory_resolves_case_insensitively(tmp_path):
+    assert _tools(tmp_path).read_file("LIB/config.py") == "LIB = True\n"
+
+
+def test_other_directory_is_only_suggested(tmp_path):
+    result = _tools(tmp_path).read_file("src/config.py")
+    assert result.startswith("❌")
+    assert "Did you mean: lib/Config.py" in result
+
+
+def test_names_same_file():
+    assert names_same_file("config.py", "lib/Config.py")
+    assert names_same_file("Lib/CONFIG.py", "lib/config.py")
+    assert not names_same_file("src/config.py", "lib/config.py")
+    assert not names_same_file("config.py", "lib/config.pyc")
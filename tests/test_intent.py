@@ -0,0 +1,32 @@
+import pytest
+import yaml
+
+from agent.core import CintessaAgent
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    config = tmp_path_factory.mktemp("config") / "config.yaml"
+    config.write_text(yaml.safe_dump({
+        "ollama": {"base_url": "http://127.0.0.1:9", "model": "qwen2:7b"},
+        "cache": {"enabled": False},
+        "session": {"enabled": False},
+        "warmup": {"enabled": False},
+    }))
+    agent = CintessaAgent(str(config))
+    yield agent.intent_engine
+    agent.shutdown()
+
+
+@pytest.mark.parametrize("text", ["ls", "dir", "list files", "show files"])
+def test_list_files(engine, text):
+    assert engine.classify(text).action == "list_files"
+
+
+@pytest.mark.parametrize("text, wrong", [
+    ("run ls -la", "list_files"),
+    ("explain the dir command", "list_files"),
+    ("what changed in the parser design?", "git_status"),
+])
+def test_prose_is_not_taken_for_a_keyword(engine, text, wrong):
+    assert engine.classify(text).action != wrong
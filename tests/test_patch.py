@@ -0,0 +1,85 @@
+import pytest
+
+from agent.patch import PatchError, apply_hunks, parse_unified_diff
+
+ORIGINAL = "".join(f"line {n}\n" for n in range(1, 21))
+
+
+def _hunks(diff):
+    patches = parse_unified_diff(diff)
+    assert len(patches) == 1
+    return patches[0].hunks
+
+
+def test_hunk_applies_at_its_stated_line():
+    hunks = _hunks("@@ -5,3 +5,3 @@\n line 5\n-line 6\n+line six\n line 7\n")
+    assert apply_hunks(ORIGINAL, hunks) == ORIGINAL.replace("line 6\n", "line six\n")
+
+
+def test_hunk_with_a_wrong_line_number_is_found_nearby():
+    hunks = _hunks("@@ -2,3 +2,3 @@\n line 14\n-line 15\n+line fifteen\n line 16\n")
+    assert apply_hunks(ORIGINAL, hunks) == ORIGINAL.replace("line 15\n", "line fifteen\n")
+
+
+def test_context_matches_loosely_on_whitespace_and_keeps_the_files_text():
+    original = "def f():\n    a = 1\n    return a\n"
+    hunks = _hunks("@@ -1,3 +1,3 @@\n def f():\n-  a = 1\n+    a = 2\n   return a\n")
+    assert apply_hunks(original, hunks) == "def f():\n    a = 2\n    return a\n"
+
+
+def test_later_hunks_account_for_lines_added_earlier():
+    hunks = _hunks(
+        "@@ -2,2 +2,4 @@\n line 2\n+added a\n+added b\n line 3\n"
+        "@@ -10,2 +12,1 @@\n-line 10\n line 11\n"
+    )
+    expected = ORIGINAL.replace("line 2\n", "line 2\nadded a\nadded b\n").replace("line 10\n", "")
+    assert apply_hunks(ORIGINAL, hunks) == expected
+
+
+def test_missing_blank_context_prefix_is_tolerated():
+    original = "a = 1\n\nb = 2\n"
+    hunks = _hunks("@@ -1,3 +1,3 @@\n a = 1\n\n-b = 2\n+b = 3\n")
+    assert apply_hunks(original, hunks) == "a = 1\n\nb = 3\n"
+
+
+def test_unmatched_hunk_raises():
+    hunks = _hunks("@@ -1,2 +1,2 @@\n-not in the file\n+replacement\n")
+    with pytest.raises(PatchError):
+        apply_hunks(ORIGINAL, hunks)
+
+
+def test_file_headers_set_the_path_and_new_files():
+    patches = parse_unified_diff(
+        "--- a/src/app.py\n+++ b/src/app.py\n@@ -1 +1 @@\n-x\n+y\n"
+        "--- /dev/null\n+++ b/src/new.py\n@@ -0,0 +1 @@\n+z\n"
+    )
+    assert [(p.path, p.creates_file) for p in patches] == [("src/app.py", False), ("src/new.py", True)]
+
+
+def test_crlf_file_keeps_its_line_endings():
+    original = "a = 1\r\nb = 2\r\nc = 3\r\n"
+    hunks = _hunks("@@ -1,3 +1,4 @@\n a = 1\n-b = 2\n+b = 20\n+b2 = 21\n c = 3\n")
+    assert apply_hunks(original, hunks) == "a = 1\r\nb = 20\r\nb2 = 21\r\nc = 3\r\n"
+
+
+def test_missing_final_newline_is_kept():
+    hunks = _hunks("@@ -1,2 +1,2 @@\n x\n-y\n+z\n")
+    assert apply_hunks("x\r\ny", hunks) == "x\r\nz"
+
+
+def test_removed_dashes_before_added_pluses_are_not_a_file_header():
+    patches = parse_unified_diff(
+        "--- a/notes.md\n+++ b/notes.md\n@@ -1,3 +1,3 @@\n title\n--- old rule\n+++ new rule\n end\n"
+    )
+    assert [p.path for p in patches] == ["notes.md"]
+    assert patches[0].hunks[0].lines == [(' ', "title"), ('-', "-- old rule"), ('+', "++ new rule"), (' ', "end")]
+    original = "title\n-- old rule\nend\n"
+    assert apply_hunks(original, patches[0].hunks) == "title\n++ new rule\nend\n"
+
+
+def test_header_after_a_finished_hunk_starts_the_next_file():
+    patches = parse_unified_diff(
+        "--- a/one.py\n+++ b/one.py\n@@ -1 +1 @@\n-x\n+y\n"
+        "--- a/two.py\n+++ b/two.py\n@@ -1 +1 @@\n-p\n+q\n"
+    )
+    assert [p.path for p in patches] == ["one.py", "two.py"]
@@ -0,0 +1,34 @@
+from agent.proposal import parse_proposal
+
+
+def test_pairs_each_block_with_its_file_line():
+    proposal = parse_proposal(
+        "FILE: app.py\n```python\nprint('hi')\n```\n"
+        "**FILE:** lib/util.py\n```\nX = 1\n```\n"
+        "EXPLANATION: Adds an entry point.",
+        "p1",
+    )
+    assert [(f.path, f.language, f.code) for f in proposal.files] == [
+        ("app.py", "python", "print('hi')"),
+        ("lib/util.py", "python", "X = 1"),
+    ]
+    assert proposal.explanation == "Adds an entry point."
+
+
+def test_prose_starting_with_file_is_not_a_header():
+    proposal = parse_proposal(
+        "FILE: main.py\n```python\npass\n```\n"
+        "EXPLANATION: Keeps it small.\n"
+        "Filesystem access is not needed.\n"
+        "Files to create: main.py",
+        "p2",
+    )
+    assert [f.path for f in proposal.files] == ["main.py"]
+    assert proposal.explanation == (
+        "Keeps it small.\nFilesystem access is not needed.\nFiles to create: main.py"
+    )
+
+
+def test_prose_file_line_does_not_name_the_next_block():
+    proposal = parse_proposal("Files to create: main.py\n```python\npass\n```\n", "p3")
+    assert proposal.files == []
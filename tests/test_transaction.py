@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from agent.transaction import STAGING_DIR, TransactionError, WriteTransaction
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_commit_writes_every_file_and_leaves_no_staging_dir(tmp_path):
+    (tmp_path / "app.py").write_text("old\n")
+    txn = WriteTransaction(str(tmp_path))
+    txn.write("app.py", "new\n")
+    txn.write("pkg/sub/mod.py", "X = 1\n")
+
+    assert sorted(txn.commit()) == ["app.py", os.path.join("pkg", "sub", "mod.py")]
+    assert _read(tmp_path / "app.py") == "new\n"
+    assert _read(tmp_path / "pkg" / "sub" / "mod.py") == "X = 1\n"
+    assert not (tmp_path / STAGING_DIR).exists()
+
+
+def test_failed_commit_restores_files_and_removes_created_dirs(tmp_path):
+    (tmp_path / "app.py").write_text("old\n")
+    (tmp_path / "blocker").write_text("a file where a directory is needed\n")
+    txn = WriteTransaction(str(tmp_path))
+    txn.write("app.py", "new\n")
+    txn.write("pkg/sub/mod.py", "X = 1\n")
+    txn.write("blocker/late.py", "fails\n")
+
+    with pytest.raises(TransactionError):
+        txn.commit()
+
+    assert _read(tmp_path / "app.py") == "old\n"
+    assert not (tmp_path / "pkg").exists()
+    assert sorted(os.listdir(tmp_path)) == ["app.py", "blocker"]
+
+
+def test_rollback_keeps_directories_that_already_existed(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "blocker").write_text("")
+    txn = WriteTransaction(str(tmp_path))
+    txn.write("pkg/new/mod.py", "X = 1\n")
+    txn.write("blocker/late.py", "fails\n")
+
+    with pytest.raises(TransactionError):
+        txn.commit()
+
+    assert (tmp_path / "pkg").is_dir()
+    assert os.listdir(tmp_path / "pkg") == []
+
+
+def test_paths_outside_the_workspace_are_rejected(tmp_path):
+    txn = WriteTransaction(str(tmp_path / "ws"))
+    with pytest.raises(TransactionError):
+        txn.write("../escape.py", "")